@@ -1,95 +1,535 @@
+import base64
+import json
+import sys
+import time
 import typer
+from enum import Enum
+from pathlib import Path
+from typing import Optional
 from rich.console import Console
+from rich.markup import escape
 from rich.table import Table
-from app.db import init_db, get_db
+from app import profiling
+from app.db import init_db, get_db, rebuild_article_stats
 from app.config import config
-from app.services.rss import RSSService
-from app.services.llm import LLMService
+from app.metrics import export as export_metrics
+from app.services.cache import PROMPT_VERSION, VerdictCache
+from app.services.prefilter import LOW_SCORE, agreement
+from app.services.search import HIGHLIGHT_END, HIGHLIGHT_START, search_articles
+from app.services.workqueue import requeue_failed
+from app.utils import strip_html
+
+# The RSS and LLM services pull in feedparser, requests, openai, pydantic and
+# numpy, so commands import them when they run; reports and stats start
+# without them (see tests/test_cli.py for the import-time budget).
 
 app = typer.Typer(help="FeedSense - AI Powered Feed Reader")
 console = Console()
-rss_service = RSSService()
+
+# Served by idx_articles_status_score_published (see app.db migrations).
+# The id tie-breaker matches the index order so keyset pages never overlap.
+ARTICLES_QUERY = """
+    SELECT a.id, a.title, a.score, a.category, a.analysis, a.link, a.published, f.name as feed_name
+    FROM articles a
+    JOIN feeds f ON a.feed_id = f.id
+    WHERE a.status = 'analyzed'
+        AND a.score >= ?{filters}
+    ORDER BY a.score DESC, a.published DESC, a.id
+"""
+
+DAY_FILTER = """
+        AND a.published >= ?
+        AND a.published < ?"""
+
+# Rows after (score, published, id) in the order above. A NULL published
+# sorts last, as '' would, so both sides compare COALESCE(published, '').
+AFTER_FILTER = """
+        AND a.score <= ?
+        AND (a.score < ? OR COALESCE(a.published, '') < ?
+             OR (COALESCE(a.published, '') = ? AND a.id > ?))"""
+
+# Rows fetched per round trip while streaming output
+STREAM_CHUNK = 500
+
+
+def articles_query(day=False, after=False, limit=False) -> str:
+    filters = (DAY_FILTER if day else "") + (AFTER_FILTER if after else "")
+    query = ARTICLES_QUERY.format(filters=filters)
+    return f"{query}    LIMIT ?\n" if limit else query
+
+
+REPORT_QUERY = articles_query(limit=True)
+DAILY_QUERY = articles_query(day=True)
+
+
+class OutputFormat(str, Enum):
+    rich = "rich"
+    plain = "plain"
+    jsonl = "jsonl"
+
+
+def encode_cursor(row) -> str:
+    """Opaque `--after` token for the position of `row`."""
+    raw = json.dumps([row["score"], row["published"], row["id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple:
+    """Return the `AFTER_FILTER` parameters for an `--after` token.
+
+    Raises ValueError for anything `encode_cursor` did not produce.
+    """
+    padded = token + "=" * (-len(token) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded))
+    if not isinstance(values, list) or len(values) != 3:
+        raise ValueError(f"not a cursor: {values!r}")
+    score, published, article_id = values
+    if not (
+        isinstance(score, int)
+        and isinstance(article_id, int)
+        and isinstance(published, (str, type(None)))
+    ):
+        raise ValueError(f"not a cursor: {values!r}")
+    published = published or ""
+    return (score, score, published, published, article_id)
+
+
+def _print_article(i: int, row, fmt: OutputFormat, show_feed: bool):
+    if fmt == OutputFormat.jsonl:
+        sys.stdout.write(json.dumps(dict(row), ensure_ascii=False) + "\n")
+        return
+    if fmt == OutputFormat.plain:
+        fields = (row["score"], row["title"], row["category"], row["feed_name"], row["link"])
+        sys.stdout.write(
+            "\t".join(" ".join(str(f or "").split()) for f in fields) + "\n"
+        )
+        return
+
+    score = row["score"]
+    color = "green" if score >= 8 else "yellow" if score >= 5 else "white"
+
+    console.print(f"[bold]{i}. [{color}]★ {score}[/{color}][/bold] {row['title']}")
+    if show_feed:
+        console.print(f"   [cyan]分类:[/cyan] {row['category'] or 'N/A'} | [dim]来源:[/dim] {row['feed_name']}")
+    else:
+        console.print(f"   [cyan]分类:[/cyan] {row['category'] or 'N/A'}")
+    console.print(f"   [dim]理由:[/dim] {row['analysis'] or 'N/A'}")
+    console.print(f"   [blue underline]🔗 {row['link']}[/blue underline]")
+    console.print()
+
+
+def _stream_articles(query, params, fmt, heading, empty_message, show_feed, limit):
+    """Print matching articles as they are read, without loading them all.
+
+    When a page is full, prints the `--after` token for the next one.
+    """
+    count, last = 0, None
+    with get_db() as conn:
+        cursor = conn.execute(query, params)
+        while rows := cursor.fetchmany(STREAM_CHUNK):
+            for row in rows:
+                count += 1
+                if count == 1 and fmt == OutputFormat.rich:
+                    console.print(heading)
+                with profiling.span("console"):
+                    _print_article(count, row, fmt, show_feed)
+                last = row
+
+    if fmt != OutputFormat.rich:
+        if limit and count == limit:
+            typer.echo(f"--after {encode_cursor(last)}", err=True)
+        return
+
+    if not count:
+        console.print(empty_message)
+        return
+    console.print(f"[dim]Total: {count} articles[/dim]")
+    if limit and count == limit:
+        console.print(f"[dim]Next page: --after {encode_cursor(last)}[/dim]")
+    console.print()
+
+
+FEEDS_QUERY = "SELECT * FROM feeds"
+
+# Read from the trigger-maintained summary tables (see app.db), whose size
+# depends on feeds and categories rather than on the number of articles
+STATS_QUERY = """
+    SELECT
+        COALESCE(SUM(count), 0) AS total,
+        COALESCE(SUM(count * (status = 'analyzed')), 0) AS analyzed,
+        COALESCE(SUM(count * (status = 'new')), 0) AS pending,
+        COALESCE(SUM(count * (status = 'retry')), 0) AS retrying,
+        COALESCE(SUM(count * (status = 'error')), 0) AS errors,
+        COALESCE(SUM(count * (status = 'skipped')), 0) AS skipped,
+        COALESCE(SUM(count * (status = 'duplicate')), 0) AS duplicates,
+        COALESCE(SUM(count * (bucket = 'high')), 0) AS high_score,
+        COALESCE(SUM(count * (bucket = 'mid')), 0) AS mid_score,
+        COALESCE(SUM(count * (bucket = 'low')), 0) AS low_score,
+        (
+            SELECT COALESCE(SUM(count), 0) FROM article_daily_stats WHERE day >= ?
+        ) AS today_count
+    FROM article_stats
+"""
+
+FEED_STATS_QUERY = """
+    SELECT
+        COALESCE(f.name, f.url, 'Unknown') AS label,
+        SUM(s.count) AS total,
+        SUM(s.count * (s.status = 'analyzed')) AS analyzed,
+        SUM(s.count * (s.status = 'new')) AS pending,
+        SUM(s.count * (s.bucket = 'high')) AS high_score,
+        ROUND(1.0 * SUM(s.score_sum * (s.status = 'analyzed'))
+              / NULLIF(SUM(s.count * (s.status = 'analyzed')), 0), 1) AS avg_score
+    FROM article_stats s
+    LEFT JOIN feeds f ON f.id = s.feed_id
+    GROUP BY s.feed_id
+    HAVING total > 0
+    ORDER BY total DESC
+"""
+
+CATEGORY_STATS_QUERY = """
+    SELECT
+        COALESCE(NULLIF(category, ''), 'N/A') AS label,
+        SUM(count) AS total,
+        SUM(count) AS analyzed,
+        SUM(count * (bucket = 'high')) AS high_score,
+        ROUND(1.0 * SUM(score_sum) / NULLIF(SUM(count), 0), 1) AS avg_score
+    FROM article_stats
+    WHERE status = 'analyzed'
+    GROUP BY category
+    HAVING total > 0
+    ORDER BY total DESC
+"""
+
+
+class StatsBreakdown(str, Enum):
+    feed = "feed"
+    category = "category"
+
+
+def _print_profile(profiler: profiling.Profiler, output: Optional[Path]):
+    table = Table(
+        title=f"Profile ({profiler.elapsed:.2f}s wall time)",
+        # Stages of worker threads overlap the main thread's
+        caption="Shares may add up past 100% with concurrent fetches or requests.",
+    )
+    table.add_column("Stage", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Self", justify="right")
+    table.add_column("% of wall", justify="right")
+    wall = profiler.elapsed or 1
+    for stage in profiler.stages():
+        table.add_row(
+            stage.name,
+            str(stage.calls),
+            f"{stage.total:.3f}s",
+            f"{stage.self_time:.3f}s",
+            f"{stage.self_time / wall:.0%}",
+        )
+    other = profiler.unaccounted()
+    table.add_row(
+        "[dim](outside spans)[/dim]", "", "", f"{other:.3f}s", f"{other / wall:.0%}"
+    )
+    console.print(table)
+    if output:
+        profiler.write(output)
+        console.print(f"[dim]Profile written to {output}[/dim]")
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    profile: bool = typer.Option(
+        False, "--profile", help="Print where the time went, stage by stage."
+    ),
+    profile_output: Optional[Path] = typer.Option(
+        None,
+        "--profile-output",
+        help="Also write a Chrome trace (.json) or a cProfile file (any other name).",
+    ),
+):
+    if not (profile or profile_output):
+        return
+    cprofile = bool(profile_output) and profile_output.suffix != ".json"
+    profiling.start(cprofile=cprofile)
+    ctx.call_on_close(lambda: _print_profile(profiling.stop(), profile_output))
 
 
 @app.command()
 def init():
     """Initialize the database."""
     config.validate()
-    init_db()
+    applied = init_db()
+    if applied:
+        console.print(f"Applied schema migrations: {', '.join(map(str, applied))}")
     console.print("[green]System initialized.[/green]")
 
 
 @app.command()
 def add(url: str):
     """Add a new RSS feed URL."""
-    rss_service.add_feed(url)
+    from app.services.rss import RSSService
+
+    RSSService().add_feed(url)
 
 
 @app.command()
 def list_feeds():
     """List all subscriptions."""
-    feeds = rss_service.list_feeds()
+    with get_db() as conn:
+        feeds = conn.execute(FEEDS_QUERY).fetchall()
     table = Table(title="RSS Subscriptions")
     table.add_column("ID", justify="right", style="cyan")
     table.add_column("Name", style="magenta")
     table.add_column("URL", style="green")
+    table.add_column("Every", justify="right")
+    table.add_column("Next fetch", style="dim")
 
     for feed in feeds:
-        table.add_row(str(feed["id"]), feed["name"], feed["url"])
+        interval = feed["poll_interval"]
+        table.add_row(
+            str(feed["id"]),
+            feed["name"],
+            feed["url"],
+            f"{interval / 3600:.1f}h" if interval else "-",
+            str(feed["next_fetch_at"] or "now")[:16],
+        )
 
     console.print(table)
 
 
 @app.command()
-def fetch():
-    """Fetch latest articles from all feeds."""
-    count = rss_service.fetch_all()
-    console.print(f"[green]Finished.[/green] Total new articles: {count}")
+def fetch(
+    concurrency: int = config.FETCH_CONCURRENCY,
+    per_host: int = config.FETCH_PER_HOST_LIMIT,
+    timeout: float = config.FETCH_TIMEOUT,
+    all_feeds: bool = typer.Option(
+        False, "--all", help="Fetch every active feed, due or not."
+    ),
+):
+    """Fetch latest articles from feeds that are due."""
+    from app.services.rss import RSSService
+
+    rss_service = RSSService()
+    start = time.monotonic()
+    count = rss_service.fetch_all(
+        concurrency=concurrency, per_host=per_host, timeout=timeout, force=all_feeds
+    )
+    elapsed = time.monotonic() - start
+    stats = rss_service.last_stats
+    console.print(
+        f"[green]Finished.[/green] Total new articles: {count} ({elapsed:.2f}s)"
+    )
+    console.print(
+        f"[dim]Feeds: {stats.feeds} (not due: {stats.not_due}) | "
+        f"Not modified: {stats.not_modified} | "
+        f"Errors: {stats.errors} | Duplicates: {stats.duplicates} | "
+        f"Near-duplicates: {stats.near_duplicates} | "
+        f"Downloaded: {stats.bytes / 1024:.1f} KiB[/dim]"
+    )
+    export_metrics("fetch")
 
 
 @app.command()
-def analyze(limit: int = 10):
-    """Analyze pending articles using AI."""
+def analyze(
+    limit: int = 10,
+    concurrency: int = config.LLM_CONCURRENCY,
+    rpm: int = config.LLM_RPM,
+    tpm: int = config.LLM_TPM,
+    batch_size: int = config.LLM_BATCH_SIZE,
+):
+    """Analyze pending articles using AI.
+
+    Safe to run in several processes at once: each claims its own articles.
+    """
+    from app.services.llm import LLMService
+
     llm_service = LLMService()
-    count = llm_service.process_pending(limit)
+    count = llm_service.process_pending(
+        limit, concurrency=concurrency, rpm=rpm, tpm=tpm, batch_size=batch_size
+    )
+    stats = llm_service.last_stats
     console.print(f"[green]Finished.[/green] Analyzed {count} articles.")
+    if stats.skipped or stats.audited:
+        console.print(
+            f"[dim]Pre-filter: skipped {stats.skipped} without a request, "
+            f"{stats.audited} sent on for auditing[/dim]"
+        )
+    if stats.estimated:
+        console.print(
+            f"[dim]Embeddings: estimated {stats.estimated} from similar "
+            f"articles without a request[/dim]"
+        )
+    console.print(
+        f"[dim]Errors: {stats.errors} | Retries scheduled: {stats.retried} | "
+        f"Re-queued: {stats.requeued} | "
+        f"Copied to duplicates: {stats.copied} | "
+        f"Expired leases reclaimed: {stats.reclaimed} | "
+        f"Cache hits: {stats.cache_hits}, misses: {stats.cache_misses} | "
+        f"{stats.elapsed:.2f}s | {stats.per_second:.2f} articles/sec[/dim]"
+    )
+    for mode, usage in stats.usage.items():
+        if usage.requests:
+            console.print(
+                f"[dim]{mode}: {usage.requests} requests | "
+                f"{usage.tokens_per_article:.0f} tokens/article "
+                f"({usage.prompt_tokens} prompt, {usage.completion_tokens} completion) | "
+                f"{usage.latency_per_article:.2f}s/article | "
+                f"{usage.ms_per_completion_token:.1f}ms/completion token[/dim]"
+            )
+    if stats.failures:
+        failures = ", ".join(f"{kind}: {n}" for kind, n in stats.failures.most_common())
+        console.print(f"[dim]Failures: {failures}[/dim]")
+    export_metrics("analyze")
 
 
 @app.command()
-def report(top: int = 20, score_min: int = 0):
-    """Show top rated articles."""
-    with get_db() as conn:
-        query = """
-            SELECT a.title, a.score, a.category, a.analysis, a.link, f.name as feed_name
-            FROM articles a
-            JOIN feeds f ON a.feed_id = f.id
-            WHERE a.status = 'analyzed' AND a.score >= ?
-            ORDER BY a.score DESC, a.published DESC
-            LIMIT ?
-        """
-        rows = conn.execute(query, (score_min, top)).fetchall()
-
+def prefilter():
+    """Show API calls saved by the pre-filter and how often the LLM agrees."""
+    rows = agreement()
     if not rows:
-        console.print(f"[yellow]No articles found with score >= {score_min}[/yellow]")
+        console.print("[yellow]The pre-filter has not judged any articles yet.[/yellow]")
         return
 
-    console.print(f"\n[bold cyan]📰 Top Articles (Min Score: {score_min})[/bold cyan]\n")
-    
-    for i, row in enumerate(rows, 1):
-        score = row["score"]
-        color = "green" if score >= 8 else "yellow" if score >= 5 else "white"
-        
-        console.print(f"[bold]{i}. [{color}]★ {score}[/{color}][/bold] {row['title']}")
-        console.print(f"   [cyan]分类:[/cyan] {row['category'] or 'N/A'}")
-        console.print(f"   [dim]理由:[/dim] {row['analysis'] or 'N/A'}")
-        console.print(f"   [blue underline]🔗 {row['link']}[/blue underline]")
-        console.print()
-    
-    console.print(f"[dim]Total: {len(rows)} articles[/dim]\n")
+    table = Table(title="Pre-filter")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Calls saved", justify="right")
+    table.add_column("Audited", justify="right")
+    table.add_column("LLM agrees", justify="right")
+    for row in rows:
+        agreed = f"{row['agreed'] / row['audited']:.0%}" if row["audited"] else "-"
+        table.add_row(row["stage"], str(row["skipped"]), str(row["audited"]), agreed)
+    console.print(table)
+    console.print(
+        "[dim]Audited articles were judged low-value but analyzed anyway; the LLM "
+        f"agrees when it scores them {LOW_SCORE} or lower.[/dim]"
+    )
+
+
+@app.command()
+def embed(limit: int = 1000):
+    """Embed analyzed articles for score estimates and map their categories
+    onto the canonical labels."""
+    from app.services.embeddings import SemanticScorer, make_embedder
+    from app.services.llm import LLMService
+
+    llm_service = LLMService()
+    scorer = llm_service.semantic or SemanticScorer(make_embedder(llm_service.client))
+    count = scorer.backfill(limit)
+    console.print(
+        f"[green]Embedded[/green] {count} articles with {scorer.embedder.name}."
+    )
+    if not config.EMBEDDINGS_ENABLED:
+        console.print("[dim]Set EMBEDDINGS_ENABLED=true to use them in analyze.[/dim]")
+
+
+@app.command()
+def retry_errors(
+    kind: str = typer.Option(None, help="Only this failure class, e.g. rate_limit."),
+    waiting: bool = typer.Option(
+        True, help="Also requeue articles still waiting out a retry backoff."
+    ),
+):
+    """Requeue articles whose analysis failed, with a fresh retry budget."""
+    requeued = requeue_failed(kind, waiting)
+    total = sum(requeued.values())
+    console.print(f"[green]Requeued[/green] {total} articles for analysis.")
+    for failure, count in requeued.most_common():
+        console.print(f"  {failure}: {count}")
+
+
+@app.command()
+def serve(
+    concurrency: int = config.LLM_CONCURRENCY,
+    rpm: int = config.LLM_RPM,
+    tpm: int = config.LLM_TPM,
+    batch_size: int = config.LLM_BATCH_SIZE,
+    status_interval: float = config.SERVE_STATUS_INTERVAL,
+):
+    """Fetch and analyze continuously until SIGTERM or Ctrl-C."""
+    from app.services.daemon import Daemon
+    from app.services.llm import LLMService
+    from app.services.rss import RSSService
+
+    config.validate()
+    daemon = Daemon(
+        RSSService(),
+        LLMService(),
+        concurrency=concurrency,
+        batch_size=batch_size,
+        rpm=rpm,
+        tpm=tpm,
+        status_interval=status_interval,
+    )
+    daemon.run()
+    console.print(
+        f"[green]Stopped.[/green] Analyzed {daemon.stats.analyzed} articles, "
+        f"{daemon.queue.qsize()} left pending."
+    )
+
+
+@app.command()
+def cache(purge: bool = False, evict: bool = False):
+    """Inspect the LLM verdict cache, or purge/evict its entries."""
+    verdict_cache = VerdictCache(f"{config.MODEL_NAME}:{PROMPT_VERSION}")
+    if purge:
+        removed = verdict_cache.purge()
+        console.print(f"[green]Purged[/green] {removed} cached verdicts.")
+    elif evict:
+        removed = verdict_cache.evict()
+        console.print(f"[green]Evicted[/green] {removed} expired or excess verdicts.")
+
+    info = verdict_cache.info()
+    console.print("\n[bold cyan]🗃️ Verdict Cache[/bold cyan]\n")
+    console.print(f"[bold]Entries:[/bold] {info['entries']}")
+    console.print(f"[bold]Hits served:[/bold] {info['hits']}")
+    console.print(f"[bold]Oldest:[/bold] {info['oldest'] or 'N/A'}")
+    console.print(f"[bold]Newest:[/bold] {info['newest'] or 'N/A'}")
+    console.print(
+        f"[dim]TTL: {verdict_cache.ttl_days or '∞'} days | "
+        f"Max entries: {verdict_cache.max_entries or '∞'}[/dim]\n"
+    )
+
+
+@app.command()
+def report(
+    top: int = 20,
+    score_min: int = 0,
+    page_size: int = typer.Option(0, help="Rows per page; overrides --top."),
+    after: str = typer.Option(None, help="Token printed at the end of a page."),
+    fmt: OutputFormat = typer.Option(OutputFormat.rich, "--format"),
+):
+    """Show top rated articles."""
+    limit = page_size or top
+    params = [score_min]
+    try:
+        if after:
+            params.extend(decode_cursor(after))
+    except ValueError:
+        console.print("[red]Error:[/red] Invalid --after token.")
+        return
+    params.append(limit)
+
+    _stream_articles(
+        articles_query(after=bool(after), limit=True),
+        params,
+        fmt,
+        f"\n[bold cyan]📰 Top Articles (Min Score: {score_min})[/bold cyan]\n",
+        f"[yellow]No articles found with score >= {score_min}[/yellow]",
+        show_feed=False,
+        limit=limit,
+    )
 
 
 @app.command()
-def daily(date: str = None, score_min: int = 5):
+def daily(
+    date: str = None,
+    score_min: int = 5,
+    page_size: int = typer.Option(0, help="Rows per page; 0 streams all."),
+    after: str = typer.Option(None, help="Token printed at the end of a page."),
+    fmt: OutputFormat = typer.Option(OutputFormat.rich, "--format"),
+):
     """Show articles from a specific date (YYYY-MM-DD). Defaults to today."""
     from datetime import datetime, timedelta
 
@@ -108,65 +548,131 @@ def daily(date: str = None, score_min: int = 5):
     start_datetime = datetime.combine(target_date, datetime.min.time())
     end_datetime = start_datetime + timedelta(days=1)
 
-    with get_db() as conn:
-        query = """
-            SELECT a.title, a.score, a.category, a.analysis, a.link, a.published, f.name as feed_name
-            FROM articles a
-            JOIN feeds f ON a.feed_id = f.id
-            WHERE a.status = 'analyzed' 
-                AND a.score >= ?
-                AND a.published >= ? 
-                AND a.published < ?
-            ORDER BY a.score DESC, a.published DESC
-        """
-        rows = conn.execute(
-            query, (score_min, start_datetime, end_datetime)
-        ).fetchall()
-
-    if not rows:
-        console.print(
-            f"[yellow]No articles found for {target_date} with score >= {score_min}[/yellow]"
-        )
+    params = [score_min, start_datetime, end_datetime]
+    try:
+        if after:
+            params.extend(decode_cursor(after))
+    except ValueError:
+        console.print("[red]Error:[/red] Invalid --after token.")
         return
+    if page_size:
+        params.append(page_size)
+
+    _stream_articles(
+        articles_query(day=True, after=bool(after), limit=bool(page_size)),
+        params,
+        fmt,
+        f"\n[bold cyan]📅 Daily Digest: {target_date} (Min Score: {score_min})[/bold cyan]\n",
+        f"[yellow]No articles found for {target_date} with score >= {score_min}[/yellow]",
+        show_feed=True,
+        limit=page_size,
+    )
+
+
+@app.command()
+def search(
+    query: str,
+    limit: int = 20,
+    category: str = typer.Option(None, help="Only this category."),
+    feed: str = typer.Option(None, help="Only feeds whose name contains this."),
+    score_min: int = 0,
+    since: str = typer.Option(None, help="Only articles published since YYYY-MM-DD."),
+    fmt: OutputFormat = typer.Option(OutputFormat.rich, "--format"),
+):
+    """Full-text search over stored articles.
+
+    Terms of three or more characters match anywhere, e.g. "sql" finds
+    SQLite. Shorter terms such as AI or 模型 only match whole words or CJK
+    characters; a query of only short terms shows each summary unhighlighted.
+    """
+    from datetime import datetime
+
+    since_date = None
+    if since:
+        try:
+            since_date = datetime.strptime(since, "%Y-%m-%d")
+        except ValueError:
+            console.print("[red]Error:[/red] Invalid date format. Use YYYY-MM-DD")
+            return
+
+    start = time.perf_counter()
+    rows = search_articles(
+        query,
+        limit=limit,
+        category=category,
+        feed=feed,
+        score_min=score_min,
+        since=since_date,
+    )
+    elapsed = time.perf_counter() - start
 
-    console.print(f"\n[bold cyan]📅 Daily Digest: {target_date} (Min Score: {score_min})[/bold cyan]\n")
-    
     for i, row in enumerate(rows, 1):
-        score = row["score"]
-        color = "green" if score >= 8 else "yellow" if score >= 5 else "white"
-        
-        console.print(f"[bold]{i}. [{color}]★ {score}[/{color}][/bold] {row['title']}")
-        console.print(f"   [cyan]分类:[/cyan] {row['category'] or 'N/A'} | [dim]来源:[/dim] {row['feed_name']}")
-        console.print(f"   [dim]理由:[/dim] {row['analysis'] or 'N/A'}")
-        console.print(f"   [blue underline]🔗 {row['link']}[/blue underline]")
-        console.print()
+        snippet = strip_html(row["snippet"])
+        if fmt == OutputFormat.jsonl:
+            item = {key: row[key] for key in row.keys() if key != "rank"}
+            for marker in (HIGHLIGHT_START, HIGHLIGHT_END):
+                snippet = snippet.replace(marker, "")
+            item["snippet"] = snippet
+            sys.stdout.write(json.dumps(item, ensure_ascii=False) + "\n")
+        elif fmt == OutputFormat.plain:
+            _print_article(i, row, fmt, show_feed=True)
+        else:
+            score = row["score"] or 0
+            color = "green" if score >= 8 else "yellow" if score >= 5 else "white"
+            highlighted = (
+                escape(snippet)
+                .replace(HIGHLIGHT_START, "[bold yellow]")
+                .replace(HIGHLIGHT_END, "[/bold yellow]")
+            )
+            console.print(f"[bold]{i}. [{color}]★ {score}[/{color}][/bold] {escape(row['title'] or '')}")
+            console.print(f"   [cyan]分类:[/cyan] {row['category'] or 'N/A'} | [dim]来源:[/dim] {row['feed_name']}")
+            console.print(f"   {highlighted}")
+            console.print(f"   [blue underline]🔗 {row['link']}[/blue underline]")
+            console.print()
 
-    console.print(f"[dim]Total: {len(rows)} articles[/dim]\n")
+    if fmt == OutputFormat.rich:
+        if not rows:
+            console.print(f"[yellow]No articles match '{escape(query)}'[/yellow]")
+        console.print(f"[dim]{len(rows)} results in {elapsed * 1000:.1f}ms[/dim]")
 
 
 @app.command()
-def stats():
+def stats(
+    by: StatsBreakdown = typer.Option(
+        None, "--by", help="Break counts down by feed or category."
+    ),
+    recompute: bool = typer.Option(
+        False, "--recompute", help="Rebuild the summary table from articles."
+    ),
+):
     """Show statistics about feeds and articles."""
+    from datetime import date
+
     with get_db() as conn:
+        if recompute:
+            start = time.perf_counter()
+            conn.execute("BEGIN")
+            rows = rebuild_article_stats(conn)
+            conn.commit()
+            console.print(
+                f"[dim]Recomputed {rows} summary rows in {time.perf_counter() - start:.2f}s[/dim]"
+            )
+
         # Feed stats
         feed_count = conn.execute("SELECT COUNT(*) FROM feeds WHERE is_active=1").fetchone()[0]
-        
-        # Article stats
-        total_articles = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
-        analyzed = conn.execute("SELECT COUNT(*) FROM articles WHERE status='analyzed'").fetchone()[0]
-        pending = conn.execute("SELECT COUNT(*) FROM articles WHERE status='new'").fetchone()[0]
-        
-        # Score distribution
-        high_score = conn.execute("SELECT COUNT(*) FROM articles WHERE score >= 7").fetchone()[0]
-        mid_score = conn.execute("SELECT COUNT(*) FROM articles WHERE score >= 4 AND score < 7").fetchone()[0]
-        low_score = conn.execute("SELECT COUNT(*) FROM articles WHERE score < 4 AND score > 0").fetchone()[0]
-        
-        # Today's articles
-        from datetime import datetime, timedelta
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_count = conn.execute(
-            "SELECT COUNT(*) FROM articles WHERE published >= ?", (today_start,)
-        ).fetchone()[0]
+
+        # Article stats, score distribution and today's articles
+        row = conn.execute(STATS_QUERY, (date.today().isoformat(),)).fetchone()
+
+        breakdown = []
+        if by == StatsBreakdown.feed:
+            breakdown = conn.execute(FEED_STATS_QUERY).fetchall()
+        elif by == StatsBreakdown.category:
+            breakdown = conn.execute(CATEGORY_STATS_QUERY).fetchall()
+
+    total_articles, analyzed, pending = row["total"], row["analyzed"], row["pending"]
+    high_score, mid_score, low_score = row["high_score"], row["mid_score"], row["low_score"]
+    today_count = row["today_count"]
 
     console.print("\n[bold cyan]📊 FeedSense Statistics[/bold cyan]\n")
     
@@ -174,6 +680,10 @@ def stats():
     console.print(f"[bold]Articles:[/bold] {total_articles} total")
     console.print(f"  ├─ ✅ Analyzed: {analyzed}")
     console.print(f"  ├─ ⏳ Pending: {pending}")
+    console.print(f"  ├─ 🔄 Retrying: {row['retrying']}")
+    console.print(f"  ├─ ❌ Failed: {row['errors']}")
+    console.print(f"  ├─ ⏭️ Skipped by pre-filter: {row['skipped']}")
+    console.print(f"  ├─ 🔁 Duplicates: {row['duplicates']}")
     console.print(f"  └─ 📅 Today: {today_count}\n")
     
     console.print(f"[bold]Quality Distribution:[/bold]")
@@ -181,6 +691,23 @@ def stats():
     console.print(f"  ├─ [yellow]Medium (4-6):[/yellow] {mid_score}")
     console.print(f"  └─ [dim]Low (0-3):[/dim] {low_score}\n")
 
+    if by:
+        table = Table(title=f"By {by.value}")
+        table.add_column(by.value.capitalize(), style="cyan")
+        table.add_column("Total", justify="right")
+        table.add_column("Analyzed", justify="right")
+        if by == StatsBreakdown.feed:
+            table.add_column("Pending", justify="right")
+        table.add_column("High (7-10)", justify="right", style="green")
+        table.add_column("Avg score", justify="right")
+        for item in breakdown:
+            cells = [item["label"], str(item["total"]), str(item["analyzed"])]
+            if by == StatsBreakdown.feed:
+                cells.append(str(item["pending"]))
+            cells += [str(item["high_score"]), str(item["avg_score"] or "-")]
+            table.add_row(*cells)
+        console.print(table)
+
 
 if __name__ == "__main__":
     app()
@@ -26,6 +26,111 @@ class Config:
     )
     DB_PATH = Path(__file__).parent.parent / "rss_data.db"
 
+    # Article analysis; a rate limit of 0 disables it
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+    LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+    LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+    LLM_WRITE_BATCH = int(os.getenv("LLM_WRITE_BATCH", "50"))
+    # Articles per request (1 = one request per article) and their token budget
+    LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+    LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "3000"))
+    # Tokens of article text in a single prompt, and per article in a batch
+    LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "800"))
+    LLM_BATCH_ENTRY_TOKENS = int(os.getenv("LLM_BATCH_ENTRY_TOKENS", "200"))
+    # Verdict cache; 0 disables the age or size limit
+    LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+    # Seconds an analyzer may hold claimed articles before others take them
+    LLM_LEASE_SECONDS = int(os.getenv("LLM_LEASE_SECONDS", "600"))
+    # Failed analyses are retried with jittered exponential backoff
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "30"))
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "3600"))
+
+    # Pre-filter skipping articles that are clearly low-value without a request.
+    # Opt-in: once on, low-scoring feeds stop getting LLM verdicts altogether
+    PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Only unambiguous markers by default: bare words such as 推广 or coupon
+    # also appear in ordinary engineering articles
+    PREFILTER_PATTERNS = os.getenv(
+        "PREFILTER_PATTERNS",
+        r"[【\[（(]\s*(广告|推广|赞助|软文|sponsored|sponsor|ad)\s*[】\]）)]"
+        r"|\b(advertorial|sponsored (post|content)|promo code)\b",
+    )
+    # Shorter summary/content (after stripping HTML) is skipped as empty
+    PREFILTER_MIN_TEXT = int(os.getenv("PREFILTER_MIN_TEXT", "1"))
+    PREFILTER_FEED_MAX_AVG = float(os.getenv("PREFILTER_FEED_MAX_AVG", "3"))
+    PREFILTER_FEED_MIN_ANALYZED = int(os.getenv("PREFILTER_FEED_MIN_ANALYZED", "20"))
+    # Classifier: probability of a low score needed to skip (0 disables it)
+    PREFILTER_CONFIDENCE = float(os.getenv("PREFILTER_CONFIDENCE", "0.95"))
+    PREFILTER_MIN_TRAINING = int(os.getenv("PREFILTER_MIN_TRAINING", "200"))
+    PREFILTER_TRAINING_SIZE = int(os.getenv("PREFILTER_TRAINING_SIZE", "5000"))
+    # Share of would-be-skipped articles analyzed anyway to measure agreement
+    PREFILTER_AUDIT_RATE = float(os.getenv("PREFILTER_AUDIT_RATE", "0.05"))
+
+    # Embedding stage: scores estimated from similar analyzed articles, and
+    # categories kept to a fixed set of labels
+    EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # "openai" for the embeddings endpoint at LLM_BASE_URL, or "hashing" (offline)
+    EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-v3")
+    # 0 keeps the model's default size
+    EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "256"))
+    # Storage and index type: int8 or float32
+    EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "int8")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "10"))
+    EMBEDDING_TOKEN_BUDGET = int(os.getenv("EMBEDDING_TOKEN_BUDGET", "300"))
+    EMBEDDING_NEIGHBORS = int(os.getenv("EMBEDDING_NEIGHBORS", "10"))
+    # LLM-analyzed articles needed before estimating, and when an estimate is
+    # trusted: mean neighbour similarity and spread of their scores
+    EMBEDDING_MIN_INDEX = int(os.getenv("EMBEDDING_MIN_INDEX", "500"))
+    EMBEDDING_MIN_SIMILARITY = float(os.getenv("EMBEDDING_MIN_SIMILARITY", "0.8"))
+    EMBEDDING_MAX_SPREAD = float(os.getenv("EMBEDDING_MAX_SPREAD", "1.0"))
+    CATEGORY_LABELS = os.getenv(
+        "CATEGORY_LABELS",
+        "人工智能,编程开发,网络安全,科技新闻,硬件设备,科学研究,商业产业,产品设计,其他",
+    )
+
+    # SQLite connection pool and pragmas
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Negative values are KiB, so the default is a 64 MiB page cache
+    DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-65536"))
+    # zlib level (1-9) for article bodies in article_bodies
+    DB_BODY_COMPRESSION = int(os.getenv("DB_BODY_COMPRESSION", "6"))
+
+    # Feed fetching
+    FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+    FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+    FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "20"))
+    # Feed bodies larger than this (bytes) are spooled to disk and parsed
+    # incrementally instead of in memory
+    FETCH_STREAM_THRESHOLD = int(os.getenv("FETCH_STREAM_THRESHOLD", "2097152"))
+    # Bounds on the adaptive per-feed poll interval (seconds)
+    FETCH_MIN_INTERVAL = float(os.getenv("FETCH_MIN_INTERVAL", "300"))
+    FETCH_MAX_INTERVAL = float(os.getenv("FETCH_MAX_INTERVAL", "86400"))
+    # Seconds between serve status lines
+    SERVE_STATUS_INTERVAL = float(os.getenv("SERVE_STATUS_INTERVAL", "60"))
+    # Prometheus metrics: a directory for node_exporter's textfile collector,
+    # where fetch/analyze/serve write feedsense_<command>.prom, and a port on
+    # which serve answers /metrics. Empty or 0 turns either off
+    METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR", "")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    # Estimated Jaccard similarity above which articles are near-duplicates
+    NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+
     @classmethod
     def validate(cls):
         if not cls.API_KEY or cls.API_KEY.startswith("sk-xxx"):
@@ -1,12 +1,687 @@
+import queue
 import sqlite3
+import threading
+import zlib
 from pathlib import Path
 from contextlib import contextmanager
+from typing import Optional
 from .config import config
+from .profiling import span
+from .utils import cjk_bigrams, normalize_link
 
 
-def init_db():
-    """Initialize the database tables."""
-    conn = sqlite3.connect(config.DB_PATH)
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    """zlib-compressed UTF-8 of an article body, or None when it is empty."""
+    return zlib.compress(text.encode(), config.DB_BODY_COMPRESSION) if text else None
+
+
+def decompress_text(blob: Optional[bytes]) -> Optional[str]:
+    return zlib.decompress(blob).decode() if blob is not None else None
+
+
+def _connect(path) -> sqlite3.Connection:
+    """Open a connection with the configured pragmas applied."""
+    with span("db.connect"):
+        conn = sqlite3.connect(
+            path, timeout=config.DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row  # Access columns by name
+        conn.execute(f"PRAGMA journal_mode={config.DB_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA synchronous={config.DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA mmap_size={int(config.DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size={int(config.DB_CACHE_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+    # Read by the article_text and article_words views behind the search indexes
+    conn.create_function("inflate", 1, decompress_text, deterministic=True)
+    conn.create_function("cjk_bigrams", 1, cjk_bigrams, deterministic=True)
+    return conn
+
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived connections to one database file.
+
+    A connection is used by one thread at a time. When every pooled
+    connection is busy a new one is opened instead of blocking, and
+    connections beyond `size` are closed when released.
+    """
+
+    def __init__(self, path, size: int):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _connect(self.path)
+
+    def release(self, conn: sqlite3.Connection):
+        # Never hand out a connection with someone else's open transaction
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the pool for the currently configured database path."""
+    key = str(config.DB_PATH)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(config.DB_PATH, config.DB_POOL_SIZE)
+                _pools[key] = pool
+    return pool
+
+
+def close_pools():
+    """Close every pooled connection, e.g. before removing a database file."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def _table_columns(cursor, table) -> set:
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+
+def _ensure_columns(cursor, table, columns):
+    """Add any of `columns` (name, declaration) missing from `table`."""
+    existing = _table_columns(cursor, table)
+    for name, declaration in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+
+# Schema migrations
+# Each step runs once per database, in order, inside its own transaction.
+# Steps must also be safe on fresh databases whose CREATE TABLE statements
+# already include the columns they add.
+
+
+def _migrate_feed_validators(conn):
+    """ETag/Last-Modified columns for conditional fetching."""
+    _ensure_columns(conn, "feeds", [("etag", "TEXT"), ("last_modified", "TEXT")])
+
+
+def _migrate_link_keys(conn):
+    """Normalized link keys for deduplication, backfilled for old rows."""
+    _ensure_columns(conn, "articles", [("link_key", "TEXT")])
+    conn.create_function("normalize_link", 1, normalize_link, deterministic=True)
+    conn.execute(
+        "UPDATE articles SET link_key = normalize_link(link) WHERE link_key IS NULL"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_articles_link_key ON articles(link_key)"
+    )
+
+
+def _migrate_query_indexes(conn):
+    """Indexes behind the analyze, report, daily and stats queries."""
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_status_score_published
+        ON articles(status, score DESC, published DESC)
+    """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published)"
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_feed_published
+        ON articles(feed_id, published)
+    """
+    )
+
+
+def _migrate_verdict_cache(conn):
+    """Content-hash cache of LLM verdicts."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            score INTEGER,
+            reason TEXT,
+            category TEXT,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)"
+    )
+
+
+def _migrate_near_duplicates(conn):
+    """MinHash LSH index and cluster leader column for near-duplicates."""
+    _ensure_columns(conn, "articles", [("duplicate_of", "INTEGER")])
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_minhash (
+            article_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL,
+            FOREIGN KEY(article_id) REFERENCES articles(id)
+        )
+    """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_lsh (
+            bucket INTEGER NOT NULL,
+            article_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, article_id)
+        ) WITHOUT ROWID
+    """
+    )
+
+
+# Summary tables and the (name, type, expression) key columns they group
+# articles by; `{row}` in an expression is NEW, OLD or `articles`. Totals
+# are kept apart from per-day counts so the all-time summary stays small
+# however long the history grows.
+STATS_TABLES = {
+    "article_stats": (
+        ("feed_id", "INTEGER", "COALESCE({row}.feed_id, 0)"),
+        ("status", "TEXT", "COALESCE({row}.status, '')"),
+        (
+            "bucket",
+            "TEXT",
+            """CASE
+                WHEN {row}.score >= 7 THEN 'high'
+                WHEN {row}.score >= 4 THEN 'mid'
+                WHEN {row}.score > 0 THEN 'low'
+                ELSE 'none'
+            END""",
+        ),
+        ("category", "TEXT", "COALESCE({row}.category, '')"),
+    ),
+    "article_daily_stats": (
+        ("day", "TEXT", "COALESCE(date({row}.published), '')"),
+        ("feed_id", "INTEGER", "COALESCE({row}.feed_id, 0)"),
+        ("status", "TEXT", "COALESCE({row}.status, '')"),
+    ),
+}
+
+
+def _stats_upsert(table: str, row: str, sign: str) -> str:
+    columns = [name for name, _, _ in STATS_TABLES[table]]
+    keys = [expr.format(row=row) for _, _, expr in STATS_TABLES[table]]
+    return f"""
+            INSERT INTO {table} ({", ".join(columns)}, count, score_sum)
+            VALUES ({", ".join(keys)}, {sign}1, {sign}COALESCE({row}.score, 0))
+            ON CONFLICT ({", ".join(columns)}) DO UPDATE SET
+                count = count + excluded.count,
+                score_sum = score_sum + excluded.score_sum;"""
+
+
+def rebuild_article_stats(conn) -> int:
+    """Recompute the summary tables from `articles`, one aggregated pass
+    each. Returns the number of summary rows written. The caller commits."""
+    written = 0
+    for table, key in STATS_TABLES.items():
+        columns = ", ".join(name for name, _, _ in key)
+        exprs = ", ".join(expr.format(row="articles") for _, _, expr in key)
+        groups = ", ".join(str(i + 1) for i in range(len(key)))
+        conn.execute(f"DELETE FROM {table}")
+        written += conn.execute(
+            f"""
+            INSERT INTO {table} ({columns}, count, score_sum)
+            SELECT {exprs}, COUNT(*), COALESCE(SUM(score), 0)
+            FROM articles
+            GROUP BY {groups}
+        """
+        ).rowcount
+    return written
+
+
+def _migrate_article_stats(conn):
+    """Trigger-maintained article counts by feed, status, score bucket, category and day."""
+    for table, key in STATS_TABLES.items():
+        columns = "".join(f"{name} {type_} NOT NULL, " for name, type_, _ in key)
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {columns}
+                count INTEGER NOT NULL DEFAULT 0,
+                score_sum INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY ({", ".join(name for name, _, _ in key)})
+            ) WITHOUT ROWID
+        """
+        )
+
+    def upserts(row, sign):
+        return "".join(_stats_upsert(table, row, sign) for table in STATS_TABLES)
+
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_article_stats_insert
+        AFTER INSERT ON articles
+        BEGIN{upserts("NEW", "")}
+        END
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_article_stats_delete
+        AFTER DELETE ON articles
+        BEGIN{upserts("OLD", "-")}
+        END
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_article_stats_update
+        AFTER UPDATE OF feed_id, published, status, score, category ON articles
+        BEGIN{upserts("OLD", "-")}{upserts("NEW", "")}
+        END
+    """
+    )
+    # Emptied groups keep a zero row until the next rebuild
+    rebuild_article_stats(conn)
+
+
+# Columns covered by the full-text index, in bm25 weight order
+FTS_COLUMNS = ("title", "summary", "content", "analysis", "category")
+
+
+def _migrate_search_index(conn):
+    """FTS5 trigram index over article text, kept in sync by triggers."""
+    if "content" not in _table_columns(conn, "articles"):
+        # Fresh database: built over article_bodies by _migrate_article_bodies
+        return
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"NEW.{column}" for column in FTS_COLUMNS)
+    old_values = ", ".join(f"OLD.{column}" for column in FTS_COLUMNS)
+    # External content: the index stores no copy of the text, and the
+    # trigram tokenizer matches CJK and space-separated text alike
+    conn.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            {columns},
+            content='articles',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_articles_fts_insert
+        AFTER INSERT ON articles
+        BEGIN
+            INSERT INTO articles_fts (rowid, {columns}) VALUES (NEW.id, {new_values});
+        END
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_articles_fts_delete
+        AFTER DELETE ON articles
+        BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, {columns})
+            VALUES ('delete', OLD.id, {old_values});
+        END
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_articles_fts_update
+        AFTER UPDATE OF {columns} ON articles
+        BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, {columns})
+            VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO articles_fts (rowid, {columns}) VALUES (NEW.id, {new_values});
+        END
+    """
+    )
+    conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+
+def _migrate_feed_schedule(conn):
+    """Per-feed poll schedule with failure and empty-fetch backoff."""
+    _ensure_columns(
+        conn,
+        "feeds",
+        [
+            ("next_fetch_at", "TIMESTAMP"),
+            ("poll_interval", "REAL"),
+            ("fetch_failures", "INTEGER DEFAULT 0"),
+            ("empty_fetches", "INTEGER DEFAULT 0"),
+            ("update_hint", "REAL"),
+        ],
+    )
+
+
+def _migrate_article_leases(conn):
+    """Lease columns for claiming pending articles across analyzer processes."""
+    _ensure_columns(
+        conn,
+        "articles",
+        [("lease_owner", "TEXT"), ("lease_expires", "TIMESTAMP")],
+    )
+    # Unleased rows come first in id order, expired leases form a range
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_claimable
+        ON articles(lease_expires, id) WHERE status = 'new'
+    """
+    )
+
+
+def _migrate_article_retries(conn):
+    """Retry count, backoff time and failure class for failed analyses."""
+    _ensure_columns(
+        conn,
+        "articles",
+        [
+            ("retry_count", "INTEGER DEFAULT 0"),
+            ("next_attempt_at", "TIMESTAMP"),
+            ("last_error", "TEXT"),
+        ],
+    )
+    # Claims move due retries back to 'new' with a range scan
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_retry
+        ON articles(next_attempt_at) WHERE status = 'retry'
+    """
+    )
+
+
+def _migrate_prefilter(conn):
+    """Pre-filter stage that skipped or flagged an article."""
+    _ensure_columns(conn, "articles", [("prefilter", "TEXT")])
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_prefilter
+        ON articles(prefilter, status, score) WHERE prefilter IS NOT NULL
+    """
+    )
+
+
+def _migrate_article_usage(conn):
+    """Prompt/completion tokens and latency of the request that analyzed an article."""
+    _ensure_columns(
+        conn,
+        "articles",
+        [
+            ("prompt_tokens", "INTEGER"),
+            ("completion_tokens", "INTEGER"),
+            ("latency_ms", "INTEGER"),
+        ],
+    )
+
+
+def _create_body_search_index(
+    conn,
+    index="articles_fts",
+    source="article_text",
+    tokenize="trigram",
+    text="{}",
+    deletes_bodies=True,
+):
+    """Search index over articles joined with their decompressed bodies.
+
+    Bodies are stored after their article, so an article is indexed
+    without content first and re-indexed when its body arrives. The index
+    reads the `source` view, which must apply the `text` expression to
+    each column of article_text the way the triggers do.
+
+    The bodies of deleted articles are deleted by the trigger of the index
+    created with `deletes_bodies`; the triggers of other indexes run before
+    the delete, while the body they unindex is still there.
+    """
+    columns = ", ".join(FTS_COLUMNS)
+    bodies = index.replace("articles", "article_bodies")
+    when = "AFTER" if deletes_bodies else "BEFORE"
+    cleanup = (
+        "\n            DELETE FROM article_bodies WHERE article_id = OLD.id;"
+        if deletes_bodies
+        else ""
+    )
+
+    def values(row, content):
+        return ", ".join(
+            text.format(content if column == "content" else f"{row}.{column}")
+            for column in FTS_COLUMNS
+        )
+
+    def body(row):
+        return (
+            f"(SELECT inflate(content) FROM article_bodies WHERE article_id = {row}.id)"
+        )
+
+    def reindex(old_content, new_content):
+        # One article's entry with the given old and new body expressions
+        return f"""
+            INSERT INTO {index} ({index}, rowid, {columns})
+            SELECT 'delete', a.id, {values("a", old_content)}
+            FROM articles a WHERE a.id = {{row}}.article_id;
+            INSERT INTO {index} (rowid, {columns})
+            SELECT a.id, {values("a", new_content)}
+            FROM articles a WHERE a.id = {{row}}.article_id;"""
+
+    conn.execute(
+        """
+        CREATE VIEW IF NOT EXISTS article_text AS
+        SELECT a.id, a.title, a.summary, inflate(b.content) AS content,
+               a.analysis, a.category
+        FROM articles a
+        LEFT JOIN article_bodies b ON b.article_id = a.id
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+            {columns},
+            content='{source}',
+            content_rowid='id',
+            tokenize='{tokenize}'
+        )
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{index}_insert
+        AFTER INSERT ON articles
+        BEGIN
+            INSERT INTO {index} (rowid, {columns})
+            VALUES (NEW.id, {values("NEW", "NULL")});
+        END
+    """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{index}_delete
+        {when} DELETE ON articles
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {columns})
+            VALUES ('delete', OLD.id, {values("OLD", body("OLD"))});{cleanup}
+        END
+    """
+    )
+    indexed = ", ".join(column for column in FTS_COLUMNS if column != "content")
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{index}_update
+        AFTER UPDATE OF {indexed} ON articles
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {columns})
+            VALUES ('delete', OLD.id, {values("OLD", body("OLD"))});
+            INSERT INTO {index} (rowid, {columns})
+            VALUES (NEW.id, {values("NEW", body("NEW"))});
+        END
+    """
+    )
+    for event, old_content, new_content in (
+        ("INSERT", "NULL", "inflate(NEW.content)"),
+        ("UPDATE OF content", "inflate(OLD.content)", "inflate(NEW.content)"),
+        ("DELETE", "inflate(OLD.content)", "NULL"),
+    ):
+        row = "OLD" if event == "DELETE" else "NEW"
+        name = event.split()[0].lower()
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{bodies}_{name}
+            AFTER {event} ON article_bodies
+            BEGIN{reindex(old_content, new_content).format(row=row)}
+            END
+        """
+        )
+    conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+def _migrate_article_bodies(conn):
+    """Article bodies moved to the zlib-compressed article_bodies table."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_bodies (
+            article_id INTEGER PRIMARY KEY,
+            content BLOB NOT NULL,
+            FOREIGN KEY(article_id) REFERENCES articles(id)
+        )
+    """
+    )
+    # The old index reads articles.content, which is about to go
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_articles_fts_{event}")
+    conn.execute("DROP TABLE IF EXISTS articles_fts")
+
+    if "content" in _table_columns(conn, "articles"):
+        rows = conn.execute(
+            "SELECT id, content FROM articles WHERE content IS NOT NULL AND content != ''"
+        )
+        conn.executemany(
+            "INSERT INTO article_bodies (article_id, content) VALUES (?, ?)",
+            ((row[0], compress_text(row[1])) for row in rows),
+        )
+        # Rewrites the table without the bodies; VACUUM returns the space
+        conn.execute("ALTER TABLE articles DROP COLUMN content")
+    _create_body_search_index(conn)
+
+
+def _migrate_word_search_index(conn):
+    """Word and CJK character-pair search index for terms under three characters."""
+    columns = ", ".join(f"cjk_bigrams({column}) AS {column}" for column in FTS_COLUMNS)
+    conn.execute(
+        f"""
+        CREATE VIEW IF NOT EXISTS article_words AS
+        SELECT id, {columns} FROM article_text
+    """
+    )
+    _create_body_search_index(
+        conn,
+        index="articles_words",
+        source="article_words",
+        tokenize="unicode61",
+        text="cjk_bigrams({})",
+        deletes_bodies=False,
+    )
+
+
+def _migrate_embeddings(conn):
+    """Article embeddings and the source of estimated verdicts."""
+    _ensure_columns(conn, "articles", [("scored_by", "TEXT")])
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_embeddings (
+            article_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            FOREIGN KEY(article_id) REFERENCES articles(id)
+        )
+    """
+    )
+
+
+MIGRATIONS = [
+    (1, _migrate_feed_validators),
+    (2, _migrate_link_keys),
+    (3, _migrate_query_indexes),
+    (4, _migrate_verdict_cache),
+    (5, _migrate_near_duplicates),
+    (6, _migrate_article_stats),
+    (7, _migrate_search_index),
+    (8, _migrate_feed_schedule),
+    (9, _migrate_article_leases),
+    (10, _migrate_article_retries),
+    (11, _migrate_prefilter),
+    (12, _migrate_article_usage),
+    (13, _migrate_article_bodies),
+    (14, _migrate_embeddings),
+    (15, _migrate_word_search_index),
+]
+
+
+def get_schema_version(conn) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn) -> list:
+    """Apply pending migrations in order. Returns the versions applied."""
+    conn.execute(
+        """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
+    current = get_schema_version(conn)
+
+    applied = []
+    for version, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN")
+        try:
+            with span("db.migrate"):
+                migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, migrate.__doc__.strip()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+
+def init_db() -> list:
+    """Initialize the database tables and apply pending migrations.
+
+    Returns the migration versions that were applied.
+    """
+    conn = _connect(config.DB_PATH)
     c = conn.cursor()
 
     # Check if tables exist, if not create them
@@ -19,6 +694,13 @@ def init_db():
         name TEXT,
         url TEXT UNIQUE NOT NULL,
         last_fetched TIMESTAMP,
+        etag TEXT,
+        last_modified TEXT,
+        next_fetch_at TIMESTAMP,
+        poll_interval REAL,
+        fetch_failures INTEGER DEFAULT 0,
+        empty_fetches INTEGER DEFAULT 0,
+        update_hint REAL,
         is_active BOOLEAN DEFAULT 1
     )
     """
@@ -27,7 +709,14 @@ def init_db():
     # Table: Articles
     # score: 0-10 integer score from LLM
     # analysis: Text reasoning from LLM
-    # status: 'new', 'analyzed', 'read', 'skipped'
+    # status: 'new', 'analyzed', 'read', 'skipped', 'retry', 'error', 'duplicate'
+    # duplicate_of: cluster leader of a near-duplicate article
+    # lease_owner/lease_expires: analyzer currently working on a 'new' article
+    # retry_count/next_attempt_at/last_error: failed analyses, see 'retry'
+    # prefilter: stage that judged the article low-value, see 'skipped'
+    # prompt_tokens/completion_tokens/latency_ms: share of the analysis request
+    # scored_by: 'knn' for scores estimated from similar articles, else NULL
+    # Bodies are kept compressed in article_bodies, see load_bodies
     c.execute(
         """
     CREATE TABLE IF NOT EXISTS articles (
@@ -35,34 +724,71 @@ def init_db():
         feed_id INTEGER,
         title TEXT,
         link TEXT UNIQUE NOT NULL,
+        link_key TEXT,
         published TIMESTAMP,
         summary TEXT,
-        content TEXT,
-        
         status TEXT DEFAULT 'new',
         score INTEGER DEFAULT 0,
         analysis TEXT,
         category TEXT,
-        
+        duplicate_of INTEGER,
+        lease_owner TEXT,
+        lease_expires TIMESTAMP,
+        retry_count INTEGER DEFAULT 0,
+        next_attempt_at TIMESTAMP,
+        last_error TEXT,
+        prefilter TEXT,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        latency_ms INTEGER,
+        scored_by TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY(feed_id) REFERENCES feeds(id)
     )
     """
     )
-
     conn.commit()
-    conn.close()
+
+    try:
+        return apply_migrations(conn)
+    finally:
+        conn.close()
+
+
+def load_bodies(ids) -> dict:
+    """Decompressed bodies of the given articles, by id. Articles stored
+    without a body are left out."""
+    ids = list(ids)
+    bodies = {}
+    with get_db() as conn, span("db.bodies"):
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            bodies.update(
+                (row[0], decompress_text(row[1]))
+                for row in conn.execute(
+                    f"""
+                    SELECT article_id, content FROM article_bodies
+                    WHERE article_id IN ({",".join("?" * len(chunk))})
+                """,
+                    chunk,
+                )
+            )
+    return bodies
 
 
 @contextmanager
 def get_db():
-    """Context manager for database connection."""
-    conn = sqlite3.connect(config.DB_PATH)
-    conn.row_factory = sqlite3.Row  # Access columns by name
+    """Context manager for a pooled database connection.
+
+    Uncommitted changes are rolled back when the block exits, as they were
+    when each call opened and closed its own connection.
+    """
+    pool = get_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 if __name__ == "__main__":
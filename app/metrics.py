@@ -0,0 +1,306 @@
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from app.config import config
+from app.db import get_db
+
+# Seconds, from a small DB write up to a slow LLM batch
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Read from the trigger-maintained article_stats table (see app.db)
+QUEUE_DEPTH_QUERY = """
+    SELECT status, SUM(count) FROM article_stats
+    WHERE status IN ('new', 'retry')
+    GROUP BY status
+"""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Registry:
+    """Metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """A metric family: one value per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _items(self) -> list:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def value(self, **labels):
+        """Current value for the labels; 0 if never touched."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in self._items()
+        ]
+
+
+class Counter(Metric):
+    """A total that only goes up. Names end in `_total` by convention."""
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("counters cannot decrease")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down, or is read from `function` each time
+    the metrics are rendered."""
+
+    type = "gauge"
+
+    def __init__(self, *args, function=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Returns {label values tuple: value}
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _items(self) -> list:
+        if self.function:
+            return sorted(self.function().items())
+        return super()._items()
+
+
+class Histogram(Metric):
+    """Counts of observations at or below each bucket bound, with their
+    sum, per combination of label values."""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def value(self, **labels):
+        """(observations, sum) for the labels."""
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), ([0], 0.0))
+        return counts[-1], total
+
+    def samples(self) -> list:
+        lines = []
+        for key, (counts, total) in self._items():
+            for bound, count in zip(self.buckets, counts):
+                le = (("le", _format_value(float(bound))),)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                    f"{count}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Write the metrics to `path` for node_exporter's textfile collector,
+    replacing the file atomically so it is never read half-written."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(registry.render())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def export(command: str) -> Optional[Path]:
+    """Write feedsense_<command>.prom into `METRICS_TEXTFILE_DIR`, if set."""
+    if not config.METRICS_TEXTFILE_DIR:
+        return None
+    path = Path(config.METRICS_TEXTFILE_DIR) / f"feedsense_{command}.prom"
+    write_textfile(path)
+    return path
+
+
+def serve(port: int, host: str = "127.0.0.1", registry=REGISTRY):
+    """Serve the metrics at http://host:port/metrics from a daemon thread.
+    Returns the server; call `shutdown` on it to stop."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def _queue_depth() -> dict:
+    try:
+        with get_db() as conn:
+            counts = dict(conn.execute(QUEUE_DEPTH_QUERY).fetchall())
+    except sqlite3.Error:
+        # Not initialized yet
+        return {}
+    return {(status,): counts.get(status) or 0 for status in ("new", "retry")}
+
+
+FETCH_SECONDS = Histogram(
+    "feedsense_fetch_duration_seconds",
+    "Time to download and parse a feed.",
+    ["feed"],
+)
+FETCHES = Counter(
+    "feedsense_fetches_total",
+    "Feed fetches by outcome: ok, not_modified or error.",
+    ["feed", "outcome"],
+)
+FETCH_BYTES = Counter(
+    "feedsense_fetch_bytes_total", "Bytes of feed bodies downloaded.", ["feed"]
+)
+ENTRIES_PARSED = Counter(
+    "feedsense_entries_parsed_total", "Feed entries read while storing.", ["feed"]
+)
+ENTRIES_INSERTED = Counter(
+    "feedsense_entries_inserted_total", "New articles stored.", ["feed"]
+)
+DB_WRITE_SECONDS = Histogram(
+    "feedsense_db_write_seconds",
+    "Time spent in write transactions: articles for new entries, verdicts "
+    "for analysis results.",
+    ["operation"],
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "feedsense_llm_request_duration_seconds",
+    "Latency of successful chat completions, single or batch prompts.",
+    ["mode"],
+)
+LLM_TOKENS = Counter(
+    "feedsense_llm_tokens_total",
+    "Tokens used by chat completions.",
+    ["mode", "kind"],
+)
+LLM_ERRORS = Counter(
+    "feedsense_llm_errors_total",
+    "Failed analysis requests by failure class.",
+    ["kind"],
+)
+ARTICLES = Counter(
+    "feedsense_articles_processed_total",
+    "Articles by analysis outcome.",
+    ["outcome"],
+)
+QUEUE_DEPTH = Gauge(
+    "feedsense_queue_depth",
+    "Articles waiting for analysis: new, or retry after a failure.",
+    ["status"],
+    function=_queue_depth,
+)
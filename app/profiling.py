@@ -0,0 +1,245 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+# Returned by `span` while nothing is profiling, so spans in hot loops cost
+# one global lookup
+_NO_SPAN = nullcontext()
+
+_active: Optional["Profiler"] = None
+
+# From 3.12 cProfile hooks every thread through sys.monitoring, and only one
+# profiler may be active per process; before, each thread needs its own
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+@dataclass
+class Span:
+    name: str
+    thread: int
+    thread_name: str
+    depth: int
+    # Seconds since the profiler started, and seconds spent in nested spans
+    start: float
+    duration: float
+    children: float
+
+    @property
+    def self_time(self) -> float:
+        return self.duration - self.children
+
+
+@dataclass
+class Stage:
+    """Totals of the spans sharing a name."""
+
+    name: str
+    calls: int = 0
+    total: float = 0.0
+    # Excluding time in nested spans, so stages add up without overlap
+    self_time: float = 0.0
+
+
+class _Recorder:
+    """Context manager timing one span on the current thread."""
+
+    __slots__ = ("profiler", "name", "start", "children")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.children = 0.0
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        thread = threading.current_thread()
+        self.profiler.spans.append(
+            Span(
+                self.name,
+                thread.ident,
+                thread.name,
+                len(stack),
+                self.start - self.profiler.started,
+                duration,
+                self.children,
+            )
+        )
+
+
+class Profiler:
+    """Collects the spans of every thread, and with `cprofile` a cProfile
+    profile of the calling thread and every thread started meanwhile."""
+
+    def __init__(self, cprofile: bool = False):
+        self.cprofile = cprofile
+        self.spans = []
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._local = threading.local()
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def span(self, name: str) -> _Recorder:
+        return _Recorder(self, name)
+
+    def _profile_thread(self, frame, event, arg):
+        # Installed with threading.setprofile before 3.12: runs once in each
+        # new thread, and enabling a profile there replaces this hook
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler, e.g. a debugger's, is active; go without
+            # rather than fail the thread
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def start(self) -> "Profiler":
+        self.started = time.perf_counter()
+        if self.cprofile:
+            self._profile_thread(None, None, None)
+            if not PROCESS_WIDE_CPROFILE:
+                threading.setprofile(self._profile_thread)
+        return self
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self.cprofile:
+            if not PROCESS_WIDE_CPROFILE:
+                threading.setprofile(None)
+            with self._lock:
+                profiles = list(self._profiles)
+            for profile in profiles:
+                profile.disable()
+
+    def stages(self) -> list:
+        """Totals per span name, most self time first."""
+        stages = {}
+        for span in self.spans:
+            stage = stages.setdefault(span.name, Stage(span.name))
+            stage.calls += 1
+            stage.total += span.duration
+            stage.self_time += span.self_time
+        return sorted(stages.values(), key=lambda s: s.self_time, reverse=True)
+
+    def unaccounted(self) -> float:
+        """Seconds of the main thread spent outside any span."""
+        main = threading.main_thread().ident
+        spanned = sum(
+            span.duration
+            for span in self.spans
+            if span.thread == main and not span.depth
+        )
+        return max(0.0, self.elapsed - spanned)
+
+    def write_chrome_trace(self, path):
+        """Write the spans in the Trace Event format, for chrome://tracing
+        or https://ui.perfetto.dev."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": thread,
+                "args": {"name": name},
+            }
+            for thread, name in {(s.thread, s.thread_name) for s in self.spans}
+        ]
+        events.extend(
+            {
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "pid": pid,
+                "tid": span.thread,
+                "ts": round(span.start * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+            }
+            for span in self.spans
+        )
+        Path(path).write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        )
+
+    def write_pstats(self, path):
+        """Write the cProfile profiles of all threads, merged, for `pstats`
+        or snakeviz."""
+        import pstats
+
+        stats = None
+        for profile in self._profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # A thread that ran no Python code has nothing to add
+                continue
+        if stats is None:
+            raise ValueError("no cProfile data was recorded")
+        stats.dump_stats(path)
+
+    def write(self, path):
+        """Chrome trace for a `.json` path, pstats otherwise."""
+        if Path(path).suffix == ".json":
+            self.write_chrome_trace(path)
+        else:
+            self.write_pstats(path)
+
+
+def span(name: str):
+    """Time a stage of work while profiling is on:
+
+        with span("fetch.parse"):
+            feed = feedparser.parse(body)
+
+    Stage names are `<area>.<stage>`. Does nothing when not profiling.
+    """
+    profiler = _active
+    if profiler is None:
+        return _NO_SPAN
+    return profiler.span(name)
+
+
+def start(cprofile: bool = False) -> Profiler:
+    """Start recording spans from every thread until `stop`."""
+    global _active
+    _active = Profiler(cprofile).start()
+    return _active
+
+
+def stop() -> Optional[Profiler]:
+    """Stop recording and return the profiler, if one was started."""
+    global _active
+    profiler, _active = _active, None
+    if profiler:
+        profiler.stop()
+    return profiler
@@ -0,0 +1,72 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second.
+
+    `acquire` blocks until enough tokens are available. Requests larger than
+    the bucket are clamped to its capacity so they cannot wait forever.
+    """
+
+    def __init__(
+        self, capacity: float, rate: float, clock=time.monotonic, sleep=time.sleep
+    ):
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for an API.
+
+    A limit of 0 or None disables that bucket. `pause` holds back every
+    caller for a while, e.g. after the API answered 429.
+    """
+
+    def __init__(self, rpm=None, tpm=None, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(rpm, rpm / 60, clock, sleep) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60, clock, sleep) if tpm else None
+        self._clock = clock
+        self._sleep = sleep
+        self._resume_at = clock()
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float):
+        """Let no request through for the next `seconds`."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+    def acquire(self, tokens: int = 0):
+        while True:
+            with self._lock:
+                wait = self._resume_at - self._clock()
+            if wait <= 0:
+                break
+            self._sleep(wait)
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
@@ -0,0 +1,126 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import config
+from app.db import get_db
+from app.utils import normalize_text
+
+# Bump whenever the prompts in app.services.llm change so cached verdicts are
+# not reused. Kept here so the `cache` command needs no LLM client imports.
+PROMPT_VERSION = "2"
+
+
+class VerdictCache:
+    """SQLite-backed cache of LLM verdicts keyed by article content.
+
+    Keys hash the normalized title and the article text sent in the prompt
+    together with `namespace` (model name and prompt version), so copies
+    of a story under different links share one verdict while prompt or
+    model changes start afresh.
+    """
+
+    def __init__(self, namespace: str, ttl_days=None, max_entries=None):
+        self.namespace = namespace
+        self.ttl_days = config.LLM_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        self.max_entries = (
+            config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, title: str, text: str) -> str:
+        parts = (self.namespace, normalize_text(title), normalize_text(text))
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _cutoff(self) -> datetime:
+        if not self.ttl_days:
+            return datetime.min
+        return datetime.now() - timedelta(days=self.ttl_days)
+
+    def get(self, title: str, text: str) -> Optional[dict]:
+        """Return the cached verdict fields, or None on a miss."""
+        key = self.key(title, text)
+        with get_db() as conn:
+            row = conn.execute(
+                """
+                SELECT score, reason, category FROM llm_cache
+                WHERE key=? AND created_at >= ?
+            """,
+                (key, self._cutoff()),
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE llm_cache SET hits=hits+1, last_used=? WHERE key=?",
+                    (datetime.now(), key),
+                )
+                conn.commit()
+
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not row:
+            return None
+        return {
+            "score": row["score"],
+            "reason": row["reason"],
+            "category": row["category"],
+        }
+
+    def put(self, title: str, text: str, score: int, reason: str, category: str):
+        now = datetime.now()
+        with get_db() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache
+                    (key, score, reason, category, hits, created_at, last_used)
+                VALUES (?, ?, ?, ?, 0, ?, ?)
+            """,
+                (self.key(title, text), score, reason, category, now, now),
+            )
+            conn.commit()
+
+    def evict(self) -> int:
+        """Drop expired entries and the least recently used ones beyond
+        `max_entries`. Returns the number of entries removed."""
+        with get_db() as conn:
+            removed = 0
+            if self.ttl_days:
+                removed += conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?", (self._cutoff(),)
+                ).rowcount
+            if self.max_entries:
+                removed += conn.execute(
+                    """
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache
+                        ORDER BY last_used DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                """,
+                    (self.max_entries,),
+                ).rowcount
+            conn.commit()
+        return removed
+
+    def purge(self) -> int:
+        """Remove every cached verdict."""
+        with get_db() as conn:
+            removed = conn.execute("DELETE FROM llm_cache").rowcount
+            conn.commit()
+        return removed
+
+    def info(self) -> dict:
+        """Entry count, lifetime hits and age range of the stored verdicts."""
+        with get_db() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS entries,
+                       COALESCE(SUM(hits), 0) AS hits,
+                       MIN(created_at) AS oldest,
+                       MAX(created_at) AS newest
+                FROM llm_cache
+            """).fetchone()
+        return dict(row)
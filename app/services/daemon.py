@@ -0,0 +1,268 @@
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from app import metrics
+from app.config import config
+from app.db import get_db
+from app.ratelimit import RateLimiter
+from app.services.workqueue import WorkQueue
+from rich.console import Console
+
+console = Console()
+
+# Seconds between verdict cache evictions and pre-filter retraining
+EVICT_INTERVAL = 3600
+
+PENDING_IDS_QUERY = "SELECT id FROM articles WHERE status='new' ORDER BY id"
+
+
+@dataclass
+class DaemonStats:
+    """Running totals for one `serve` session."""
+
+    fetch_rounds: int = 0
+    feeds_fetched: int = 0
+    fetch_errors: int = 0
+    enqueued: int = 0
+    analyzed: int = 0
+    analysis_errors: int = 0
+    # Failed analyses scheduled for another attempt
+    retried: int = 0
+    # Time the last analyzed chunk spent waiting in the queue
+    last_lag: float = 0.0
+
+
+class Daemon:
+    """Keeps fetching feeds and analyzing new articles in one process.
+
+    The main loop fetches feeds as they fall due on the schedule kept by
+    `RSSService`, and puts the ids of new articles on an in-process queue.
+    An analyzer thread drains the queue in chunks, leasing them through a
+    `WorkQueue` so that `analyze` processes running alongside skip them,
+    and analyzes them with `LLMService.analyze_articles`. Runs until `stop`
+    is called or SIGTERM/SIGINT arrives; articles still queued then keep
+    status 'new' and are queued again on the next start.
+    """
+
+    def __init__(
+        self,
+        rss,
+        llm,
+        concurrency=None,
+        batch_size=None,
+        rpm=None,
+        tpm=None,
+        status_interval=None,
+    ):
+        self.rss = rss
+        self.llm = llm
+        self.concurrency = concurrency or config.LLM_CONCURRENCY
+        self.batch_size = batch_size or config.LLM_BATCH_SIZE
+        self.limiter = RateLimiter(
+            rpm=config.LLM_RPM if rpm is None else rpm,
+            tpm=config.LLM_TPM if tpm is None else tpm,
+        )
+        self.status_interval = status_interval or config.SERVE_STATUS_INTERVAL
+
+        self.queue = queue.Queue()
+        self.leases = WorkQueue()
+        self.stats = DaemonStats()
+        self._stop = threading.Event()
+        self._last_evict = time.monotonic()
+
+    def poll(self) -> int:
+        """Fetch due feeds and queue their new articles. Returns the number
+        of feeds fetched."""
+        due = self.rss.due_feeds()
+        if not due:
+            return 0
+
+        self.rss.fetch_feeds(due, on_result=self._on_fetched)
+        self.stats.fetch_rounds += 1
+        self.stats.feeds_fetched += len(due)
+        return len(due)
+
+    def _on_fetched(self, result):
+        if result.error:
+            self.stats.fetch_errors += 1
+        self.enqueue(result.new_ids)
+
+    def enqueue(self, article_ids):
+        now = time.monotonic()
+        for article_id in article_ids:
+            self.queue.put((article_id, now))
+        self.stats.enqueued += len(article_ids)
+
+    def enqueue_backlog(self) -> int:
+        """Queue every article left pending by earlier runs."""
+        with get_db() as conn:
+            ids = [row[0] for row in conn.execute(PENDING_IDS_QUERY)]
+        self.enqueue(ids)
+        return len(ids)
+
+    def enqueue_due_retries(self) -> int:
+        """Queue failed articles whose retry backoff has passed."""
+        ids = self.leases.requeue_due()
+        self.enqueue(ids)
+        return len(ids)
+
+    def enqueue_reclaimed(self) -> int:
+        """Queue articles whose lease expired, e.g. after the process
+        holding it crashed; claiming by id never takes them over."""
+        ids = self.leases.reclaim_expired()
+        self.enqueue(ids)
+        return len(ids)
+
+    def queue_lag(self) -> float:
+        """Seconds the oldest queued article has been waiting."""
+        with self.queue.mutex:
+            if not self.queue.queue:
+                return 0.0
+            return time.monotonic() - self.queue.queue[0][1]
+
+    def analyze_next(self, timeout: float = 1.0) -> int:
+        """Analyze the next chunk of queued articles, waiting up to
+        `timeout` for the first one. Returns the number analyzed."""
+        try:
+            items = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return 0
+        chunk = max(config.LLM_WRITE_BATCH, self.concurrency * self.batch_size)
+        while len(items) < chunk:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self.stats.last_lag = time.monotonic() - items[0][1]
+        # Articles analyzed or leased meanwhile by someone else are skipped
+        articles = self.leases.claim_ids(article_id for article_id, _ in items)
+        if not articles:
+            return 0
+
+        try:
+            result = self.llm.analyze_articles(
+                articles, self.limiter, self.concurrency, self.batch_size, self.leases
+            )
+        finally:
+            self.leases.release(row["id"] for row in articles)
+        # Stand-ins for failed cluster leaders
+        self.enqueue(result.promoted)
+        self.stats.analyzed += result.analyzed
+        self.stats.analysis_errors += result.errors
+        self.stats.retried += result.retried
+
+        if time.monotonic() - self._last_evict >= EVICT_INTERVAL:
+            self.llm.cache.evict()
+            if self.llm.prefilter:
+                self.llm.prefilter.refresh()
+            if self.llm.semantic:
+                self.llm.semantic.refresh()
+            self._last_evict = time.monotonic()
+        return result.analyzed
+
+    def _analyze_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.analyze_next()
+            except Exception as e:
+                console.print(f"[red]Analysis failed:[/red] {e}")
+                self._stop.wait(1.0)
+
+    def seconds_until_due(self) -> float:
+        next_due = self.rss.next_due()
+        if next_due is None:
+            return 0.0
+        return max(0.0, (next_due - datetime.now()).total_seconds())
+
+    def status(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_lag": self.queue_lag(),
+            "last_lag": self.stats.last_lag,
+            "next_fetch": self.seconds_until_due(),
+            "feeds_fetched": self.stats.feeds_fetched,
+            "fetch_errors": self.stats.fetch_errors,
+            "enqueued": self.stats.enqueued,
+            "analyzed": self.stats.analyzed,
+            "analysis_errors": self.stats.analysis_errors,
+            "retried": self.stats.retried,
+        }
+
+    def print_status(self):
+        s = self.status()
+        console.print(
+            f"[dim]{datetime.now():%H:%M:%S} Queue: {s['queue_depth']} "
+            f"(oldest {s['queue_lag']:.1f}s, last lag {s['last_lag']:.1f}s) | "
+            f"Analyzed: {s['analyzed']} | Errors: {s['analysis_errors']} | "
+            f"Retries scheduled: {s['retried']} | "
+            f"Feeds fetched: {s['feeds_fetched']} ({s['fetch_errors']} failed) | "
+            f"Next fetch in {s['next_fetch']:.0f}s[/dim]"
+        )
+
+    def stop(self):
+        self._stop.set()
+
+    def _handle_signal(self, signum, frame):
+        console.print(
+            f"[yellow]Received {signal.Signals(signum).name}, shutting down...[/yellow]"
+        )
+        self.stop()
+
+    def run(self):
+        """Run until stopped. Signal handlers are only installed when
+        called from the main thread."""
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                handlers[signum] = signal.signal(signum, self._handle_signal)
+
+        if self.llm.prefilter:
+            self.llm.prefilter.refresh()
+        if self.llm.semantic:
+            self.llm.semantic.refresh()
+        backlog = self.enqueue_backlog()
+        console.print(f"Serving; {backlog} pending articles queued.")
+        server = None
+        if config.METRICS_PORT:
+            server = metrics.serve(config.METRICS_PORT, config.METRICS_HOST)
+            console.print(
+                f"Metrics at http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics"
+            )
+        worker = threading.Thread(
+            target=self._analyze_loop, name="analyzer", daemon=True
+        )
+        worker.start()
+        last_status = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                    self.enqueue_due_retries()
+                    self.enqueue_reclaimed()
+                except Exception as e:
+                    console.print(f"[red]Fetch round failed:[/red] {e}")
+
+                now = time.monotonic()
+                if now - last_status >= self.status_interval:
+                    self.print_status()
+                    metrics.export("serve")
+                    last_status = now
+                # Feeds added meanwhile are noticed within a status interval
+                self._stop.wait(
+                    min(max(self.seconds_until_due(), 1.0), self.status_interval)
+                )
+        finally:
+            self._stop.set()
+            # The analyzer finishes and stores its current chunk first
+            worker.join()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+            if server:
+                server.shutdown()
+                server.server_close()
+            self.print_status()
+            metrics.export("serve")
@@ -0,0 +1,116 @@
+import hashlib
+import random
+from array import array
+from typing import Optional
+from app.config import config
+from app.utils import normalize_text
+
+# MinHash over character 3-grams, which work for CJK and space-separated
+# languages alike. Signatures of 32 values are split into 8 LSH bands of 4
+# rows: a stored article becomes a candidate when any band matches exactly,
+# which happens for 89% of pairs at Jaccard 0.7 and 98.5% at 0.8, but for
+# roughly 1 in 20,000 unrelated articles, so lookups stay cheap at 1M+ rows.
+NUM_PERMUTATIONS = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+# Too little text gives unreliable signatures; long tails add nothing
+MIN_TEXT_LENGTH = 40
+MAX_TEXT_LENGTH = 1000
+
+_PRIME = (1 << 61) - 1
+_MASK32 = (1 << 32) - 1
+# Fixed seed: signatures are persisted and must be stable across runs
+_rng = random.Random(20240101)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def minhash(text: str) -> Optional[list]:
+    """MinHash signature of the normalized text.
+
+    Returns None when there is too little text to fingerprint reliably.
+    """
+    text = normalize_text(text)[:MAX_TEXT_LENGTH]
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+
+    hashes = [
+        int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for shingle in {
+            text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)
+        }
+    ]
+    return [
+        min((a * h + b) % _PRIME for h in hashes) & _MASK32 for a, b in _PERMUTATIONS
+    ]
+
+
+def similarity(a: list, b: list) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def buckets(signature: list) -> list:
+    """One LSH bucket id per band, as signed 64-bit ints for SQLite."""
+    result = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(
+            array("I", [band, *rows]).tobytes(), digest_size=8
+        ).digest()
+        result.append(int.from_bytes(digest, "big", signed=True))
+    return result
+
+
+def pack(signature: list) -> bytes:
+    return array("I", signature).tobytes()
+
+
+def unpack(blob: bytes) -> list:
+    return array("I", blob).tolist()
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash LSH index over stored articles.
+
+    `article_minhash` keeps each article's signature and `article_lsh` maps
+    band buckets to articles; both are updated as articles are inserted.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = config.NEAR_DUP_THRESHOLD if threshold is None else threshold
+
+    def find_leader(self, conn, signature: list) -> Optional[int]:
+        """Return the cluster leader of the most similar stored article."""
+        placeholders = ",".join("?" * BANDS)
+        best = None
+        for row in conn.execute(
+            f"""
+            SELECT m.article_id, m.signature, a.duplicate_of
+            FROM article_minhash m
+            JOIN articles a ON a.id = m.article_id
+            WHERE m.article_id IN (
+                SELECT article_id FROM article_lsh WHERE bucket IN ({placeholders})
+            )
+        """,
+            buckets(signature),
+        ):
+            score = similarity(signature, unpack(row["signature"]))
+            if score >= self.threshold and (best is None or score > best[0]):
+                best = (score, row["duplicate_of"] or row["article_id"])
+        return best[1] if best else None
+
+    def add(self, conn, article_id: int, signature: list):
+        conn.execute(
+            "INSERT OR REPLACE INTO article_minhash (article_id, signature) VALUES (?, ?)",
+            (article_id, pack(signature)),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO article_lsh (bucket, article_id) VALUES (?, ?)",
+            [(bucket, article_id) for bucket in buckets(signature)],
+        )
@@ -0,0 +1,413 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from app.config import config
+from app.db import get_db
+from app.services.prefilter import tokenize
+from app.utils import clean_text, truncate_tokens
+
+# Estimates are stored with this in articles.scored_by; LLM verdicts have NULL
+KNN = "knn"
+
+# Rows scored per block in `VectorIndex.search`, bounding the float32 copy
+SEARCH_BLOCK = 8192
+# int8 vectors are unit vectors scaled to this range
+INT8_SCALE = 127.0
+
+# Neighbours: LLM verdicts only, so estimates never feed on estimates
+NEIGHBORS_QUERY = """
+    SELECT e.article_id, e.dtype, e.vector, a.score, a.category
+    FROM article_embeddings e
+    JOIN articles a ON a.id = e.article_id
+    WHERE e.model = ? AND a.status = 'analyzed' AND a.scored_by IS NULL
+        AND a.score IS NOT NULL
+    ORDER BY e.article_id
+"""
+STORED_QUERY = """
+    SELECT article_id, dtype, vector FROM article_embeddings
+    WHERE model = ? AND article_id IN ({placeholders})
+"""
+STORE_QUERY = """
+    INSERT OR REPLACE INTO article_embeddings (article_id, model, dtype, vector)
+    VALUES (?, ?, ?, ?)
+"""
+# Analyzed articles without a vector, for `backfill`
+UNEMBEDDED_QUERY = """
+    SELECT a.id, a.title, a.summary, a.category FROM articles a
+    WHERE a.status = 'analyzed' AND a.id > ? AND NOT EXISTS (
+        SELECT 1 FROM article_embeddings e
+        WHERE e.article_id = a.id AND e.model = ?
+    )
+    ORDER BY a.id
+    LIMIT ?
+"""
+
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length, as float32."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def encode(vector: np.ndarray, dtype: str) -> bytes:
+    """Compact storage form of a unit vector."""
+    if dtype == "int8":
+        return np.rint(vector * INT8_SCALE).astype(np.int8).tobytes()
+    return vector.astype(np.float32).tobytes()
+
+
+def decode(blobs, dtype: str) -> np.ndarray:
+    """Stored vectors of one dtype as a float32 matrix."""
+    matrix = np.frombuffer(b"".join(blobs), dtype=np.dtype(dtype))
+    matrix = matrix.reshape(len(blobs), -1).astype(np.float32)
+    return matrix / INT8_SCALE if dtype == "int8" else matrix
+
+
+def embedding_text(article) -> str:
+    """Title and cleaned summary, cut to `EMBEDDING_TOKEN_BUDGET` tokens."""
+    summary = clean_text(article["summary"] or "")
+    text = f"{article['title'] or ''}\n{summary}"
+    return truncate_tokens(text, config.EMBEDDING_TOKEN_BUDGET)
+
+
+class HashingEmbedder:
+    """Offline embedder: signed feature hashing of words and CJK bigrams.
+
+    Similar only where texts share words, so estimates are cruder than with
+    a real model, but it needs no endpoint. Also what the tests use.
+    """
+
+    def __init__(self, dimensions=None):
+        self.dimensions = dimensions or config.EMBEDDING_DIMENSIONS or 256
+        self.name = f"hashing:{self.dimensions}"
+
+    def embed(self, texts) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value >> 63 else -1.0
+                vectors[row, value % self.dimensions] += sign
+        return normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeddings from an OpenAI-compatible `/embeddings` endpoint."""
+
+    def __init__(self, client, model=None, dimensions=None):
+        self.client = client
+        self.model = model or config.EMBEDDING_MODEL
+        self.dimensions = (
+            config.EMBEDDING_DIMENSIONS if dimensions is None else dimensions
+        )
+        self.name = f"{self.model}:{self.dimensions or 'default'}"
+
+    def embed(self, texts) -> np.ndarray:
+        vectors = []
+        size = max(1, config.EMBEDDING_BATCH_SIZE)
+        extra = {"dimensions": self.dimensions} if self.dimensions else {}
+        for i in range(0, len(texts), size):
+            response = self.client.embeddings.create(
+                model=self.model, input=list(texts[i : i + size]), **extra
+            )
+            data = sorted(response.data, key=lambda item: item.index)
+            vectors.extend(item.embedding for item in data)
+        return normalize(vectors)
+
+
+def make_embedder(client):
+    if config.EMBEDDING_PROVIDER == "hashing":
+        return HashingEmbedder()
+    return OpenAIEmbedder(client)
+
+
+@dataclass
+class Estimate:
+    """Score predicted from the nearest analyzed articles."""
+
+    score: int
+    # Similarity-weighted standard deviation of the neighbours' scores
+    spread: float
+    similarity: float
+
+    @property
+    def confident(self) -> bool:
+        return (
+            self.similarity >= config.EMBEDDING_MIN_SIMILARITY
+            and self.spread <= config.EMBEDDING_MAX_SPREAD
+        )
+
+
+class VectorIndex:
+    """Unit vectors of LLM-analyzed articles with their scores and
+    categories, in arrays that grow by doubling.
+
+    Vectors are kept in their stored dtype, so an int8 index takes a
+    quarter of the memory; `search` converts a block at a time.
+    """
+
+    def __init__(self, dtype: str = "int8"):
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = None
+        self.scores = np.empty(0, dtype=np.float32)
+        self.categories = []
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed: int, dimensions: int):
+        capacity = len(self.ids)
+        if self.size + needed <= capacity:
+            return
+        capacity = max(self.size + needed, capacity * 2, 1024)
+        vectors = np.empty((capacity, dimensions), dtype=self.dtype)
+        ids = np.empty(capacity, dtype=np.int64)
+        scores = np.empty(capacity, dtype=np.float32)
+        if self.size:
+            vectors[: self.size] = self.vectors[: self.size]
+            ids[: self.size] = self.ids[: self.size]
+            scores[: self.size] = self.scores[: self.size]
+        self.vectors, self.ids, self.scores = vectors, ids, scores
+
+    def add(self, ids, vectors: np.ndarray, scores, categories):
+        vectors = np.atleast_2d(vectors)
+        if not len(vectors):
+            return
+        if self.vectors is not None and vectors.shape[1] != self.vectors.shape[1]:
+            raise ValueError("vector dimensions do not match the index")
+        self._grow(len(vectors), vectors.shape[1])
+        end = self.size + len(vectors)
+        if self.dtype == np.int8:
+            vectors = np.rint(vectors * INT8_SCALE)
+        self.vectors[self.size : end] = vectors
+        self.ids[self.size : end] = ids
+        self.scores[self.size : end] = scores
+        self.categories.extend(categories)
+        self.size = end
+
+    def search(self, queries: np.ndarray, k: int) -> tuple:
+        """Cosine similarities and positions of the `k` nearest vectors to
+        each query, nearest first."""
+        queries = np.atleast_2d(queries).astype(np.float32)
+        k = min(k, self.size)
+        if not k:
+            empty = np.empty((len(queries), 0))
+            return empty, empty.astype(np.int64)
+
+        scale = 1 / INT8_SCALE if self.dtype == np.int8 else 1.0
+        best_sims = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.size, SEARCH_BLOCK):
+            block = self.vectors[start : min(start + SEARCH_BLOCK, self.size)]
+            sims = queries @ (block.T.astype(np.float32) * scale)
+            rows = np.broadcast_to(np.arange(start, start + len(block)), sims.shape)
+            sims = np.concatenate([best_sims, sims], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            best_sims = np.take_along_axis(sims, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+
+        order = np.argsort(-best_sims, axis=1)
+        return (
+            np.take_along_axis(best_sims, order, axis=1),
+            np.take_along_axis(best_rows, order, axis=1),
+        )
+
+    def estimate(self, queries: np.ndarray, k: int) -> list:
+        """Similarity-weighted mean score of each query's neighbours."""
+        sims, rows = self.search(queries, k)
+        estimates = []
+        for query_sims, query_rows in zip(sims, rows):
+            if not len(query_rows):
+                estimates.append(None)
+                continue
+            weights = np.clip(query_sims, 1e-6, None)
+            scores = self.scores[query_rows]
+            mean = float(np.average(scores, weights=weights))
+            spread = float(np.sqrt(np.average((scores - mean) ** 2, weights=weights)))
+            estimates.append(Estimate(round(mean), spread, float(query_sims.mean())))
+        return estimates
+
+
+class CategoryLabels:
+    """Maps categories onto the fixed `CATEGORY_LABELS`.
+
+    Free-text categories from the LLM go to the label whose embedding is
+    nearest. Articles without one go to the nearest cluster centroid, the
+    mean vector of the analyzed articles carrying each label; labels with
+    no articles yet fall back to their own embedding.
+    """
+
+    def __init__(self, embedder, labels=None):
+        labels = config.CATEGORY_LABELS if labels is None else labels
+        self.embedder = embedder
+        self.labels = [label.strip() for label in labels.split(",") if label.strip()]
+        self._label_vectors = None
+        self.centroids = None
+        self._known = {label: label for label in self.labels}
+        self._lock = threading.Lock()
+
+    def label_vectors(self) -> np.ndarray:
+        if self._label_vectors is None:
+            self._label_vectors = self.embedder.embed(self.labels)
+        return self._label_vectors
+
+    def canonical(self, categories) -> list:
+        """Labels for free-text categories; unseen ones take one request."""
+        with self._lock:
+            unseen = sorted({c for c in categories if c and c not in self._known})
+            if unseen:
+                sims = self.embedder.embed(unseen) @ self.label_vectors().T
+                for category, row in zip(unseen, sims):
+                    self._known[category] = self.labels[int(row.argmax())]
+            return [self._known.get(c) if c else None for c in categories]
+
+    def fit(self, index: VectorIndex):
+        """Recompute the centroids from the articles in `index`."""
+        centroids = self.label_vectors().copy()
+        if index.size:
+            positions = {label: i for i, label in enumerate(self.labels)}
+            assigned = np.array(
+                [positions.get(c, -1) for c in index.categories], dtype=np.int64
+            )
+            scale = 1 / INT8_SCALE if index.dtype == np.int8 else 1.0
+            vectors = index.vectors[: index.size].astype(np.float32) * scale
+            for i in range(len(self.labels)):
+                members = assigned == i
+                if members.any():
+                    centroids[i] = vectors[members].mean(axis=0)
+        self.centroids = normalize(centroids)
+        return self
+
+    def nearest(self, vectors: np.ndarray) -> list:
+        """Label of the nearest centroid to each vector."""
+        if self.centroids is None:
+            self.fit(VectorIndex())
+        sims = np.atleast_2d(vectors) @ self.centroids.T
+        return [self.labels[int(i)] for i in sims.argmax(axis=1)]
+
+
+class SemanticScorer:
+    """Embedding stage in front of the LLM.
+
+    Embeds articles, estimates scores from their nearest LLM-analyzed
+    neighbours with `VectorIndex`, and keeps categories to the canonical
+    `CATEGORY_LABELS`. Call `refresh` to load the index from the database;
+    `learn` adds new LLM verdicts as they come in.
+    """
+
+    def __init__(self, embedder, labels=None):
+        self.embedder = embedder
+        self.dtype = config.EMBEDDING_DTYPE
+        self.index = VectorIndex(self.dtype)
+        self.categories = CategoryLabels(embedder, labels)
+        self._pending = {}
+
+    def refresh(self):
+        """Reload the index of analyzed articles and their centroids."""
+        with get_db() as conn:
+            rows = conn.execute(NEIGHBORS_QUERY, (self.embedder.name,)).fetchall()
+        self.index = VectorIndex(self.dtype)
+        for dtype in {row["dtype"] for row in rows}:
+            group = [row for row in rows if row["dtype"] == dtype]
+            self.index.add(
+                [row["article_id"] for row in group],
+                decode([row["vector"] for row in group], dtype),
+                [row["score"] for row in group],
+                [row["category"] for row in group],
+            )
+        # Refitted on first use, which needs the label embeddings
+        self.categories.centroids = None
+        return self
+
+    def embed_articles(self, articles) -> np.ndarray:
+        """Vectors for the articles, embedding and storing missing ones."""
+        ids = [article["id"] for article in articles]
+        if not ids:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = {}
+        with get_db() as conn:
+            rows = conn.execute(
+                STORED_QUERY.format(placeholders=",".join("?" * len(ids))),
+                [self.embedder.name] + ids,
+            ).fetchall()
+        for row in rows:
+            vectors[row["article_id"]] = decode([row["vector"]], row["dtype"])[0]
+
+        missing = [article for article in articles if article["id"] not in vectors]
+        if missing:
+            embedded = self.embedder.embed([embedding_text(a) for a in missing])
+            with get_db() as conn:
+                conn.executemany(
+                    STORE_QUERY,
+                    [
+                        (a["id"], self.embedder.name, self.dtype, encode(v, self.dtype))
+                        for a, v in zip(missing, embedded)
+                    ],
+                )
+                conn.commit()
+            vectors.update(zip((a["id"] for a in missing), embedded))
+        return np.array([vectors[i] for i in ids], dtype=np.float32)
+
+    def estimate(self, articles) -> list:
+        """An `Estimate` per article, or None while the index holds fewer
+        than `EMBEDDING_MIN_INDEX` articles. Remembers the vectors for
+        `learn`."""
+        vectors = self.embed_articles(articles)
+        self._pending.update(zip((a["id"] for a in articles), vectors))
+        if len(self.index) < config.EMBEDDING_MIN_INDEX:
+            return [None] * len(articles)
+        return self.index.estimate(vectors, config.EMBEDDING_NEIGHBORS)
+
+    def nearest_category(self, article_id: int) -> Optional[str]:
+        vector = self._pending.get(article_id)
+        if vector is None:
+            return None
+        if self.categories.centroids is None:
+            self.categories.fit(self.index)
+        return self.categories.nearest(vector)[0]
+
+    def learn(self, article_id: int, score: int, category: str):
+        """Add an LLM verdict to the index if the article was embedded."""
+        vector = self._pending.pop(article_id, None)
+        if vector is not None:
+            self.index.add([article_id], vector, [score], [category])
+
+    def forget(self, article_id: int):
+        self._pending.pop(article_id, None)
+
+    def backfill(self, limit: int) -> int:
+        """Embed analyzed articles that have no vector yet, in id order, and
+        map their categories onto the canonical labels. Returns how many
+        were embedded."""
+        done, last_id = 0, 0
+        size = max(1, config.EMBEDDING_BATCH_SIZE) * 10
+        while done < limit:
+            with get_db() as conn:
+                rows = conn.execute(
+                    UNEMBEDDED_QUERY,
+                    (last_id, self.embedder.name, min(size, limit - done)),
+                ).fetchall()
+            if not rows:
+                break
+            self.embed_articles(rows)
+            labels = self.categories.canonical([row["category"] for row in rows])
+            with get_db() as conn:
+                conn.executemany(
+                    "UPDATE articles SET category = ? WHERE id = ?",
+                    [
+                        (label, row["id"])
+                        for row, label in zip(rows, labels)
+                        if label and label != row["category"]
+                    ],
+                )
+                conn.commit()
+            done += len(rows)
+            last_id = rows[-1]["id"]
+        return done
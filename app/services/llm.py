@@ -1,9 +1,207 @@
 import json
-from openai import OpenAI
-from pydantic import BaseModel, Field
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    OpenAI,
+    OpenAIError,
+    RateLimitError,
+)
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional
+from app import metrics
 from app.config import config
-from app.db import get_db
+from app.db import get_db, load_bodies
+from app.profiling import span
+from app.ratelimit import RateLimiter
+from app.services.cache import PROMPT_VERSION, VerdictCache
+from app.services.prefilter import Prefilter
+from app.services.workqueue import WorkQueue
+from app.utils import clean_text, estimate_tokens, truncate_tokens
+
+# Keeps the previous score/analysis/category when a value is NULL, and
+# releases the lease taken by WorkQueue. Only applies while the article is
+# still leased as it was when claimed: if the lease ran out and another
+# analyzer took the article over, that analyzer's verdict counts
+UPDATE_QUERY = """
+    UPDATE articles
+    SET status=?,
+        score=COALESCE(?, score),
+        analysis=COALESCE(?, analysis),
+        category=COALESCE(?, category),
+        retry_count=retry_count + ?,
+        next_attempt_at=?,
+        last_error=?,
+        prompt_tokens=COALESCE(?, prompt_tokens),
+        completion_tokens=COALESCE(?, completion_tokens),
+        latency_ms=COALESCE(?, latency_ms),
+        lease_owner=NULL,
+        lease_expires=NULL
+    WHERE id=? AND lease_owner IS ?
+"""
+
+# Articles the pre-filter is confident about, and those it sends on anyway
+SKIP_QUERY = """
+    UPDATE articles
+    SET status='skipped', score=?, analysis=?, prefilter=?,
+        lease_owner=NULL, lease_expires=NULL
+    WHERE id=?
+"""
+AUDIT_QUERY = "UPDATE articles SET prefilter=? WHERE id=?"
+# Scores estimated from similar articles (see SemanticScorer)
+ESTIMATE_QUERY = """
+    UPDATE articles
+    SET status='analyzed', score=?, analysis=?, category=?, scored_by='knn',
+        lease_owner=NULL, lease_expires=NULL
+    WHERE id=?
+"""
+
+# Near-duplicates take over the verdict of their analyzed cluster leader
+COPY_LEADER_VERDICTS_QUERY = """
+    UPDATE articles
+    SET (score, analysis, category) = (
+        SELECT leader.score, leader.analysis, leader.category
+        FROM articles AS leader
+        WHERE leader.id = articles.duplicate_of
+    )
+    WHERE status = 'duplicate'
+        AND analysis IS NULL
+        AND duplicate_of IN (
+            SELECT id FROM articles WHERE status IN ('analyzed', 'skipped')
+        )
+"""
+
+# The oldest near-duplicate of each leader whose analysis failed for good;
+# it takes over as leader and is analyzed in its place
+FAILED_LEADER_DUPLICATES_QUERY = """
+    SELECT MIN(d.id) AS id, d.duplicate_of AS leader
+    FROM articles AS d
+    JOIN articles AS leader ON leader.id = d.duplicate_of
+    WHERE d.status = 'duplicate' AND leader.status = 'error'
+    GROUP BY d.duplicate_of
+"""
+PROMOTE_DUPLICATE_QUERY = """
+    UPDATE articles SET status = 'new', duplicate_of = NULL WHERE id = ?
+"""
+# The rest of the cluster, and the failed leader itself, follow the new
+# leader, so later rewrites of the story join it too
+REPOINT_CLUSTER_QUERY = """
+    UPDATE articles SET duplicate_of = ?
+    WHERE id = ? OR (status = 'duplicate' AND duplicate_of = ?)
+"""
+
+# Completion tokens reserved per article when rate limiting by tokens
+COMPLETION_TOKENS_ESTIMATE = 100
+
+# A summary shorter than this is treated as a teaser when there is content
+MIN_SUMMARY_TOKENS = 50
+
+# Failure classes, stored in articles.last_error
+RATE_LIMITED = "rate_limit"
+TIMEOUT = "timeout"
+UNAVAILABLE = "unavailable"
+MALFORMED_JSON = "malformed_json"
+VALIDATION = "validation"
+API_ERROR = "api_error"
+
+# Retried after a backoff; anything else (auth, bad request) is final
+RETRYABLE_ERRORS = {RATE_LIMITED, TIMEOUT, UNAVAILABLE, MALFORMED_JSON, VALIDATION}
+# An unusable batch reply is retried article by article right away
+BAD_REPLY_ERRORS = {MALFORMED_JSON, VALIDATION}
+
+
+class AnalysisError(Exception):
+    """A failed analysis request, classified by `kind`."""
+
+    def __init__(self, kind: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.kind = kind
+        # Seconds the API asked us to wait, if it said so
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_exception(cls, exc: Exception) -> "AnalysisError":
+        return cls(classify_error(exc), str(exc), _retry_after(exc))
+
+
+def classify_error(exc: Exception) -> str:
+    """Failure class of an exception raised while analyzing."""
+    if isinstance(exc, RateLimitError):
+        return RATE_LIMITED
+    if isinstance(exc, (APITimeoutError, TimeoutError)):
+        return TIMEOUT
+    if isinstance(exc, (APIConnectionError, InternalServerError)):
+        return UNAVAILABLE
+    if isinstance(exc, json.JSONDecodeError):
+        return MALFORMED_JSON
+    if isinstance(exc, (ValidationError, TypeError)):
+        # Valid JSON of the wrong shape, or missing/mistyped fields
+        return VALIDATION
+    return API_ERROR
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    try:
+        return float(exc.response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None, rand=random.random):
+    """Seconds to wait before retry number `attempt` (counting from 0).
+
+    Doubles from `LLM_RETRY_BASE_DELAY` up to `LLM_RETRY_MAX_DELAY`, with
+    the upper half jittered so failed articles do not come back in step.
+    Never shorter than a Retry-After the API sent.
+    """
+    delay = min(config.LLM_RETRY_MAX_DELAY, config.LLM_RETRY_BASE_DELAY * 2**attempt)
+    return max(delay / 2 * (1 + rand()), retry_after or 0)
+
+
+def is_teaser(summary: str) -> bool:
+    """Whether a summary is too short to judge the article by."""
+    return estimate_tokens(clean_text(summary)) < MIN_SUMMARY_TOKENS
+
+
+def article_body(summary: str, content: str, budget: int) -> str:
+    """Article text for a prompt, cleaned and cut to `budget` tokens.
+
+    Uses the summary, unless it is a teaser and the content says more.
+    """
+    summary, content = clean_text(summary), clean_text(content)
+    text = summary
+    if len(content) > len(summary) and estimate_tokens(summary) < MIN_SUMMARY_TOKENS:
+        text = content
+    return truncate_tokens(text, budget)
+
+
+def cache_text(summary: str, content: str) -> str:
+    """Article text the verdict cache is keyed by: what a single prompt
+    sends. Batch prompts send a prefix of it, so articles sharing a key
+    were always judged from the same text."""
+    return article_body(summary, content, config.LLM_PROMPT_TOKEN_BUDGET)
+
+
+def with_bodies(articles) -> list:
+    """Article rows as dicts with `content`, which is only loaded for
+    teaser summaries since `article_body` ignores it otherwise."""
+    articles = [dict(article) for article in articles]
+    wanted = [
+        article["id"]
+        for article in articles
+        if "content" not in article and is_teaser(article["summary"])
+    ]
+    bodies = load_bodies(wanted) if wanted else {}
+    for article in articles:
+        article.setdefault("content", bodies.get(article["id"]))
+    return articles
 
 
 class ReviewResult(BaseModel):
@@ -18,6 +216,108 @@ class ReviewResult(BaseModel):
     )
 
 
+@dataclass
+class UsageStats:
+    """Requests, tokens and latency for one prompting mode."""
+
+    requests: int = 0
+    articles: int = 0
+    tokens: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+
+    @property
+    def tokens_per_article(self) -> float:
+        return self.tokens / self.articles if self.articles else 0.0
+
+    @property
+    def latency_per_article(self) -> float:
+        return self.latency / self.articles if self.articles else 0.0
+
+    @property
+    def ms_per_completion_token(self) -> float:
+        if not self.completion_tokens:
+            return 0.0
+        return self.latency * 1000 / self.completion_tokens
+
+
+@dataclass
+class RequestUsage:
+    """Token usage and latency of one API request."""
+
+    prompt_tokens: Optional[int]
+    completion_tokens: Optional[int]
+    latency: float
+
+    def share(self, articles: int) -> tuple:
+        """Per-article (prompt tokens, completion tokens, latency ms) when
+        `articles` shared the request."""
+
+        def split(value):
+            return None if value is None else round(value / articles)
+
+        return (
+            split(self.prompt_tokens),
+            split(self.completion_tokens),
+            split(self.latency * 1000),
+        )
+
+
+@dataclass
+class RequestOutcome:
+    """What one `_analyze_rows` call produced."""
+
+    results: dict
+    error: Optional[AnalysisError] = None
+    usage: Optional[RequestUsage] = None
+    # Ids sent to the API; the other results were cached
+    requested: tuple = ()
+
+
+@dataclass
+class AnalysisStats:
+    """Totals for one `process_pending` run."""
+
+    analyzed: int = 0
+    errors: int = 0
+    requeued: int = 0
+    copied: int = 0
+    # Near-duplicates queued for analysis in place of a failed leader
+    promoted: list = field(default_factory=list)
+    # Failed articles scheduled for another attempt, and failures by class
+    retried: int = 0
+    failures: Counter = field(default_factory=Counter)
+    # Left to the pre-filter, and sent to the LLM to check on it
+    skipped: int = 0
+    audited: int = 0
+    # Scored from similar articles by the embedding stage
+    estimated: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # Expired leases of other analyzers taken over
+    reclaimed: int = 0
+    elapsed: float = 0.0
+    usage: dict = field(
+        default_factory=lambda: {"single": UsageStats(), "batch": UsageStats()}
+    )
+
+    def merge(self, other: "AnalysisStats"):
+        """Add the totals of `other` to these."""
+        for f in fields(self):
+            if f.name != "usage":
+                setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        for mode, usage in other.usage.items():
+            mine = self.usage[mode]
+            for f in fields(usage):
+                setattr(mine, f.name, getattr(mine, f.name) + getattr(usage, f.name))
+
+    @property
+    def per_second(self) -> float:
+        done = self.analyzed + self.errors
+        return done / self.elapsed if self.elapsed else 0.0
+
+
 class LLMService:
     def __init__(self):
         self.client = OpenAI(api_key=config.API_KEY, base_url=config.BASE_URL)
@@ -43,13 +343,57 @@ class LLMService:
         
         请用中文输出 reason 和 category 字段。
         """
+        self.batch_system_prompt = """
+        你是一个智能助手，帮助用户筛选 RSS 订阅内容。
+        用户对高质量的技术内容、AI 发展、重要科技新闻和深度教程感兴趣。
+        
+        你会收到多篇文章，每篇以 [id=<编号>] 开头，包含标题和摘要。
+        请对每一篇文章分别评分，忽略营销软文、泛泛的新闻稿和低价值内容。
+        
+        以有效的 JSON 格式返回你的分析，格式如下：
+        {
+            "results": [
+                {
+                    "id": <文章编号>,
+                    "score": <0-10>,
+                    "reason": "<简短理由，用中文>",
+                    "category": "<分类，用中文>"
+                }
+            ]
+        }
+        每篇文章必须在 results 中对应一项，id 与输入保持一致。
+        
+        评分指南：
+        - 0-3: 营销内容、重复新闻、不相关。
+        - 4-6: 一般新闻，有趣但不重要。
+        - 7-8: 优质教程、重大发布、有见地的观点。
+        - 9-10: 突破性新闻、深度技术分析、必读内容。
+        
+        请用中文输出 reason 和 category 字段。
+        """
+        self.last_stats = AnalysisStats()
+        self._stats_lock = threading.Lock()
+        # Usage of the latest request made by each worker thread
+        self._request_usage = threading.local()
+        self.cache = VerdictCache(f"{config.MODEL_NAME}:{PROMPT_VERSION}")
+        self.work_queue = WorkQueue()
+        self.prefilter = Prefilter() if config.PREFILTER_ENABLED else None
+        self.semantic = None
+        if config.EMBEDDINGS_ENABLED:
+            # numpy is only needed, and imported, with embeddings on
+            from app.services.embeddings import SemanticScorer, make_embedder
 
-    def analyze_article(
-        self, title: str, summary: str, link: str
-    ) -> Optional[ReviewResult]:
-        content_preview = summary[:1000] if summary else "No summary provided."
+            self.semantic = SemanticScorer(make_embedder(self.client))
+
+    def _build_user_prompt(
+        self, title: str, summary: str, link: str, content: str = None
+    ) -> str:
+        content_preview = (
+            article_body(summary, content, config.LLM_PROMPT_TOKEN_BUDGET)
+            or "No summary provided."
+        )
 
-        user_prompt = f"""
+        return f"""
         Article Title: {title}
         Link: {link}
         Content Snippet: {content_preview}
@@ -57,61 +401,556 @@ class LLMService:
         Analyze this article.
         """
 
+    def analyze_article(
+        self, title: str, summary: str, link: str, content: str = None
+    ) -> Optional[ReviewResult]:
+        cached = self.cache.get(title, cache_text(summary, content))
+        if cached:
+            return ReviewResult(**cached)
         try:
+            return self._analyze_uncached(title, summary, link, content)
+        except AnalysisError:
+            return None
+
+    def _analyze_uncached(
+        self, title: str, summary: str, link: str, content: str = None
+    ) -> ReviewResult:
+        """Request a verdict. Raises AnalysisError on failure."""
+        user_prompt = self._build_user_prompt(title, summary, link, content)
+
+        try:
+            reply = self._complete(self.system_prompt, user_prompt, "single")
+            with span("llm.parse"):
+                data = json.loads(reply)
+                result = ReviewResult(**data)
+
+        except Exception as e:
+            error = AnalysisError.from_exception(e)
+            print(f"Error analyzing article '{title}' ({error.kind}): {e}")
+            raise error from e
+
+        self.cache.put(
+            title,
+            cache_text(summary, content),
+            result.score,
+            result.reason,
+            result.category,
+        )
+        return result
+
+    def _complete(self, system_prompt: str, user_prompt: str, mode: str, articles=1):
+        """Run one JSON chat completion and record its latency and usage."""
+        start = time.monotonic()
+        with span("llm.request"):
             response = self.client.chat.completions.create(
                 model=config.MODEL_NAME,
                 messages=[
-                    {"role": "system", "content": self.system_prompt},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
                 response_format={"type": "json_object"},
             )
+        latency = time.monotonic() - start
+
+        counts = getattr(response, "usage", None)
+        tokens, prompt_tokens, completion_tokens = (
+            value if isinstance(value, int) else None
+            for value in (
+                getattr(counts, "total_tokens", None),
+                getattr(counts, "prompt_tokens", None),
+                getattr(counts, "completion_tokens", None),
+            )
+        )
+        self._request_usage.value = RequestUsage(
+            prompt_tokens, completion_tokens, latency
+        )
+        metrics.LLM_REQUEST_SECONDS.observe(latency, mode=mode)
+        metrics.LLM_TOKENS.inc(prompt_tokens or 0, mode=mode, kind="prompt")
+        metrics.LLM_TOKENS.inc(completion_tokens or 0, mode=mode, kind="completion")
+        with self._stats_lock:
+            usage = self.last_stats.usage[mode]
+            usage.requests += 1
+            usage.articles += articles
+            usage.latency += latency
+            usage.tokens += tokens or 0
+            usage.prompt_tokens += prompt_tokens or 0
+            usage.completion_tokens += completion_tokens or 0
+
+        return response.choices[0].message.content
+
+    def _batch_entry(self, article) -> str:
+        summary = article_body(
+            article["summary"], article["content"], config.LLM_BATCH_ENTRY_TOKENS
+        )
+        return (
+            f"[id={article['id']}]\n"
+            f"Title: {article['title']}\n"
+            f"Link: {article['link']}\n"
+            f"Snippet: {summary or 'No summary provided.'}\n"
+        )
+
+    def _pack_batches(self, articles, batch_size: int, token_budget: int) -> list:
+        """Group articles into batches of at most `batch_size` articles whose
+        prompt entries fit in `token_budget` tokens."""
+        batches, current, used = [], [], 0
+        for article in articles:
+            cost = estimate_tokens(self._batch_entry(article))
+            if current and (len(current) >= batch_size or used + cost > token_budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(article)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
 
-            content = response.choices[0].message.content
-            data = json.loads(content)
-            return ReviewResult(**data)
+    @staticmethod
+    def _parse_batch(data, expected_ids) -> dict:
+        """Extract valid results for `expected_ids` from a batch response.
 
+        Accepts {"results": [...]}, a bare list, or objects keyed by id.
+        """
+        items = data.get("results", data) if isinstance(data, dict) else data
+        if isinstance(items, dict):
+            items = [
+                dict(value, id=key)
+                for key, value in items.items()
+                if isinstance(value, dict)
+            ]
+        if not isinstance(items, list):
+            return {}
+
+        results = {}
+        for item in items:
+            try:
+                article_id = int(item["id"])
+                result = ReviewResult(**{k: v for k, v in item.items() if k != "id"})
+            except (KeyError, TypeError, ValueError):
+                # pydantic's ValidationError is a ValueError
+                continue
+            if article_id in expected_ids:
+                results[article_id] = result
+        return results
+
+    def _lookup_cached(self, articles) -> tuple:
+        """Split articles into cached results (keyed by id) and misses."""
+        results, misses = {}, []
+        for article in articles:
+            cached = self.cache.get(
+                article["title"], cache_text(article["summary"], article["content"])
+            )
+            if cached:
+                results[article["id"]] = ReviewResult(**cached)
+            else:
+                misses.append(article)
+        return results, misses
+
+    def analyze_batch(self, articles) -> dict:
+        """Analyze several stored articles with a single request.
+
+        Returns results keyed by article id. Articles missing from the
+        response, or returned with invalid fields, are left out.
+        """
+        results, misses = self._lookup_cached(articles)
+        if misses:
+            try:
+                results.update(self._analyze_batch_uncached(misses))
+            except AnalysisError:
+                pass
+        return results
+
+    def _analyze_batch_uncached(self, articles) -> dict:
+        """Request verdicts for several articles. Raises AnalysisError if the
+        request fails or its reply is not JSON."""
+        entries = "\n".join(self._batch_entry(article) for article in articles)
+        user_prompt = (
+            f"Analyze each of the following {len(articles)} articles.\n\n{entries}"
+        )
+        try:
+            content = self._complete(
+                self.batch_system_prompt, user_prompt, "batch", len(articles)
+            )
+            with span("llm.parse"):
+                data = json.loads(content)
         except Exception as e:
-            # Fallback or error logging
-            print(f"Error analyzing article '{title}': {e}")
-            return None
+            error = AnalysisError.from_exception(e)
+            print(
+                f"Error analyzing batch of {len(articles)} articles ({error.kind}): {e}"
+            )
+            raise error from e
+
+        with span("llm.parse"):
+            results = self._parse_batch(data, {article["id"] for article in articles})
+        for article in articles:
+            result = results.get(article["id"])
+            if result:
+                self.cache.put(
+                    article["title"],
+                    cache_text(article["summary"], article["content"]),
+                    result.score,
+                    result.reason,
+                    result.category,
+                )
+        return results
 
-    def process_pending(self, limit=10):
-        """Analyzes pending 'new' articles."""
-        with get_db() as conn:
-            # Fetch articles that are 'new'
-            cursor = conn.execute(
-                "SELECT * FROM articles WHERE status='new' LIMIT ?", (limit,)
+    def _analyze_rows(self, articles: list, limiter: RateLimiter) -> RequestOutcome:
+        """Analyze stored articles once the rate limiter allows it.
+
+        Cached verdicts are used without a request or rate limiting. Of the
+        rest, a single article uses the regular prompt and several share one
+        batch request.
+        """
+        with span("db.cache"):
+            results, articles = self._lookup_cached(articles)
+        if not articles:
+            return RequestOutcome(results)
+
+        if len(articles) == 1:
+            article = articles[0]
+            prompt = self.system_prompt + self._build_user_prompt(
+                article["title"],
+                article["summary"],
+                article["link"],
+                article["content"],
+            )
+        else:
+            prompt = self.batch_system_prompt + "".join(
+                self._batch_entry(article) for article in articles
+            )
+        with span("llm.wait"):
+            limiter.acquire(
+                estimate_tokens(prompt) + COMPLETION_TOKENS_ESTIMATE * len(articles)
             )
-            articles = cursor.fetchall()
 
-        analyzed_count = 0
+        outcome = RequestOutcome(
+            results, requested=tuple(article["id"] for article in articles)
+        )
+        self._request_usage.value = None
+        try:
+            if len(articles) > 1:
+                print(f"Analyzing batch of {len(articles)} articles...")
+                results.update(self._analyze_batch_uncached(articles))
+            else:
+                print(f"Analyzing: {article['title']}...")
+                results[article["id"]] = self._analyze_uncached(
+                    article["title"],
+                    article["summary"],
+                    article["link"],
+                    article["content"],
+                )
+        except AnalysisError as e:
+            metrics.LLM_ERRORS.inc(kind=e.kind)
+            if e.kind == RATE_LIMITED:
+                # Hold back every request sharing the limiter, not just this one
+                limiter.pause(e.retry_after or config.LLM_RETRY_BASE_DELAY)
+            outcome.error = e
+        outcome.usage = self._request_usage.value
+        return outcome
+
+    def _apply_prefilter(self, articles, stats) -> list:
+        """Skip the articles the pre-filter is confident about, apart from an
+        audit sample. Returns the articles left for the LLM."""
+        remaining, skips, audits = [], [], []
         for article in articles:
-            print(f"Analyzing: {article['title']}...")
-            result = self.analyze_article(
-                article["title"], article["summary"], article["link"]
+            judgement = self.prefilter.judge(article)
+            if judgement is None:
+                remaining.append(article)
+            elif self.prefilter.audit():
+                audits.append((judgement.stage, article["id"]))
+                remaining.append(article)
+            else:
+                skips.append(
+                    (judgement.score, judgement.reason, judgement.stage, article["id"])
+                )
+        if skips or audits:
+            with get_db() as conn:
+                conn.executemany(SKIP_QUERY, skips)
+                conn.executemany(AUDIT_QUERY, audits)
+                conn.commit()
+        stats.skipped += len(skips)
+        stats.audited += len(audits)
+        return remaining
+
+    def _apply_estimates(self, articles, stats) -> list:
+        """Score articles whose nearest LLM-analyzed neighbours agree on a
+        score, without a request. Returns the articles left for the LLM."""
+        if not articles:
+            return articles
+        remaining, estimated = [], []
+        try:
+            estimates = self.semantic.estimate(articles)
+            for article, estimate in zip(articles, estimates):
+                if estimate is None or not estimate.confident:
+                    remaining.append(article)
+                    continue
+                category = self.semantic.nearest_category(article["id"])
+                reason = (
+                    f"Estimated from similar articles (similarity "
+                    f"{estimate.similarity:.2f}, spread {estimate.spread:.1f})"
+                )
+                estimated.append((estimate.score, reason, category, article["id"]))
+        except OpenAIError as e:
+            print(f"Error embedding {len(articles)} articles: {e}")
+            return articles
+
+        for row in estimated:
+            self.semantic.forget(row[-1])
+        if estimated:
+            with get_db() as conn:
+                conn.executemany(ESTIMATE_QUERY, estimated)
+                conn.commit()
+        stats.estimated += len(estimated)
+        return remaining
+
+    def _canonical_category(self, category: str) -> str:
+        try:
+            return self.semantic.categories.canonical([category])[0]
+        except OpenAIError as e:
+            print(f"Error embedding category {category!r}: {e}")
+            return category
+
+    def _write_results(self, updates: list):
+        """Write a batch of rows built by `_verdict` and `_failure`."""
+        if not updates:
+            return
+        with metrics.DB_WRITE_SECONDS.time(operation="verdicts"), span("db.write"):
+            with get_db() as conn:
+                conn.executemany(UPDATE_QUERY, updates)
+                conn.commit()
+        updates.clear()
+
+    def promote_duplicates(self) -> list:
+        """Make a near-duplicate the leader of each cluster whose leader
+        ended in 'error', so the story still gets a verdict. Returns the ids
+        of the promoted articles, which are pending analysis."""
+        with get_db() as conn, span("db.write"):
+            clusters = conn.execute(FAILED_LEADER_DUPLICATES_QUERY).fetchall()
+            conn.executemany(
+                PROMOTE_DUPLICATE_QUERY, [(row["id"],) for row in clusters]
             )
+            conn.executemany(
+                REPOINT_CLUSTER_QUERY,
+                [(row["id"], row["leader"], row["leader"]) for row in clusters],
+            )
+            conn.commit()
+        return [row["id"] for row in clusters]
+
+    def copy_duplicate_verdicts(self) -> int:
+        """Give near-duplicates the score of their cluster leader once it is
+        analyzed or skipped."""
+        with get_db() as conn, span("db.write"):
+            copied = conn.execute(COPY_LEADER_VERDICTS_QUERY).rowcount
+            conn.commit()
+        return copied
 
+    @staticmethod
+    def _verdict(article, result: ReviewResult, usage=(None, None, None)) -> tuple:
+        return (
+            "analyzed",
+            result.score,
+            result.reason,
+            result.category,
+            0,
+            None,
+            None,
+            *usage,
+            article["id"],
+            article.get("lease_owner"),
+        )
+
+    @staticmethod
+    def _failure(article, error: Optional[AnalysisError], stats) -> tuple:
+        """Schedule a retry after a backoff while the failure class and the
+        retry budget allow it; otherwise give up with status 'error'."""
+        kind = error.kind if error else API_ERROR
+        attempt = article["retry_count"] or 0
+        stats.failures[kind] += 1
+        if kind in RETRYABLE_ERRORS and attempt < config.LLM_MAX_RETRIES:
+            stats.retried += 1
+            delay = retry_delay(attempt, error.retry_after)
+            next_attempt = datetime.now() + timedelta(seconds=delay)
+            status = "retry"
+        else:
+            stats.errors += 1
+            status, next_attempt = "error", None
+        return (
+            status,
+            None,
+            None,
+            None,
+            1,
+            next_attempt,
+            kind,
+            None,
+            None,
+            None,
+            article["id"],
+            article.get("lease_owner"),
+        )
+
+    def _collect_results(self, batch, outcome: RequestOutcome, updates, stats) -> list:
+        """Queue DB updates for a finished request.
+
+        Returns the articles of a multi-article batch that got no result,
+        unless the whole request failed for a reason worth backing off for.
+        Each analyzed article is charged an equal share of the request's
+        tokens and latency.
+        """
+        results, error = outcome.results, outcome.error
+        share = (None, None, None)
+        if outcome.usage and outcome.requested:
+            share = outcome.usage.share(len(outcome.requested))
+        missing = []
+        for article in batch:
+            result = results.get(article["id"])
             if result:
-                with get_db() as conn:
-                    conn.execute(
-                        """
-                        UPDATE articles 
-                        SET status='analyzed', score=?, analysis=?, category=?
-                        WHERE id=?
-                    """,
-                        (result.score, result.reason, result.category, article["id"]),
-                    )
-                    conn.commit()
-                analyzed_count += 1
+                if self.semantic:
+                    result.category = self._canonical_category(result.category)
+                    self.semantic.learn(article["id"], result.score, result.category)
+                usage = share if article["id"] in outcome.requested else (None,) * 3
+                updates.append(self._verdict(article, result, usage))
+                stats.analyzed += 1
+            elif len(batch) > 1 and (error is None or error.kind in BAD_REPLY_ERRORS):
+                missing.append(article)
             else:
-                # Mark as skipped or try again later?
-                # For now, mark as skipped to avoid infinite error loops
-                with get_db() as conn:
-                    conn.execute(
-                        "UPDATE articles SET status='error' WHERE id=?",
-                        (article["id"],),
+                updates.append(self._failure(article, error, stats))
+                if self.semantic:
+                    self.semantic.forget(article["id"])
+        return missing
+
+    def process_pending(
+        self, limit=10, concurrency=None, rpm=None, tpm=None, batch_size=None
+    ):
+        """Analyzes pending 'new' articles.
+
+        Up to `concurrency` requests are in flight at once, throttled by the
+        requests/tokens per minute limits. With `batch_size` > 1 several
+        articles share one request; articles missing from a batch response
+        are re-queued on their own. Results are written back from the
+        calling thread in batched transactions.
+
+        Articles the pre-filter judges low-value get status 'skipped'
+        without a request (see `Prefilter`). With embeddings enabled, those
+        whose nearest analyzed neighbours agree on a score get that score
+        instead of a request (see `SemanticScorer`).
+
+        Articles are leased through `work_queue` a chunk at a time, so
+        several processes can run this against the same database without
+        analyzing an article twice. Leases are renewed while requests are
+        in flight; those left by a crashed run expire after
+        `LLM_LEASE_SECONDS` and are taken over.
+        """
+        concurrency = concurrency or config.LLM_CONCURRENCY
+        batch_size = batch_size or config.LLM_BATCH_SIZE
+        limiter = RateLimiter(
+            rpm=config.LLM_RPM if rpm is None else rpm,
+            tpm=config.LLM_TPM if tpm is None else tpm,
+        )
+
+        if self.prefilter:
+            self.prefilter.refresh()
+        if self.semantic:
+            self.semantic.refresh()
+
+        total = AnalysisStats()
+        reclaimed = self.work_queue.reclaimed
+        chunk = max(config.LLM_WRITE_BATCH, concurrency * batch_size)
+        remaining = limit
+        while remaining > 0:
+            with span("db.claim"):
+                articles = self.work_queue.claim(min(chunk, remaining))
+            if not articles:
+                break
+            remaining -= len(articles)
+            try:
+                total.merge(
+                    self.analyze_articles(
+                        articles, limiter, concurrency, batch_size, self.work_queue
                     )
-                    conn.commit()
+                )
+            finally:
+                # Anything not stored, e.g. after an exception, goes back
+                self.work_queue.release(row["id"] for row in articles)
+
+        total.reclaimed = self.work_queue.reclaimed - reclaimed
+        self.last_stats = total
+        self.cache.evict()
+        return total.analyzed
+
+    def analyze_articles(
+        self,
+        articles,
+        limiter: RateLimiter,
+        concurrency=None,
+        batch_size=None,
+        leases: Optional[WorkQueue] = None,
+    ) -> AnalysisStats:
+        """Analyze the given article rows and store the verdicts.
+
+        Long-running callers pass the same `limiter` to every call so rate
+        limits hold across calls. Rows claimed through `leases` have their
+        leases renewed until they are stored, however long the rate limits
+        hold requests back; a verdict for an article whose lease was lost
+        to another analyzer is dropped. Also sets `last_stats`.
+        """
+        concurrency = concurrency or config.LLM_CONCURRENCY
+        batch_size = batch_size or config.LLM_BATCH_SIZE
+
+        stats = self.last_stats = AnalysisStats()
+        start = time.monotonic()
+        hits, misses = self.cache.hits, self.cache.misses
+        articles = with_bodies(articles)
+        if self.prefilter:
+            with span("llm.prefilter"):
+                articles = self._apply_prefilter(articles, stats)
+        if self.semantic:
+            with span("llm.estimate"):
+                articles = self._apply_estimates(articles, stats)
+        updates = []
+        ids = [article["id"] for article in articles]
+        renew_every = leases.lease_seconds / 3 if leases else None
+        renewed = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            pending = {}
+            for batch in self._pack_batches(
+                articles, batch_size, config.LLM_BATCH_TOKEN_BUDGET
+            ):
+                pending[pool.submit(self._analyze_rows, batch, limiter)] = batch
+
+            while pending:
+                # Idle on the calling thread while requests are in flight
+                with span("llm.await"):
+                    done, _ = wait(
+                        pending, timeout=renew_every, return_when=FIRST_COMPLETED
+                    )
+                for future in done:
+                    batch = pending.pop(future)
+                    missing = self._collect_results(
+                        batch, future.result(), updates, stats
+                    )
+                    for article in missing:
+                        # Left out of a batch response, retry it on its own
+                        retry = [article]
+                        pending[pool.submit(self._analyze_rows, retry, limiter)] = retry
+                        stats.requeued += 1
+
+                if len(updates) >= config.LLM_WRITE_BATCH:
+                    self._write_results(updates)
+                if leases and time.monotonic() - renewed >= renew_every:
+                    # Stored articles no longer match, and are left alone
+                    with span("db.claim"):
+                        leases.renew(ids)
+                    renewed = time.monotonic()
 
-        return analyzed_count
+        if updates:
+            self._write_results(updates)
+        if stats.errors:
+            stats.promoted = self.promote_duplicates()
+        stats.copied = self.copy_duplicate_verdicts()
+        stats.cache_hits = self.cache.hits - hits
+        stats.cache_misses = self.cache.misses - misses
+        stats.elapsed = time.monotonic() - start
+        for outcome in ("analyzed", "skipped", "estimated", "copied", "retried"):
+            metrics.ARTICLES.inc(getattr(stats, outcome), outcome=outcome)
+        metrics.ARTICLES.inc(stats.errors, outcome="error")
+        return stats
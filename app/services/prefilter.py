@@ -0,0 +1,183 @@
+import math
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+from app.config import config
+from app.db import get_db
+from app.utils import normalize_text
+
+# Verdicts at or below this score count as low-value, as in `stats`
+LOW_SCORE = 3
+
+# Stages, stored in articles.prefilter for skipped and audited articles
+RULE = "rule"
+FEED = "feed"
+MODEL = "model"
+
+# Latin words, and CJK as character bigrams since there are no spaces
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9'+#.-]*")
+CJK_RE = re.compile(r"[\u3400-\u9fff]+")
+
+# Read from the trigger-maintained article_stats table (see app.db)
+FEED_SCORES_QUERY = """
+    SELECT feed_id, SUM(score_sum) AS score_sum, SUM(count) AS analyzed
+    FROM article_stats
+    WHERE status = 'analyzed'
+    GROUP BY feed_id
+"""
+
+# Newest LLM verdicts; audited articles are real LLM verdicts too
+TRAINING_QUERY = """
+    SELECT title, summary, score FROM articles
+    WHERE status = 'analyzed' AND score IS NOT NULL
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+# Served by idx_articles_prefilter (see app.db migrations)
+AGREEMENT_QUERY = """
+    SELECT prefilter AS stage,
+           SUM(status = 'skipped') AS skipped,
+           SUM(status = 'analyzed') AS audited,
+           SUM(status = 'analyzed' AND score <= ?) AS agreed
+    FROM articles
+    WHERE prefilter IS NOT NULL
+    GROUP BY prefilter
+"""
+
+
+def tokenize(text: str) -> list:
+    text = normalize_text(text)
+    tokens = WORD_RE.findall(text)
+    for run in CJK_RE.findall(text):
+        tokens.extend(run[i : i + 2] for i in range(max(1, len(run) - 1)))
+    return tokens
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes separating low-value articles from the rest,
+    with add-one smoothing."""
+
+    def __init__(self):
+        self.counts = {True: Counter(), False: Counter()}
+        self.totals = {True: 0, False: 0}
+        self.docs = {True: 0, False: 0}
+        self.vocabulary = set()
+
+    def fit(self, texts, labels):
+        for text, low in zip(texts, labels):
+            tokens = tokenize(text)
+            self.counts[low].update(tokens)
+            self.totals[low] += len(tokens)
+            self.docs[low] += 1
+            self.vocabulary.update(tokens)
+        return self
+
+    def _log_likelihood(self, tokens, low: bool) -> float:
+        counts, total = self.counts[low], self.totals[low]
+        denominator = math.log(total + len(self.vocabulary))
+        return math.log(self.docs[low] / sum(self.docs.values())) + sum(
+            math.log(counts[token] + 1) - denominator for token in tokens
+        )
+
+    def probability_low(self, text: str) -> float:
+        """Posterior probability that `text` is low-value."""
+        if not self.docs[True] or not self.docs[False]:
+            return 0.0
+        tokens = [t for t in tokenize(text) if t in self.vocabulary]
+        diff = self._log_likelihood(tokens, False) - self._log_likelihood(tokens, True)
+        # 1 / (1 + e^diff), without overflowing on long texts
+        if diff > 0:
+            return math.exp(-diff) / (1 + math.exp(-diff))
+        return 1 / (1 + math.exp(diff))
+
+
+@dataclass
+class Judgement:
+    """A pre-filter verdict for an article it considers low-value."""
+
+    stage: str
+    score: int
+    reason: str
+
+
+class Prefilter:
+    """Cheap checks that spot low-value articles before the LLM sees them.
+
+    In order: keyword/regex rules and empty text, feeds whose analyzed
+    articles average `PREFILTER_FEED_MAX_AVG` or less, and a naive Bayes
+    model trained on past LLM verdicts. A fraction `PREFILTER_AUDIT_RATE`
+    of the articles it would skip is sent to the LLM anyway, which is what
+    `agreement` measures it against. Call `refresh` to pick up new verdicts.
+    """
+
+    def __init__(self, patterns=None, audit_rate=None, rand=random.random):
+        patterns = config.PREFILTER_PATTERNS if patterns is None else patterns
+        self.pattern = re.compile(patterns, re.IGNORECASE) if patterns else None
+        self.audit_rate = (
+            config.PREFILTER_AUDIT_RATE if audit_rate is None else audit_rate
+        )
+        self._rand = rand
+        self.feed_scores = {}
+        self.model = None
+        self.model_score = 0
+
+    def refresh(self):
+        """Reload per-feed averages and retrain the model."""
+        with get_db() as conn:
+            self.feed_scores = {
+                row["feed_id"]: row["score_sum"] / row["analyzed"]
+                for row in conn.execute(FEED_SCORES_QUERY)
+                if row["analyzed"] >= config.PREFILTER_FEED_MIN_ANALYZED
+            }
+            rows = conn.execute(
+                TRAINING_QUERY, (config.PREFILTER_TRAINING_SIZE,)
+            ).fetchall()
+
+        low = [row["score"] for row in rows if row["score"] <= LOW_SCORE]
+        self.model = None
+        if len(rows) >= config.PREFILTER_MIN_TRAINING and low:
+            self.model = NaiveBayes().fit(
+                (f"{row['title']} {row['summary'] or ''}" for row in rows),
+                (row["score"] <= LOW_SCORE for row in rows),
+            )
+            self.model_score = round(sum(low) / len(low))
+        return self
+
+    def judge(self, article) -> Optional[Judgement]:
+        """Judgement for an article that need not go to the LLM, or None."""
+        title = article["title"] or ""
+        text = normalize_text(article["summary"] or article["content"] or "")
+        if len(text) < config.PREFILTER_MIN_TEXT:
+            return Judgement(RULE, 0, "Pre-filter: no summary or content")
+        if self.pattern:
+            match = self.pattern.search(title) or self.pattern.search(text)
+            if match:
+                return Judgement(RULE, 0, f"Pre-filter: matches '{match.group(0)}'")
+
+        average = self.feed_scores.get(article["feed_id"])
+        if average is not None and average <= config.PREFILTER_FEED_MAX_AVG:
+            return Judgement(
+                FEED, round(average), f"Pre-filter: feed averages {average:.1f}"
+            )
+
+        if self.model and config.PREFILTER_CONFIDENCE:
+            p = self.model.probability_low(f"{title} {article['summary'] or ''}")
+            if p >= config.PREFILTER_CONFIDENCE:
+                return Judgement(
+                    MODEL, self.model_score, f"Pre-filter: {p:.0%} likely low-value"
+                )
+        return None
+
+    def audit(self) -> bool:
+        """Whether to send an article it would skip to the LLM anyway."""
+        return self._rand() < self.audit_rate
+
+
+def agreement() -> list:
+    """Per stage: articles skipped, audited by the LLM, and audited ones the
+    LLM also scored low."""
+    with get_db() as conn:
+        return [dict(row) for row in conn.execute(AGREEMENT_QUERY, (LOW_SCORE,))]
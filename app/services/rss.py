@@ -1,13 +1,265 @@
 import feedparser
+import requests
+import statistics
+import tempfile
+import threading
 import time
-from datetime import datetime
-from app.db import get_db
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import IO, Optional
+from urllib.parse import urljoin, urlparse
+from xml.parsers.expat import errors as expat_errors
+from app import metrics
+from app.config import config
+from app.db import compress_text, get_db
+from app.profiling import span
+from app.services.dedup import NearDuplicateIndex, minhash
+from app.utils import normalize_link, strip_html
 from rich.console import Console
 
 console = Console()
 
+USER_AGENT = "FeedSense/1.0 (+https://github.com/coolxll/feedsense)"
+# Keys per `IN (...)` lookup, well below SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+# Entries looked up, inserted and committed at a time
+STORE_CHUNK = 200
+
+# Recent articles used to estimate how often a feed publishes
+CADENCE_SAMPLE = 20
+# Cap on the exponent of the failure and empty-fetch backoff
+MAX_BACKOFF_STEPS = 6
+# sy:updatePeriod values, in seconds
+UPDATE_PERIODS = {
+    "hourly": 3600,
+    "daily": 86400,
+    "weekly": 7 * 86400,
+    "monthly": 30 * 86400,
+    "yearly": 365 * 86400,
+}
+
+# Namespaces understood by the streaming parser
+ATOM = "{http://www.w3.org/2005/Atom}"
+RSS1 = "{http://purl.org/rss/1.0/}"
+CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+DC = "{http://purl.org/dc/elements/1.1/}"
+SY = "{http://purl.org/rss/1.0/modules/syndication/}"
+ENTRY_TAGS = {"item", f"{RSS1}item", f"{ATOM}entry"}
+# In order of preference
+DATE_TAGS = (f"{ATOM}published", f"{ATOM}updated", "pubDate", f"{DC}date")
+# What expat reports when the input ends early, as a cut-off download does
+TRUNCATION_ERRORS = {
+    expat_errors.codes[message]
+    for message in (
+        expat_errors.XML_ERROR_NO_ELEMENTS,
+        expat_errors.XML_ERROR_UNCLOSED_TOKEN,
+        expat_errors.XML_ERROR_PARTIAL_CHAR,
+    )
+}
+
+# Served by idx_articles_feed_published
+RECENT_PUBLISHED_QUERY = """
+    SELECT published FROM articles
+    WHERE feed_id = ? AND published IS NOT NULL
+    ORDER BY published DESC
+    LIMIT ?
+"""
+ACTIVE_FEEDS_QUERY = """
+    SELECT *, (next_fetch_at IS NULL OR next_fetch_at <= ?) AS due
+    FROM feeds
+    WHERE is_active=1
+"""
+
+
+@dataclass
+class FetchResult:
+    """Outcome of downloading and parsing a single feed."""
+
+    feed_id: int
+    name: str
+    entries: list = field(default_factory=list)
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    not_modified: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    bytes: int = 0
+    near_duplicates: int = 0
+    # Minimum seconds between polls declared by the feed, if any
+    update_hint: Optional[float] = None
+    # Inserted articles awaiting analysis, i.e. not near-duplicates
+    new_ids: list = field(default_factory=list)
+    # Entries read while storing; fewer than the feed holds if it stopped
+    # early on a chunk of already stored entries
+    seen: int = 0
+    stopped_early: bool = False
+    # Spooled body of a large feed, parsed incrementally by `entries`
+    stream: Optional[IO[bytes]] = None
+    feed_info: dict = field(default_factory=dict)
+
+
+@dataclass
+class FetchStats:
+    """Totals for one `fetch_all` run."""
+
+    feeds: int = 0
+    not_due: int = 0
+    not_modified: int = 0
+    errors: int = 0
+    bytes: int = 0
+    new: int = 0
+    duplicates: int = 0
+    near_duplicates: int = 0
+
+
+def update_hint(feed_info) -> Optional[float]:
+    """Minimum seconds between polls declared by the feed itself, from RSS
+    `<ttl>` (minutes) or `sy:updatePeriod`/`sy:updateFrequency`."""
+    hints = []
+    try:
+        hints.append(float(feed_info.get("ttl")) * 60)
+    except (TypeError, ValueError):
+        pass
+    period = UPDATE_PERIODS.get(str(feed_info.get("sy_updateperiod", "")).lower())
+    if period:
+        try:
+            frequency = max(1, int(feed_info.get("sy_updatefrequency", 1)))
+        except (TypeError, ValueError):
+            frequency = 1
+        hints.append(period / frequency)
+    hints = [hint for hint in hints if hint > 0]
+    return max(hints) if hints else None
+
+
+def _text(elem) -> str:
+    """Text of an element; XHTML content is serialized as markup."""
+    if elem is None:
+        return ""
+    if elem.get("type") == "xhtml" and len(elem):
+        return "".join(
+            ET.tostring(child, encoding="unicode", method="html") for child in elem
+        ).strip()
+    return (elem.text or "").strip()
+
+
+def _child(elem, *tags):
+    for tag in tags:
+        found = elem.find(tag)
+        if found is not None:
+            return found
+    return None
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    """RFC 822 (RSS) or ISO 8601 (Atom, Dublin Core) date as naive UTC,
+    as feedparser's `published_parsed` gives it."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        # fromisoformat only accepts a "Z" offset from Python 3.11
+        if value[-1:] in ("Z", "z"):
+            value = value[:-1] + "+00:00"
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _entry_link(elem, base_url: str) -> str:
+    link = ""
+    for candidate in elem.findall(f"{ATOM}link"):
+        if candidate.get("rel", "alternate") == "alternate":
+            link = candidate.get("href", "")
+            break
+    if not link:
+        link = _text(_child(elem, "link", f"{RSS1}link"))
+    return urljoin(base_url, link) if link else ""
+
+
+def iter_entries(fileobj, feed_id: int, feed_info: dict, base_url: str = ""):
+    """Yield article rows from an RSS 2.0, RSS 1.0 or Atom document one
+    entry at a time, like `RSSService._parse_entries` does for a parsed feed.
+
+    Each entry is dropped from the tree once converted, so memory stays
+    flat however long the feed is. Channel-level update hints are stored
+    in `feed_info` under the keys `update_hint` reads. Raises
+    `xml.etree.ElementTree.ParseError` on malformed XML.
+    """
+    now = datetime.now()
+    stack = []
+    for event, elem in ET.iterparse(fileobj, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag in ("ttl", f"{SY}updatePeriod", f"{SY}updateFrequency"):
+            key = "ttl" if elem.tag == "ttl" else f"sy_{elem.tag[len(SY):].lower()}"
+            feed_info[key] = (elem.text or "").strip()
+            continue
+        if elem.tag not in ENTRY_TAGS:
+            continue
+
+        link = _entry_link(elem, base_url)
+        if link:
+            published = None
+            with span("fetch.dates"):
+                for tag in DATE_TAGS:
+                    published = _parse_date(_text(elem.find(tag)))
+                    if published:
+                        break
+            yield (
+                feed_id,
+                _text(_child(elem, "title", f"{RSS1}title", f"{ATOM}title"))
+                or "No Title",
+                link,
+                published or now,
+                _text(
+                    _child(elem, "description", f"{RSS1}description", f"{ATOM}summary")
+                ),
+                _text(_child(elem, f"{CONTENT}encoded", f"{ATOM}content")),
+            )
+        if stack:
+            stack[-1].remove(elem)
+
+
+def entry_signature(title: str, summary: str) -> Optional[list]:
+    """MinHash signature near-duplicates of an entry are detected by."""
+    with span("fetch.dedup"):
+        return minhash(f"{title} {strip_html(summary)}")
+
+
+class HostLimiter:
+    """Caps the number of in-flight requests against a single host."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def for_url(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
 
 class RSSService:
+    def __init__(self, min_interval=None, max_interval=None):
+        self.last_stats = FetchStats()
+        self.near_duplicates = NearDuplicateIndex()
+        self.min_interval = min_interval or config.FETCH_MIN_INTERVAL
+        self.max_interval = max_interval or config.FETCH_MAX_INTERVAL
+
     def add_feed(self, url: str):
         """Add a new feed source."""
         # Parse first to get title
@@ -36,68 +288,434 @@ class RSSService:
         with get_db() as conn:
             return conn.execute("SELECT * FROM feeds").fetchall()
 
-    def fetch_all(self):
-        """Fetch new articles from all active feeds."""
-        with get_db() as conn:
-            feeds = conn.execute("SELECT * FROM feeds WHERE is_active=1").fetchall()
+    def _download(self, row, timeout: float, result: FetchResult) -> Optional[IO]:
+        """Download a feed body, enforcing `timeout` as a total deadline.
 
-        new_count = 0
-        for row in feeds:
-            feed_id = row["id"]
-            url = row["url"]
-            console.print(f"Fetching {row['name']}...")
+        The body is spooled to a temporary file once it grows past
+        `FETCH_STREAM_THRESHOLD` bytes, so large feeds are never held in
+        memory whole. Sends the stored ETag/Last-Modified validators and
+        returns None when the server answers 304 Not Modified.
+        """
+        headers = {"User-Agent": USER_AGENT}
+        if row["etag"]:
+            headers["If-None-Match"] = row["etag"]
+        if row["last_modified"]:
+            headers["If-Modified-Since"] = row["last_modified"]
 
-            feed = feedparser.parse(url)
+        deadline = time.monotonic() + timeout
+        response = requests.get(
+            row["url"], timeout=timeout, stream=True, headers=headers
+        )
+        try:
+            if response.status_code == 304:
+                result.not_modified = True
+                return None
+            response.raise_for_status()
+            result.etag = response.headers.get("ETag")
+            result.last_modified = response.headers.get("Last-Modified")
+            body = tempfile.SpooledTemporaryFile(max_size=config.FETCH_STREAM_THRESHOLD)
+            try:
+                for chunk in response.iter_content(64 * 1024):
+                    body.write(chunk)
+                    result.bytes += len(chunk)
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"download exceeded {timeout}s")
+            except BaseException:
+                body.close()
+                raise
+            body.seek(0)
+            return body
+        finally:
+            response.close()
 
-            # Prepare batch insert
-            entries_to_add = []
+    def _parse_entries(self, feed_id: int, feed) -> list:
+        """Convert parsed feed entries into article rows, each followed by
+        its `entry_signature`."""
+        entries = []
+        for entry in feed.entries:
+            link = entry.get("link", "")
+            if not link:
+                continue
+
+            title = entry.get("title", "No Title")
+            pub_parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+            if pub_parsed:
+                with span("fetch.dates"):
+                    published = datetime.fromtimestamp(time.mktime(pub_parsed))
+            else:
+                published = datetime.now()
 
-            for entry in feed.entries:
-                link = entry.get("link", "")
-                if not link:
-                    continue
+            summary = entry.get("summary", "")
+            content = ""
+            if "content" in entry:
+                content = entry.content[0].value
 
-                # Check duplication
-                with get_db() as conn:
-                    exists = conn.execute(
-                        "SELECT id FROM articles WHERE link=?", (link,)
-                    ).fetchone()
+            signature = entry_signature(title, summary)
+            entries.append(
+                (feed_id, title, link, published, summary, content, signature)
+            )
+        return entries
 
-                if exists:
-                    continue
+    def _stream_entries(self, result: FetchResult, url: str):
+        """Parse a spooled feed body incrementally while it is being stored.
 
-                # Extract fields
-                title = entry.get("title", "No Title")
-                pub_parsed = entry.get("published_parsed") or entry.get(
-                    "updated_parsed"
+        Bodies that are not well-formed XML go through feedparser instead,
+        which copes with broken markup such as undeclared entities, also
+        when the error comes part-way through; it then continues after the
+        entries already read. A feed that breaks off part-way keeps the
+        entries read up to that point.
+        """
+        yielded = set()
+        entries = iter_entries(result.stream, result.feed_id, result.feed_info, url)
+        try:
+            while True:
+                # Parsing happens between the stores of `_store_result`
+                with span("fetch.parse"):
+                    entry = next(entries, None)
+                if entry is None:
+                    return
+                yielded.add(normalize_link(entry[2]))
+                # Before the entry's chunk is stored, so outside its transaction
+                yield entry + (entry_signature(entry[1], entry[4]),)
+        except ET.ParseError as e:
+            if yielded and e.code in TRUNCATION_ERRORS:
+                console.print(
+                    f"[yellow]Warning:[/yellow] {result.name} is truncated: {e}"
                 )
-                if pub_parsed:
-                    published = datetime.fromtimestamp(time.mktime(pub_parsed))
-                else:
-                    published = datetime.now()
+                return
+            result.stream.seek(0)
+            with span("fetch.parse"):
+                feed = feedparser.parse(
+                    result.stream.read(), response_headers={"content-location": url}
+                )
+                result.feed_info.update(feed.feed)
+                entries = self._parse_entries(result.feed_id, feed)
+            yield from (
+                entry for entry in entries if normalize_link(entry[2]) not in yielded
+            )
+
+    def _fetch_feed(self, row, limiter: HostLimiter, timeout: float) -> FetchResult:
+        """Download and parse one feed. Runs in a worker thread, no DB access.
+
+        Entry signatures are computed here too, keeping them out of the
+        write transactions. Feeds larger than `FETCH_STREAM_THRESHOLD` are
+        left spooled and parsed lazily by `_store_result` instead.
+        """
+        result = FetchResult(feed_id=row["id"], name=row["name"] or row["url"])
+        start = time.monotonic()
+        try:
+            with limiter.for_url(row["url"]), span("fetch.download"):
+                body = self._download(row, timeout, result)
+            if body is not None and result.bytes > config.FETCH_STREAM_THRESHOLD:
+                result.stream = body
+                result.entries = self._stream_entries(result, row["url"])
+            elif body is not None:
+                with body, span("fetch.parse"):
+                    feed = feedparser.parse(
+                        body.read(), response_headers={"content-location": row["url"]}
+                    )
+                    result.entries = self._parse_entries(row["id"], feed)
+                result.update_hint = update_hint(feed.feed)
+        except Exception as e:
+            result.error = str(e) or e.__class__.__name__
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def _insert_entries(self, conn, entries: list, result: FetchResult) -> int:
+        """Insert new entries, marking near-duplicates of stored articles.
 
-                summary = entry.get("summary", "")
-                content = ""
-                if "content" in entry:
-                    content = entry.content[0].value
+        Each inserted article is added to the MinHash index right away, so
+        rewrites within the same feed are clustered too.
+        """
+        added = 0
+        for entry in entries:
+            feed_id, title, link, published, summary, content, signature, link_key = (
+                entry
+            )
+            leader = None
+            if signature is not None:
+                with span("fetch.dedup"):
+                    leader = self.near_duplicates.find_leader(conn, signature)
 
-                entries_to_add.append(
-                    (feed_id, title, link, published, summary, content)
+            # OR IGNORE covers links inserted by another process meanwhile
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO articles
+                    (feed_id, title, link, published, summary, link_key,
+                     status, duplicate_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (feed_id, title, link, published, summary, link_key)
+                + ("duplicate" if leader else "new", leader),
+            )
+            if not cursor.rowcount:
+                continue
+            if content:
+                conn.execute(
+                    "INSERT INTO article_bodies (article_id, content) VALUES (?, ?)",
+                    (cursor.lastrowid, compress_text(content)),
                 )
 
+            added += 1
+            if leader:
+                result.near_duplicates += 1
+            else:
+                result.new_ids.append(cursor.lastrowid)
+            if signature is not None:
+                self.near_duplicates.add(conn, cursor.lastrowid, signature)
+        return added
+
+    def _existing_keys(self, conn, keys: list) -> set:
+        existing = set()
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i : i + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            existing.update(
+                row[0]
+                for row in conn.execute(
+                    f"SELECT link_key FROM articles WHERE link_key IN ({placeholders})",
+                    chunk,
+                )
+            )
+        return existing
+
+    def _store_chunk(self, conn, chunk: list, keys: set, result: FetchResult):
+        """Insert the new entries of one chunk. Returns the number added and
+        whether every entry in it was already known."""
+        keyed = {}
+        for entry in chunk:
+            # Collapse variants of the same link within the feed first
+            key = normalize_link(entry[2])
+            if key not in keys:
+                keys.add(key)
+                keyed[key] = entry
+
+        with metrics.DB_WRITE_SECONDS.time(operation="articles"), span("db.write"):
+            existing = self._existing_keys(conn, list(keyed))
+            entries_to_add = [
+                entry + (key,) for key, entry in keyed.items() if key not in existing
+            ]
+            added = 0
             if entries_to_add:
-                with get_db() as conn:
-                    conn.executemany(
-                        """
-                        INSERT INTO articles (feed_id, title, link, published, summary, content, status)
-                        VALUES (?, ?, ?, ?, ?, ?, 'new')
-                    """,
-                        entries_to_add,
+                added = self._insert_entries(conn, entries_to_add, result)
+            conn.commit()
+        return added, not entries_to_add
+
+    def _store_result(self, result: FetchResult) -> int:
+        """Insert entries that are not stored yet and remember the feed's
+        cache validators. Returns the number of articles added.
+
+        Entries are stored `STORE_CHUNK` at a time. A streamed feed stops
+        at the first chunk that holds only stored entries in newest-first
+        order, as the rest of an archive feed is older still.
+        """
+        added = 0
+        keys = set()
+        try:
+            with get_db() as conn:
+                chunk = []
+                for entry in result.entries:
+                    result.seen += 1
+                    chunk.append(entry)
+                    if len(chunk) < STORE_CHUNK:
+                        continue
+                    chunk_added, known = self._store_chunk(conn, chunk, keys, result)
+                    added += chunk_added
+                    published = [entry[3] for entry in chunk]
+                    chunk = []
+                    if (
+                        result.stream
+                        and known
+                        and published == sorted(published, reverse=True)
+                    ):
+                        result.stopped_early = True
+                        break
+                if chunk:
+                    added += self._store_chunk(conn, chunk, keys, result)[0]
+
+                if result.stream:
+                    result.update_hint = update_hint(result.feed_info)
+                if result.not_modified:
+                    conn.execute(
+                        "UPDATE feeds SET last_fetched=? WHERE id=?",
+                        (datetime.now(), result.feed_id),
                     )
-                    conn.commit()
-                new_count += len(entries_to_add)
-                console.print(f"  -> Found {len(entries_to_add)} new articles.")
-            else:
-                console.print("  -> No new articles.")
+                else:
+                    conn.execute(
+                        "UPDATE feeds SET last_fetched=?, etag=?, last_modified=? WHERE id=?",
+                        (
+                            datetime.now(),
+                            result.etag,
+                            result.last_modified,
+                            result.feed_id,
+                        ),
+                    )
+                conn.commit()
+        finally:
+            if result.stream:
+                result.entries.close()
+                result.stream.close()
+        return added
+
+    def _cadence(self, conn, feed_id: int) -> Optional[float]:
+        """Median seconds between the feed's recent articles."""
+        published = [
+            datetime.fromisoformat(str(row[0]))
+            for row in conn.execute(RECENT_PUBLISHED_QUERY, (feed_id, CADENCE_SAMPLE))
+        ]
+        gaps = [
+            (newer - older).total_seconds()
+            for newer, older in zip(published, published[1:])
+        ]
+        return statistics.median(gaps) if gaps else None
+
+    def next_interval(self, row, result: FetchResult, added: int, cadence) -> tuple:
+        """Seconds until a feed is due again, with its updated failure and
+        empty-fetch counts.
+
+        Feeds are polled at half their typical publishing gap. Failures
+        double the interval and fetches without new articles stretch it by
+        half, each up to `MAX_BACKOFF_STEPS` times; a fetch where every
+        entry was new halves it, as articles may have been missed. The
+        feed's own update hint is a lower bound.
+        """
+        failures = row["fetch_failures"] or 0
+        empty = row["empty_fetches"] or 0
+        base = cadence / 2 if cadence else self.max_interval
+
+        if result.error:
+            failures += 1
+            interval = base * 2 ** min(failures, MAX_BACKOFF_STEPS)
+        elif added:
+            failures = empty = 0
+            interval = base
+            if added >= result.seen > 1:
+                interval = min(base, row["poll_interval"] or base) / 2
+        else:
+            failures = 0
+            empty += 1
+            interval = base * 1.5 ** min(empty, MAX_BACKOFF_STEPS)
+
+        hint = result.update_hint or row["update_hint"]
+        if hint:
+            interval = max(interval, hint)
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        return interval, failures, empty
+
+    def _schedule(self, row, result: FetchResult, added: int):
+        """Store when the feed is due next."""
+        with get_db() as conn, span("db.write"):
+            cadence = self._cadence(conn, row["id"])
+            interval, failures, empty = self.next_interval(row, result, added, cadence)
+            conn.execute(
+                """
+                UPDATE feeds
+                SET next_fetch_at=?, poll_interval=?, fetch_failures=?,
+                    empty_fetches=?, update_hint=COALESCE(?, update_hint)
+                WHERE id=?
+            """,
+                (
+                    datetime.now() + timedelta(seconds=interval),
+                    interval,
+                    failures,
+                    empty,
+                    result.update_hint,
+                    row["id"],
+                ),
+            )
+            conn.commit()
+
+    def due_feeds(self) -> list:
+        """Active feeds whose next fetch is due; never fetched feeds are."""
+        with get_db() as conn:
+            feeds = conn.execute(ACTIVE_FEEDS_QUERY, (datetime.now(),)).fetchall()
+        return [row for row in feeds if row["due"]]
+
+    def next_due(self) -> Optional[datetime]:
+        """When the next active feed falls due, or None if one already is
+        or there are no feeds."""
+        with get_db() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS feeds, COUNT(next_fetch_at) AS scheduled,
+                       MIN(next_fetch_at) AS next_fetch_at
+                FROM feeds WHERE is_active=1
+            """).fetchone()
+        if not row["feeds"] or row["scheduled"] < row["feeds"]:
+            return None
+        return datetime.fromisoformat(row["next_fetch_at"])
+
+    def fetch_all(self, concurrency=None, per_host=None, timeout=None, force=False):
+        """Fetch new articles from active feeds that are due, or from all of
+        them with `force`."""
+        with get_db() as conn:
+            feeds = conn.execute(ACTIVE_FEEDS_QUERY, (datetime.now(),)).fetchall()
+        due = [row for row in feeds if force or row["due"]]
+
+        self.fetch_feeds(due, concurrency, per_host, timeout)
+        self.last_stats.not_due = len(feeds) - len(due)
+        return self.last_stats.new
+
+    def fetch_feeds(
+        self, feeds, concurrency=None, per_host=None, timeout=None, on_result=None
+    ) -> FetchStats:
+        """Fetch the given feed rows.
+
+        Feeds are downloaded and parsed by a bounded thread pool; results are
+        written to SQLite from the calling thread only, one feed at a time,
+        together with when each feed is due next, and then passed to
+        `on_result` if given. Also sets `last_stats`.
+        """
+        concurrency = concurrency or config.FETCH_CONCURRENCY
+        limiter = HostLimiter(per_host or config.FETCH_PER_HOST_LIMIT)
+        timeout = timeout or config.FETCH_TIMEOUT
+
+        rows = {row["id"]: row for row in feeds}
+        stats = FetchStats(feeds=len(feeds))
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [
+                pool.submit(self._fetch_feed, row, limiter, timeout) for row in feeds
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                stats.bytes += result.bytes
+                metrics.FETCH_SECONDS.observe(result.elapsed, feed=result.name)
+                metrics.FETCH_BYTES.inc(result.bytes, feed=result.name)
+                label = f"{result.name} [dim]({result.elapsed:.2f}s)[/dim]"
+                added = 0
+                if result.error:
+                    stats.errors += 1
+                    metrics.FETCHES.inc(feed=result.name, outcome="error")
+                    message = f"[red]Error fetching[/red] {label}: {result.error}"
+                else:
+                    added = self._store_result(result)
+                    duplicates = result.seen - added
+                    stats.new += added
+                    stats.duplicates += duplicates
+                    stats.near_duplicates += result.near_duplicates
+                    metrics.ENTRIES_PARSED.inc(result.seen, feed=result.name)
+                    metrics.ENTRIES_INSERTED.inc(added, feed=result.name)
+                    metrics.FETCHES.inc(
+                        feed=result.name,
+                        outcome="not_modified" if result.not_modified else "ok",
+                    )
+                    if result.not_modified:
+                        stats.not_modified += 1
+                        message = f"{label} -> Not modified, skipped."
+                    elif added:
+                        note = ", stopped at known ones" if result.stopped_early else ""
+                        message = (
+                            f"{label} -> Found {added} new articles "
+                            f"({duplicates} duplicates, "
+                            f"{result.near_duplicates} near-duplicates{note})."
+                        )
+                    else:
+                        message = f"{label} -> No new articles."
+                with span("console"):
+                    console.print(message)
+
+                self._schedule(rows[result.feed_id], result, added)
+                if on_result:
+                    on_result(result)
 
-        return new_count
+        self.last_stats = stats
+        return stats
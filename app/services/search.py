@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import Optional
+from app.db import get_db
+from app.utils import cjk_bigrams
+
+# The trigram tokenizer cannot match terms shorter than this; shorter ones
+# go to the articles_words index, which matches whole words and CJK
+# characters or character pairs (see app.utils.cjk_bigrams)
+MIN_TERM_LENGTH = 3
+
+# Markers around matched text in snippets, replaced by the caller
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# bm25 weights for title, summary, content, analysis and category
+BM25_WEIGHTS = (10.0, 2.0, 1.0, 3.0, 5.0)
+
+# Matches considered for ranking, newest first. Scoring every match of a
+# common term across a million articles is what makes searches slow.
+SEARCH_CANDIDATES = 2000
+
+# bm25 is negative, lower is better: each LLM score point strengthens a
+# match by 10%, so a 9/10 article outranks a slightly closer 2/10 one
+SEARCH_QUERY = """
+    SELECT * FROM (
+        SELECT a.id, a.title, a.link, a.score, a.category, a.published, a.status,
+               f.name AS feed_name,
+               substr(COALESCE(a.summary, ''), 1, 300) AS snippet,
+               bm25({index}, {weights}) * (1 + COALESCE(a.score, 0) / 10.0) AS rank
+        FROM {index}
+        JOIN articles a ON a.id = {index}.rowid
+        JOIN feeds f ON f.id = a.feed_id
+        WHERE {index} MATCH ?{filters}
+        ORDER BY {index}.rowid DESC
+        LIMIT ?
+    )
+    ORDER BY rank
+    LIMIT ?
+"""
+
+# Short terms of a query that also has long ones
+WORDS_FILTER = """
+        AND a.id IN (SELECT rowid FROM articles_words WHERE articles_words MATCH ?)"""
+
+# Snippets for the final page only; rowid lookups keep this cheap
+SNIPPET_QUERY = """
+    SELECT rowid, snippet(articles_fts, -1, ?, ?, '…', 16) AS snippet
+    FROM articles_fts
+    WHERE articles_fts MATCH ? AND rowid IN ({placeholders})
+"""
+
+
+def match_expression(terms: list) -> str:
+    """FTS5 query matching every term as a literal phrase."""
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    for ch in ("\\", "%", "_"):
+        term = term.replace(ch, "\\" + ch)
+    return f"%{term}%"
+
+
+def search_articles(
+    text: str,
+    limit: int = 20,
+    category: Optional[str] = None,
+    feed: Optional[str] = None,
+    score_min: int = 0,
+    since: Optional[datetime] = None,
+) -> list:
+    """Search stored articles, best matches first, as dicts with a
+    highlighted `snippet`.
+
+    Every whitespace-separated term must match. Near-duplicates are left
+    out in favour of their cluster leader, and only the newest
+    `SEARCH_CANDIDATES` matches are ranked. Terms of three or more
+    characters match anywhere in the text; shorter ones only match whole
+    words, or CJK characters and character pairs, so "AI" finds "AI" but
+    not "said". Without a long term there is nothing to highlight, and the
+    snippet is the start of the summary.
+    """
+    terms = text.split()
+    if not terms:
+        return []
+    long_terms = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    short_terms = [cjk_bigrams(term) for term in terms if len(term) < MIN_TERM_LENGTH]
+
+    filters = "\n        AND a.status != 'duplicate'"
+    params = []
+    if long_terms and short_terms:
+        filters += WORDS_FILTER
+        params.append(match_expression(short_terms))
+    if category:
+        filters += "\n        AND a.category = ?"
+        params.append(category)
+    if feed:
+        filters += "\n        AND f.name LIKE ? ESCAPE '\\'"
+        params.append(_like_pattern(feed))
+    if score_min:
+        filters += "\n        AND a.score >= ?"
+        params.append(score_min)
+    if since:
+        filters += "\n        AND a.published >= ?"
+        params.append(since)
+
+    index = "articles_fts" if long_terms else "articles_words"
+    match = match_expression(long_terms or short_terms)
+    weights = ", ".join(map(str, BM25_WEIGHTS))
+    with get_db() as conn:
+        rows = [
+            dict(row)
+            for row in conn.execute(
+                SEARCH_QUERY.format(index=index, weights=weights, filters=filters),
+                [match] + params + [SEARCH_CANDIDATES, limit],
+            )
+        ]
+        if rows and long_terms:
+            snippets = dict(
+                conn.execute(
+                    SNIPPET_QUERY.format(placeholders=",".join("?" * len(rows))),
+                    [HIGHLIGHT_START, HIGHLIGHT_END, match] + [r["id"] for r in rows],
+                ).fetchall()
+            )
+            for row in rows:
+                row["snippet"] = snippets.get(row["id"], "")
+        return rows
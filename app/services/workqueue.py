@@ -0,0 +1,170 @@
+import os
+import socket
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from app.config import config
+from app.db import get_db
+
+# Served by idx_articles_retry (see app.db migrations)
+DUE_RETRIES_QUERY = """
+    UPDATE articles SET status = 'new', next_attempt_at = NULL
+    WHERE status = 'retry' AND next_attempt_at <= ?
+    RETURNING id
+"""
+
+# Both served by idx_articles_claimable
+RECLAIM_QUERY = """
+    UPDATE articles SET lease_owner = NULL, lease_expires = NULL
+    WHERE status = 'new' AND lease_expires < ?
+    RETURNING id
+"""
+CLAIM_QUERY = """
+    UPDATE articles SET lease_owner = ?, lease_expires = ?
+    WHERE id IN (
+        SELECT id FROM articles
+        WHERE status = 'new' AND lease_expires IS NULL
+        ORDER BY id
+        LIMIT ?
+    )
+    RETURNING *
+"""
+CLAIM_IDS_QUERY = """
+    UPDATE articles SET lease_owner = ?, lease_expires = ?
+    WHERE id IN ({placeholders}) AND status = 'new' AND lease_expires IS NULL
+    RETURNING *
+"""
+RELEASE_QUERY = """
+    UPDATE articles SET lease_owner = NULL, lease_expires = NULL
+    WHERE lease_owner = ? AND status = 'new' AND id IN ({placeholders})
+"""
+RENEW_QUERY = """
+    UPDATE articles SET lease_expires = ?
+    WHERE lease_owner = ? AND status = 'new' AND id IN ({placeholders})
+"""
+
+REQUEUE_FAILED_QUERY = """
+    UPDATE articles SET status = 'new', retry_count = 0, next_attempt_at = NULL
+    WHERE status IN ({statuses}){kind}
+    RETURNING last_error
+"""
+
+
+def requeue_failed(kind=None, waiting=True) -> Counter:
+    """Put failed articles back in the queue with a fresh retry budget.
+
+    Covers articles that ran out of retries ('error') and, with `waiting`,
+    those still backing off ('retry'). `kind` limits this to one failure
+    class. Returns the number requeued per failure class.
+    """
+    statuses = ["error", "retry"] if waiting else ["error"]
+    query = REQUEUE_FAILED_QUERY.format(
+        statuses=",".join("?" * len(statuses)),
+        kind=" AND last_error = ?" if kind else "",
+    )
+    with get_db() as conn:
+        rows = conn.execute(query, statuses + ([kind] if kind else [])).fetchall()
+        conn.commit()
+    return Counter(row[0] or "unknown" for row in rows)
+
+
+class WorkQueue:
+    """Lease-based claiming of pending articles on the `articles` table.
+
+    A claim marks 'new' articles with this queue's owner id and a lease
+    expiry in one write transaction, so concurrent analyzer processes
+    never get the same rows. Writing a verdict clears the lease; leases of
+    crashed workers expire and are reclaimed by the next claim, so work
+    taking longer than a lease calls `renew` while it runs. `claim`
+    also returns articles whose retry backoff has passed to the queue;
+    callers that claim by id get those from `requeue_due` instead, and
+    expired leases from `reclaim_expired`.
+    """
+
+    def __init__(self, owner=None, lease_seconds=None):
+        self.owner = owner or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.lease_seconds = (
+            config.LLM_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        )
+        self.reclaimed = 0
+        self._lock = threading.Lock()
+
+    def _claim(self, query: str, params: list, requeue_due: bool) -> list:
+        now = datetime.now()
+        expires = now + timedelta(seconds=self.lease_seconds)
+        with get_db() as conn:
+            # Take the write lock up front so the statements are atomic
+            conn.execute("BEGIN IMMEDIATE")
+            if requeue_due:
+                conn.execute(DUE_RETRIES_QUERY, (now,)).fetchall()
+            reclaimed = len(conn.execute(RECLAIM_QUERY, (now,)).fetchall())
+            rows = conn.execute(query, [self.owner, expires] + params).fetchall()
+            conn.commit()
+        with self._lock:
+            self.reclaimed += reclaimed
+        return sorted(rows, key=lambda row: row["id"])
+
+    def claim(self, limit: int) -> list:
+        """Lease up to `limit` pending articles, oldest first."""
+        return self._claim(CLAIM_QUERY, [limit], requeue_due=True)
+
+    def claim_ids(self, ids) -> list:
+        """Lease those of `ids` that are still pending and unleased.
+
+        Leaves due retries alone: flipping them here would lose their ids,
+        which the caller only learns from `requeue_due`.
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        query = CLAIM_IDS_QUERY.format(placeholders=",".join("?" * len(ids)))
+        return self._claim(query, ids, requeue_due=False)
+
+    def requeue_due(self) -> list:
+        """Return articles whose retry backoff has passed to the queue and
+        give their ids, for callers that claim by id."""
+        with get_db() as conn:
+            ids = [row[0] for row in conn.execute(DUE_RETRIES_QUERY, (datetime.now(),))]
+            conn.commit()
+        return ids
+
+    def renew(self, ids) -> int:
+        """Extend the leases still held on `ids` by a full lease period.
+        Returns the number renewed."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        expires = datetime.now() + timedelta(seconds=self.lease_seconds)
+        with get_db() as conn:
+            renewed = conn.execute(
+                RENEW_QUERY.format(placeholders=",".join("?" * len(ids))),
+                [expires, self.owner] + ids,
+            ).rowcount
+            conn.commit()
+        return renewed
+
+    def reclaim_expired(self) -> list:
+        """Clear leases that expired, e.g. of a crashed analyzer, and give
+        the ids of their articles, for callers that claim by id."""
+        with get_db() as conn:
+            ids = [row[0] for row in conn.execute(RECLAIM_QUERY, (datetime.now(),))]
+            conn.commit()
+        with self._lock:
+            self.reclaimed += len(ids)
+        return ids
+
+    def release(self, ids) -> int:
+        """Give up leases on articles that were claimed but not finished."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        with get_db() as conn:
+            released = conn.execute(
+                RELEASE_QUERY.format(placeholders=",".join("?" * len(ids))),
+                [self.owner] + ids,
+            ).rowcount
+            conn.commit()
+        return released
@@ -0,0 +1,154 @@
+import html
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+TAG_RE = re.compile(r"<[^>]+>")
+WHITESPACE_RE = re.compile(r"\s+")
+# Characters counted by `_is_cjk`
+CJK_RUN_RE = re.compile("[\u3000-\u9fff\uff00-\uffef]+")
+SCRIPT_RE = re.compile(
+    r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+# Feed footers and teaser links that say nothing about the article
+BOILERPLATE_RE = re.compile(
+    r"The post .{0,200}? appeared first on .{0,100}$"
+    r"|\b(?:Continue reading|Read more|Read the full (?:article|story))\b.{0,80}$"
+    r"|\[(?:…|\.\.\.)\]"
+    r"|^Comments$"
+    r"|阅读原文|点击查看全文|本文首发于.{0,60}$",
+    re.IGNORECASE,
+)
+
+# Query parameters that only track where a click came from. Not `ref`, which
+# some sites use to identify the article itself
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_hsenc",
+    "_hsmi",
+    "mkt_tok",
+    "ref_src",
+    "spm",
+    "share_source",
+    "share_medium",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def normalize_link(link: str) -> str:
+    """Build a dedup key for an article link.
+
+    Scheme, `www.`, default ports, fragments, trailing slashes and tracking
+    parameters are dropped and the remaining query is sorted, so variants of
+    the same URL map to one key. Fragments of hash-routed pages
+    (`#/post/1`, `#!/post/1`) are kept, as they name the article.
+    """
+    parts = urlsplit(link.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/")
+
+    key = f"{host}{path}"
+    if query:
+        key = f"{key}?{urlencode(query)}"
+    if parts.fragment.startswith(("/", "!")):
+        key = f"{key}#{parts.fragment}"
+    return key
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer.
+
+    CJK characters are counted as one token each, other text as one token
+    per four characters, which is close enough for rate limiting.
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _is_cjk(ch: str) -> bool:
+    return "\u3000" <= ch <= "\u9fff" or "\uff00" <= ch <= "\uffef"
+
+
+def cjk_bigrams(text: Optional[str]) -> Optional[str]:
+    """`text` with each run of CJK characters spelled out as its characters
+    and overlapping pairs, in order: "大模型" becomes "大 大模 模 模型 型".
+
+    A word tokenizer over the result matches one- and two-character CJK
+    terms, and any longer term spelled out the same way.
+    """
+    if not text:
+        return text
+
+    def spell(match):
+        run = match.group()
+        tokens = []
+        for i in range(len(run)):
+            tokens.append(run[i])
+            if i + 1 < len(run):
+                tokens.append(run[i : i + 2])
+        return f" {' '.join(tokens)} "
+
+    return CJK_RUN_RE.sub(spell, text)
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Cut `text` to about `budget` tokens as counted by `estimate_tokens`.
+
+    Cuts at a space when one is near the end, and marks the cut with "…".
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    used, end = 0.0, 0
+    # One token is kept for the ellipsis
+    while end < len(text):
+        used += 1 if _is_cjk(text[end]) else 0.25
+        if used > budget - 1:
+            break
+        end += 1
+    cut = text[:end]
+    space = cut.rfind(" ")
+    if space > end * 0.8:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def strip_html(text: str) -> str:
+    """Remove tags and entities, collapsing whitespace."""
+    if not text:
+        return ""
+    text = html.unescape(TAG_RE.sub(" ", text))
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def clean_text(text: str) -> str:
+    """Readable text of an HTML fragment: no tags, scripts, styles or feed
+    boilerplate such as "The post … appeared first on …"."""
+    if not text:
+        return ""
+    text = strip_html(SCRIPT_RE.sub(" ", text))
+    return WHITESPACE_RE.sub(" ", BOILERPLATE_RE.sub(" ", text)).strip()
+
+
+def normalize_text(text: str) -> str:
+    """Case- and markup-insensitive form of `text` for content hashing."""
+    return strip_html(text).casefold()
@@ -0,0 +1,158 @@
+"""Benchmark for moving article bodies out of the `articles` table.
+
+Builds a database with bodies stored inline, as before migration 13,
+measures its size and the latency of the report/daily queries and a full
+pass over `articles`, then applies the migration and measures again.
+
+    python -m benchmarks.bench_bodies --rows 20000
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import app.db
+from app.cli import DAILY_QUERY, REPORT_QUERY
+from app.config import Config
+from app.db import MIGRATIONS, close_pools, get_db, init_db
+
+# Moves bodies into the compressed article_bodies table
+BODIES_MIGRATION = 13
+
+# The articles table as it was before bodies moved to article_bodies
+INLINE_SCHEMA = """
+CREATE TABLE feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    url TEXT UNIQUE NOT NULL,
+    last_fetched TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1
+);
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    feed_id INTEGER,
+    title TEXT,
+    link TEXT UNIQUE NOT NULL,
+    published TIMESTAMP,
+    summary TEXT,
+    content TEXT,
+    status TEXT DEFAULT 'new',
+    score INTEGER DEFAULT 0,
+    analysis TEXT,
+    category TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(feed_id) REFERENCES feeds(id)
+);
+"""
+
+START = datetime(2025, 1, 1)
+WORDS = "sqlite index page cache query latency vacuum btree wal checkpoint".split()
+
+QUERIES = {
+    "report": (REPORT_QUERY, (0, 20)),
+    "daily": (DAILY_QUERY, (5, START, START + timedelta(days=1))),
+    "scan": ("SELECT feed_id, AVG(score) FROM articles GROUP BY feed_id", ()),
+}
+
+
+def html(rng: random.Random, words: int) -> str:
+    paragraphs = [
+        "<p>" + " ".join(rng.choices(WORDS, k=40)) + "</p>" for _ in range(words // 40)
+    ]
+    return '<div class="post">' + "\n".join(paragraphs) + "</div>"
+
+
+def populate(rows: int, body_words: int):
+    rng = random.Random(42)
+    conn = sqlite3.connect(Config.DB_PATH)
+    conn.executescript(INLINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO feeds (name, url) VALUES (?, ?)",
+        [(f"Feed {i}", f"http://feed{i}.example.com") for i in range(20)],
+    )
+    conn.executemany(
+        """
+        INSERT INTO articles
+            (feed_id, title, link, published, summary, content, status, score,
+             analysis, category)
+        VALUES (?, ?, ?, ?, ?, ?, 'analyzed', ?, 'Worth a look', 'Tech')
+    """,
+        (
+            (
+                i % 20 + 1,
+                f"Article {i}",
+                f"http://example.com/{i}",
+                START + timedelta(minutes=10 * i),
+                html(rng, 40),
+                html(rng, body_words),
+                rng.randint(0, 10),
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(repeat: int) -> dict:
+    """Mean milliseconds per query, on freshly opened connections."""
+    close_pools()
+    timings = {}
+    with get_db() as conn:
+        for name, (query, params) in QUERIES.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(query, params).fetchall()
+            timings[name] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def vacuum_size() -> int:
+    close_pools()
+    conn = sqlite3.connect(Config.DB_PATH)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return Path(Config.DB_PATH).stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--body-words", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.object(Config, "DB_PATH", Path(tmp) / "bench.db"):
+            populate(args.rows, args.body_words)
+            # By version, as later migrations are appended after this one
+            inline = [m for m in MIGRATIONS if m[0] < BODIES_MIGRATION]
+            with patch.object(app.db, "MIGRATIONS", inline):
+                init_db()
+            before = (vacuum_size(), measure(args.repeat))
+
+            compressed = [m for m in MIGRATIONS if m[0] <= BODIES_MIGRATION]
+            start = time.perf_counter()
+            with patch.object(app.db, "MIGRATIONS", compressed):
+                init_db()
+            migrated = time.perf_counter() - start
+            after = (vacuum_size(), measure(args.repeat))
+            close_pools()
+
+    print(f"rows: {args.rows}, body: ~{args.body_words} words")
+    print(f"migration: {migrated:.1f}s")
+    print(f"{'':12}{'inline':>12}{'compressed':>12}")
+    print(f"{'db size':12}{before[0] / 2**20:>10.1f}MB{after[0] / 2**20:>10.1f}MB")
+    for name in QUERIES:
+        b, a = before[1][name], after[1][name]
+        print(f"{name:12}{b:>10.2f}ms{a:>10.2f}ms  ({b / a:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
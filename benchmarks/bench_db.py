@@ -0,0 +1,72 @@
+"""Micro-benchmark for the per-call overhead of `app.db.get_db`.
+
+Compares opening a fresh connection per call (the previous behaviour) with
+the pooled, pragma-tuned connections, each running one indexed lookup.
+
+    python -m benchmarks.bench_db --calls 5000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+from app.config import Config
+from app.db import close_pools, get_db, init_db
+
+
+@contextmanager
+def unpooled_db():
+    """The original get_db: one connection per call."""
+    conn = sqlite3.connect(Config.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def measure(factory, calls: int) -> float:
+    """Return the mean microseconds per call of `factory` plus a lookup."""
+    start = time.perf_counter()
+    for i in range(calls):
+        with factory() as conn:
+            conn.execute(
+                "SELECT id FROM articles WHERE link=?", (f"http://example.com/{i}",)
+            ).fetchone()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.object(Config, "DB_PATH", Path(tmp) / "bench.db"):
+            init_db()
+            with get_db() as conn:
+                conn.executemany(
+                    "INSERT INTO articles (title, link) VALUES (?, ?)",
+                    (
+                        (f"Article {i}", f"http://example.com/{i}")
+                        for i in range(args.rows)
+                    ),
+                )
+                conn.commit()
+
+            before = measure(unpooled_db, args.calls)
+            after = measure(get_db, args.calls)
+            close_pools()
+
+    print(f"calls: {args.calls}, rows: {args.rows}")
+    print(f"connect per call: {before:8.1f} us/call")
+    print(f"pooled get_db:    {after:8.1f} us/call ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
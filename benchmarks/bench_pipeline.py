@@ -0,0 +1,282 @@
+"""End-to-end throughput benchmark for fetching and analysis.
+
+Serves synthetic feeds and a fake OpenAI-compatible endpoint from this
+process (see benchmarks.servers), then for each number of feeds runs
+`fetch_feeds` and `process_pending` against a fresh database in a child
+process, and reports articles/sec, p50/p99 latency and peak memory.
+
+    python -m benchmarks.bench_pipeline --feeds 10,100,1000
+    python -m benchmarks.bench_pipeline --save benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json
+
+With --baseline it exits with status 1 when a throughput, p99 or memory
+figure is more than --tolerance worse than the saved one.
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.servers import FakeLLMServer, FeedServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Figure, path in the results, and whether higher is better
+COMPARED = (
+    ("fetch articles/s", ("fetch", "articles_per_sec"), True),
+    ("fetch p99 ms", ("fetch", "p99_ms"), False),
+    ("analyze articles/s", ("analyze", "articles_per_sec"), True),
+    ("analyze p99 ms", ("analyze", "p99_ms"), False),
+    ("peak RSS MB", ("peak_rss_mb",), False),
+)
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile, 0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def run_scale(feeds: int, feed_urls: list, llm_url: str, settings: dict) -> dict:
+    """Fetch and analyze `feeds` feeds into a fresh database. Runs in a
+    child process, so configuration and peak memory start clean."""
+    from app.config import Config
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DB_PATH = Path(tmp) / "bench.db"
+        Config.BASE_URL = llm_url
+        Config.API_KEY = "bench"
+        Config.PREFILTER_ENABLED = settings["prefilter"]
+        Config.EMBEDDINGS_ENABLED = False
+        Config.METRICS_TEXTFILE_DIR = ""
+
+        from app.db import close_pools, get_db, init_db
+        from app.services.llm import LLMService
+        from app.services.rss import ACTIVE_FEEDS_QUERY, RSSService
+
+        init_db()
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO feeds (name, url) VALUES (?, ?)",
+                [(f"Bench {n}", url) for n, url in enumerate(feed_urls[:feeds])],
+            )
+            conn.commit()
+            rows = conn.execute(ACTIVE_FEEDS_QUERY, (datetime.now(),)).fetchall()
+
+        rss = RSSService()
+        fetch_latencies = []
+        # Per-feed and per-article progress lines would dominate the output
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            stats = rss.fetch_feeds(
+                rows,
+                concurrency=settings["fetch_concurrency"],
+                per_host=settings["fetch_concurrency"],
+                on_result=lambda result: fetch_latencies.append(result.elapsed),
+            )
+            fetch_seconds = time.perf_counter() - start
+
+            llm = LLMService()
+            completions = llm.client.chat.completions
+            create = completions.create
+            request_latencies = []
+
+            def timed_create(**kwargs):
+                start = time.perf_counter()
+                try:
+                    return create(**kwargs)
+                finally:
+                    request_latencies.append(time.perf_counter() - start)
+
+            completions.create = timed_create
+            limit = settings["analyze_limit"] or stats.new
+            start = time.perf_counter()
+            llm.process_pending(
+                limit,
+                concurrency=settings["llm_concurrency"],
+                batch_size=settings["batch_size"],
+                rpm=0,
+                tpm=0,
+            )
+            analyze_seconds = time.perf_counter() - start
+        analysis = llm.last_stats
+        close_pools()
+
+    done = analysis.analyzed + analysis.errors + analysis.skipped
+    return {
+        "feeds": feeds,
+        "articles": stats.new,
+        "fetch": {
+            "seconds": round(fetch_seconds, 3),
+            "articles_per_sec": round(stats.new / fetch_seconds, 1),
+            "mb_downloaded": round(stats.bytes / 2**20, 2),
+            "near_duplicates": stats.near_duplicates,
+            "errors": stats.errors,
+            "p50_ms": round(percentile(fetch_latencies, 50) * 1000, 1),
+            "p99_ms": round(percentile(fetch_latencies, 99) * 1000, 1),
+        },
+        "analyze": {
+            "seconds": round(analyze_seconds, 3),
+            "articles": done,
+            "articles_per_sec": round(done / analyze_seconds, 1),
+            "requests": len(request_latencies),
+            "errors": analysis.errors + analysis.retried,
+            "p50_ms": round(percentile(request_latencies, 50) * 1000, 1),
+            "p99_ms": round(percentile(request_latencies, 99) * 1000, 1),
+        },
+        "peak_rss_mb": peak_rss_mb() and round(peak_rss_mb(), 1),
+    }
+
+
+def print_results(results: list):
+    print(
+        f"{'feeds':>6} {'articles':>8} | {'fetch/s':>8} {'p50':>7} {'p99':>7} "
+        f"{'err':>4} | {'analyze/s':>9} {'p50':>7} {'p99':>7} {'reqs':>5} "
+        f"{'429':>4} | {'peak RSS':>9}"
+    )
+    for r in results:
+        fetch, analyze = r["fetch"], r["analyze"]
+        rss = f"{r['peak_rss_mb']:.0f}MB" if r["peak_rss_mb"] else "-"
+        print(
+            f"{r['feeds']:>6} {r['articles']:>8} | "
+            f"{fetch['articles_per_sec']:>8.0f} {fetch['p50_ms']:>5.0f}ms "
+            f"{fetch['p99_ms']:>5.0f}ms {fetch['errors']:>4} | "
+            f"{analyze['articles_per_sec']:>9.0f} {analyze['p50_ms']:>5.0f}ms "
+            f"{analyze['p99_ms']:>5.0f}ms {analyze['requests']:>5} "
+            f"{r['rate_limited']:>4} | {rss:>9}"
+        )
+
+
+def _lookup(result: dict, path: tuple):
+    for key in path:
+        result = result[key]
+    return result
+
+
+def compare(results: list, settings: dict, baseline: dict, tolerance: float) -> list:
+    """Print the change against `baseline` per scale and figure; return
+    the regressions beyond `tolerance`."""
+    if baseline["settings"] != settings:
+        print("Note: the baseline was run with different settings.")
+    previous = {r["feeds"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["feeds"])
+        if not before:
+            continue
+        changes = []
+        for name, path, higher_is_better in COMPARED:
+            old, new = _lookup(before, path), _lookup(result, path)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " !"
+                regressions.append((result["feeds"], name, old, new))
+            changes.append(f"{name} {change:+.0%}{flag}")
+        print(f"{result['feeds']:>6} feeds: " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feeds", default="10,100,1000", help="Comma-separated.")
+    parser.add_argument("--items", type=int, default=20, help="Entries per feed.")
+    parser.add_argument("--words", type=int, default=200, help="Words per entry.")
+    parser.add_argument("--feed-latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-rpm", type=int, default=0, help="0: no rate limit.")
+    parser.add_argument("--fetch-concurrency", type=int, default=16)
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument(
+        "--analyze-limit", type=int, default=0, help="0: every new article."
+    )
+    parser.add_argument("--prefilter", action="store_true")
+    parser.add_argument("--save", type=Path, help="Write the results as a baseline.")
+    parser.add_argument("--baseline", type=Path, help="Compare with a saved run.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scales = [int(n) for n in args.feeds.split(",")]
+    settings = dict(
+        items=args.items,
+        words=args.words,
+        feed_latency=args.feed_latency,
+        error_rate=args.error_rate,
+        llm_latency=args.llm_latency,
+        llm_rpm=args.llm_rpm,
+        fetch_concurrency=args.fetch_concurrency,
+        llm_concurrency=args.llm_concurrency,
+        batch_size=args.batch_size,
+        analyze_limit=args.analyze_limit,
+        prefilter=args.prefilter,
+    )
+
+    results = []
+    with FeedServer(
+        max(scales), args.items, args.words, args.feed_latency, args.error_rate
+    ) as feed_server, FakeLLMServer(args.llm_latency, args.llm_rpm) as llm_server:
+        urls = [feed_server.url(n) for n in range(max(scales))]
+        for feeds in scales:
+            limited = llm_server.rate_limited
+            spawn = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(1, mp_context=spawn) as pool:
+                result = pool.submit(
+                    run_scale, feeds, urls, llm_server.base_url, settings
+                ).result()
+            result["rate_limited"] = llm_server.rate_limited - limited
+            results.append(result)
+
+    print_results(results)
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cpus": os.cpu_count(),
+                    "settings": settings,
+                    "results": results,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"Saved baseline to {args.save}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, settings, baseline, args.tolerance)
+        for feeds, name, old, new in regressions:
+            print(f"Regression at {feeds} feeds: {name} {old} -> {new}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Local HTTP servers for end-to-end benchmarks.
+
+`FeedServer` serves synthetic RSS 2.0 and Atom feeds, `FakeLLMServer` an
+OpenAI-compatible chat completions endpoint that answers the prompts of
+`app.services.llm` with made-up verdicts. Both run in a background thread:
+
+    with FeedServer(feeds=100, latency=0.02) as feeds, FakeLLMServer() as llm:
+        urls = [feeds.url(n) for n in range(100)]
+        base_url = llm.base_url
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# Real terms plus a few thousand made-up ones: with a small vocabulary the
+# generated articles look alike and near-duplicate detection folds them up
+TERMS = (
+    "sqlite index cache query latency vacuum btree checkpoint compiler kernel "
+    "scheduler allocator tokenizer embedding gradient transformer inference "
+    "benchmark profiler thread async runtime rust python llvm wasm gpu tensor "
+    "cluster replica consensus raft shard queue backpressure throughput"
+).split()
+SYLLABLES = "ka ri to mu ne so la vi de po zu fe ga hi jo ba".split()
+WORDS = TERMS + [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+START = datetime(2025, 1, 1)
+FEED_PATH_RE = re.compile(r"^/feeds/(\d+)\.xml$")
+BATCH_ID_RE = re.compile(r"\[id=(\d+)\]")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once
+    request_queue_size = 128
+
+
+class _Background:
+    """Runs `handler` on an ephemeral localhost port while in a `with`."""
+
+    handler = BaseHTTPRequestHandler
+
+    def start(self):
+        owner = self
+
+        class Handler(self.handler):
+            server_owner = owner
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        owner = self.server_owner
+        match = FEED_PATH_RE.match(self.path)
+        if not match or int(match.group(1)) >= owner.feeds:
+            self.send_error(404)
+            return
+        n = int(match.group(1))
+        time.sleep(owner.latency)
+        if owner.fails(n):
+            self.send_error(500)
+            return
+        body = owner.render(n)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FeedServer(_Background):
+    """Serves `feeds` feeds at /feeds/<n>.xml, RSS for even n and Atom for
+    odd n, each with `items` entries of about `words` words of content.
+
+    Every request waits `latency` seconds. A fixed share `error_rate` of
+    the feeds answers 500. Content is generated from `seed`, so the same
+    settings always serve the same bytes.
+    """
+
+    handler = _FeedHandler
+
+    def __init__(
+        self, feeds, items=20, words=200, latency=0.0, error_rate=0.0, seed=42
+    ):
+        self.feeds = feeds
+        self.items = items
+        self.words = words
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def url(self, n: int) -> str:
+        return f"http://127.0.0.1:{self.port}/feeds/{n}.xml"
+
+    def fails(self, n: int) -> bool:
+        return random.Random(f"{self.seed}:error:{n}").random() < self.error_rate
+
+    def _entries(self, n: int):
+        rng = random.Random(f"{self.seed}:{n}")
+        for i in range(self.items, 0, -1):
+            yield (
+                f"http://bench.example.com/{n}/{i}",
+                " ".join(rng.choices(WORDS, k=8)).capitalize(),
+                START + timedelta(hours=i),
+                " ".join(rng.choices(WORDS, k=40)),
+                " ".join(rng.choices(WORDS, k=self.words)),
+            )
+
+    def render(self, n: int) -> bytes:
+        if n % 2:
+            entries = "".join(f"""
+  <entry>
+    <id>{link}</id>
+    <title>{escape(title)}</title>
+    <link href="{link}"/>
+    <updated>{published:%Y-%m-%dT%H:%M:%SZ}</updated>
+    <summary>{escape(summary)}</summary>
+    <content type="html">{escape(f"<p>{content}</p>")}</content>
+  </entry>""" for link, title, published, summary, content in self._entries(n))
+            return f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Bench feed {n}</title>
+  <id>http://bench.example.com/{n}</id>
+  <updated>{START:%Y-%m-%dT%H:%M:%SZ}</updated>{entries}
+</feed>""".encode()
+
+        items = "".join(f"""
+    <item>
+      <title>{escape(title)}</title>
+      <link>{link}</link>
+      <guid>{link}</guid>
+      <pubDate>{published:%a, %d %b %Y %H:%M:%S} GMT</pubDate>
+      <description>{escape(summary)}</description>
+      <content:encoded><![CDATA[<p>{content}</p>]]></content:encoded>
+    </item>""" for link, title, published, summary, content in self._entries(n))
+        return f"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+  <channel>
+    <title>Bench feed {n}</title>
+    <link>http://bench.example.com/{n}</link>{items}
+  </channel>
+</rss>""".encode()
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, payload: dict, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        owner = self.server_owner
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.path.endswith("/chat/completions"):
+            self._reply(404, {"error": {"message": "not found"}})
+            return
+        wait = owner.admit()
+        if wait:
+            self._reply(
+                429,
+                {"error": {"message": "rate limited", "type": "rate_limit"}},
+                [("retry-after", f"{wait:.3f}")],
+            )
+            return
+        time.sleep(owner.latency)
+        content, completion_tokens = owner.answer(request["messages"][-1]["content"])
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+        self._reply(
+            200,
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "bench"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+
+class FakeLLMServer(_Background):
+    """OpenAI-compatible `/v1/chat/completions` with made-up verdicts.
+
+    Batch prompts, recognised by their `[id=N]` markers, get one result
+    per id; other prompts a single verdict. Each answer takes `latency`
+    seconds. With `rpm`, requests beyond that many in the last minute
+    get 429 with a retry-after header, like a rate-limited API.
+    """
+
+    handler = _LLMHandler
+
+    def __init__(self, latency=0.05, rpm=0):
+        self.latency = latency
+        self.rpm = rpm
+        self.requests = 0
+        self.rate_limited = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def admit(self) -> float:
+        """0 if the request may go ahead, else seconds until it may."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - 60:
+                self._recent.popleft()
+            if self.rpm and len(self._recent) >= self.rpm:
+                self.rate_limited += 1
+                return self._recent[0] + 60 - now
+            self._recent.append(now)
+            self.requests += 1
+            return 0.0
+
+    @staticmethod
+    def _verdict(text: str) -> dict:
+        digest = hashlib.blake2b(text.encode(), digest_size=2).digest()
+        return {
+            "score": digest[0] % 11,
+            "reason": "基准测试生成的结论",
+            "category": ("人工智能", "编程开发", "科技新闻")[digest[1] % 3],
+        }
+
+    def answer(self, prompt: str) -> tuple:
+        """Reply content and completion tokens for a user prompt."""
+        ids = BATCH_ID_RE.findall(prompt)
+        if not ids:
+            return json.dumps(self._verdict(prompt), ensure_ascii=False), 30
+        results = [{"id": int(i), **self._verdict(f"{prompt}:{i}")} for i in ids]
+        return json.dumps({"results": results}, ensure_ascii=False), 30 * len(ids)
@@ -0,0 +1,90 @@
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.services.cache import VerdictCache
+
+
+class TestVerdictCache(unittest.TestCase):
+    """Test the content-hash verdict cache."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        self.cache = VerdictCache("qwen-turbo:1", ttl_days=30, max_entries=3)
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def test_key_ignores_case_markup_and_whitespace(self):
+        """Test that cosmetic differences map to the same key."""
+        self.assertEqual(
+            self.cache.key("Hello  World", "<p>Some &amp; text</p>"),
+            self.cache.key("hello world", "some & text"),
+        )
+
+    def test_key_depends_on_namespace(self):
+        """Test that model or prompt changes do not reuse verdicts."""
+        other = VerdictCache("qwen-max:1")
+        self.assertNotEqual(
+            self.cache.key("Title", "Summary"), other.key("Title", "Summary")
+        )
+
+    def test_get_and_put_count_hits_and_misses(self):
+        """Test a miss, a store and a hit."""
+        self.assertIsNone(self.cache.get("Title", "Summary"))
+        self.cache.put("Title", "Summary", 8, "好文章", "AI")
+
+        self.assertEqual(
+            self.cache.get("Title", "Summary"),
+            {"score": 8, "reason": "好文章", "category": "AI"},
+        )
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.info()["hits"], 1)
+
+    def test_expired_entries_are_ignored_and_evicted(self):
+        """Test TTL handling."""
+        self.cache.put("Old", "Story", 5, "旧", "新闻")
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE llm_cache SET created_at=?",
+                (datetime.now() - timedelta(days=31),),
+            )
+            conn.commit()
+
+        self.assertIsNone(self.cache.get("Old", "Story"))
+        self.assertEqual(self.cache.evict(), 1)
+
+    def test_evict_keeps_most_recently_used(self):
+        """Test the size cap drops the least recently used entries."""
+        for i in range(5):
+            self.cache.put(f"Title {i}", "Summary", i, "r", "c")
+        self.cache.get("Title 0", "Summary")
+
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertIsNotNone(self.cache.get("Title 0", "Summary"))
+        self.assertIsNone(self.cache.get("Title 1", "Summary"))
+
+    def test_purge_removes_everything(self):
+        """Test purging the cache."""
+        self.cache.put("Title", "Summary", 8, "r", "c")
+        self.assertEqual(self.cache.purge(), 1)
+        self.assertEqual(self.cache.info()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
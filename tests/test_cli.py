@@ -0,0 +1,303 @@
+import base64
+import json
+import subprocess
+import sys
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+from typer.testing import CliRunner
+from app.cli import app, decode_cursor, encode_cursor
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+
+# Runs a command against the database given as the first argument
+COMMAND_SCRIPT = """
+import sys
+from pathlib import Path
+from app.config import Config
+Config.DB_PATH = Path(sys.argv[1])
+from app.cli import app
+app(sys.argv[2:], prog_name="manage.py")
+"""
+HEAVY = {"feedparser", "numpy", "openai", "pydantic", "requests"}
+# Budget in milliseconds for everything imported by the process, including
+# the interpreter's own startup, and the heavy packages each command may use
+COMMAND_IMPORTS = {
+    ("list-feeds",): (400, set()),
+    ("stats",): (400, set()),
+    ("report", "--top", "5"): (400, set()),
+    ("daily",): (400, set()),
+    ("search", "article"): (400, set()),
+    ("prefilter",): (400, set()),
+    ("retry-errors",): (400, set()),
+    ("cache",): (400, set()),
+    ("fetch",): (700, {"feedparser", "requests"}),
+}
+
+
+def encode_cursor_values(values) -> str:
+    """An `--after` token holding arbitrary JSON."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class TestReportCommands(unittest.TestCase):
+    """Test report/daily streaming output and pagination."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        self.day = datetime(2025, 1, 1, 8)
+        with get_db() as conn:
+            conn.execute("INSERT INTO feeds (name, url) VALUES ('Feed', 'http://f')")
+            # Pairs of equal score and published time exercise the id tie-breaker
+            conn.executemany(
+                """
+                INSERT INTO articles
+                    (feed_id, title, link, link_key, published, status, score,
+                     category, analysis)
+                VALUES (1, ?, ?, ?, ?, 'analyzed', ?, 'Tech', 'why')
+            """,
+                [
+                    (
+                        f"Article {i}",
+                        f"http://f/{i}",
+                        f"f/{i}",
+                        self.day + timedelta(hours=i // 2),
+                        9 - i // 4,
+                    )
+                    for i in range(10)
+                ],
+            )
+            conn.commit()
+        self.runner = CliRunner()
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _jsonl(self, *args):
+        result = self.runner.invoke(app, [*args, "--format", "jsonl"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        rows = [json.loads(line) for line in result.stdout.splitlines()]
+        token = result.stderr.split()[-1] if result.stderr else None
+        return rows, token
+
+    def test_pages_cover_all_rows_once(self):
+        """Test that following --after tokens visits every row in order."""
+        full, _ = self._jsonl("report", "--top", "100")
+        self.assertEqual(len(full), 10)
+
+        paged, token = self._jsonl("report", "--page-size", "3")
+        while token:
+            page, token = self._jsonl("report", "--page-size", "3", "--after", token)
+            paged.extend(page)
+        self.assertEqual([r["id"] for r in paged], [r["id"] for r in full])
+
+    def test_pages_include_rows_without_published(self):
+        """Test that paging does not skip rows with a NULL published."""
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET published=NULL WHERE id IN (2, 3, 5)")
+            conn.commit()
+        full, _ = self._jsonl("report", "--top", "100")
+        self.assertEqual(len(full), 10)
+
+        for size in ("1", "2", "3"):
+            paged, token = self._jsonl("report", "--page-size", size)
+            while token:
+                page, token = self._jsonl(
+                    "report", "--page-size", size, "--after", token
+                )
+                paged.extend(page)
+            self.assertEqual([r["id"] for r in paged], [r["id"] for r in full])
+
+    def test_daily_streams_without_limit(self):
+        rows, token = self._jsonl("daily", "--date", "2025-01-01", "--score-min", "0")
+        self.assertEqual(len(rows), 10)
+        self.assertIsNone(token)
+        self.assertEqual(rows[0]["feed_name"], "Feed")
+
+    def test_plain_format_is_tab_separated(self):
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET title='Tabs\tand\nnewlines' WHERE id=3")
+            conn.commit()
+        result = self.runner.invoke(app, ["report", "--top", "1", "--format", "plain"])
+        self.assertEqual(
+            result.stdout, "9\tTabs and newlines\tTech\tFeed\thttp://f/2\n"
+        )
+
+    def test_invalid_after_token(self):
+        # Not base64, not JSON, and JSON of the wrong shape or types
+        for token in ("not-a-token", "e30", "MQ", encode_cursor_values([1, 2])):
+            for command in ("report", "daily"):
+                result = self.runner.invoke(app, [command, "--after", token])
+                self.assertEqual(result.exit_code, 0, result.output)
+                self.assertIn("Invalid --after token", result.stdout)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor_values(["9", "2025-01-01", 1]))
+
+    def test_stats_reads_summary(self):
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET status='new', score=0 WHERE id=10")
+            conn.commit()
+        result = self.runner.invoke(app, ["stats", "--by", "feed"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Articles: 10 total", result.stdout)
+        self.assertIn("Analyzed: 9", result.stdout)
+        self.assertIn("Pending: 1", result.stdout)
+        self.assertIn("High (7-10): 9", result.stdout)
+        self.assertIn("│ Feed ", result.stdout)
+
+    def test_stats_recompute_repairs_summary(self):
+        with get_db() as conn:
+            conn.execute("DELETE FROM article_stats")
+            conn.commit()
+        result = self.runner.invoke(app, ["stats", "--recompute", "--by", "category"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Articles: 10 total", result.stdout)
+        self.assertIn("│ Tech ", result.stdout)
+
+    def test_retry_errors_requeues_failed_articles(self):
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET status='error', last_error='rate_limit' "
+                "WHERE id IN (1, 2)"
+            )
+            conn.execute(
+                "UPDATE articles SET status='retry', last_error='timeout' WHERE id=3"
+            )
+            conn.commit()
+        result = self.runner.invoke(app, ["stats"])
+        self.assertIn("Retrying: 1", result.stdout)
+        self.assertIn("Failed: 2", result.stdout)
+
+        result = self.runner.invoke(app, ["retry-errors", "--no-waiting"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Requeued 2 articles", result.stdout)
+        self.assertIn("rate_limit: 2", result.stdout)
+        result = self.runner.invoke(app, ["stats"])
+        self.assertIn("Pending: 2", result.stdout)
+        self.assertIn("Retrying: 1", result.stdout)
+
+    def test_prefilter_report(self):
+        result = self.runner.invoke(app, ["prefilter"])
+        self.assertIn("has not judged any articles", result.stdout)
+
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET prefilter='model' WHERE id IN (9, 10)")
+            conn.execute(
+                "UPDATE articles SET prefilter='rule', status='skipped' WHERE id=1"
+            )
+            conn.commit()
+        result = self.runner.invoke(app, ["prefilter"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertRegex(result.stdout, r"model\s+│\s+0\s+│\s+2\s+│\s+0%")
+        self.assertRegex(result.stdout, r"rule\s+│\s+1\s+│\s+0\s+│\s+-")
+
+    @patch.object(Config, "EMBEDDING_PROVIDER", "hashing")
+    def test_embed_backfills_analyzed_articles(self):
+        with patch("app.services.llm.OpenAI"):
+            result = self.runner.invoke(app, ["embed", "--limit", "4"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Embedded 4 articles with hashing:", result.stdout)
+        with get_db() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM article_embeddings")
+            self.assertEqual(count.fetchone()[0], 4)
+
+    def test_search_jsonl(self):
+        rows, _ = self._jsonl("search", "Article 3", "--limit", "5")
+        self.assertEqual([r["title"] for r in rows], ["Article 3"])
+        # Highlighted from the title, the long term being "Article"
+        self.assertEqual(rows[0]["snippet"], "Article 3")
+
+        rows, _ = self._jsonl("search", "article", "--score-min", "8", "--limit", "3")
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(r["score"] >= 8 for r in rows))
+
+    def test_search_rich_highlights(self):
+        result = self.runner.invoke(app, ["search", "Article 1"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("1 results", result.stdout)
+
+    def test_profile_prints_stages_and_writes_trace(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            trace = Path(tmp) / "trace.json"
+            result = self.runner.invoke(
+                app, ["--profile-output", str(trace), "report", "--top", "3"]
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+            events = json.loads(trace.read_text())["traceEvents"]
+        self.assertIn("Profile (", result.stdout)
+        self.assertIn("(outside spans)", result.stdout)
+        consoles = [e for e in events if e["name"] == "console" and e["ph"] == "X"]
+        self.assertEqual(len(consoles), 3)
+
+        result = self.runner.invoke(app, ["report", "--top", "3"])
+        self.assertNotIn("Profile (", result.stdout)
+
+    def test_cursor_round_trip(self):
+        row = {"score": 7, "published": "2025-01-01 08:00:00", "id": 3}
+        self.assertEqual(
+            decode_cursor(encode_cursor(row)),
+            (7, 7, "2025-01-01 08:00:00", "2025-01-01 08:00:00", 3),
+        )
+
+
+class TestStartup(unittest.TestCase):
+    """Test that commands only import what they use, from -X importtime."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+        with patch.object(Config, "DB_PATH", self.temp_db_path):
+            init_db()
+            close_pools()
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _imports(self, *args) -> dict:
+        """Self time in microseconds per module imported by a command."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", COMMAND_SCRIPT]
+            + [str(self.temp_db_path), *args],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent.parent,
+        )
+        imports, errors = {}, []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                errors.append(line)
+            elif "[us]" not in line:
+                own, _, name = line[len("import time:") :].split("|")
+                imports[name.strip()] = int(own)
+        self.assertEqual(result.returncode, 0, "\n".join(errors))
+        return imports
+
+    def test_commands_stay_within_import_budget(self):
+        for args, (budget, allowed) in COMMAND_IMPORTS.items():
+            with self.subTest(command=" ".join(args)):
+                imports = self._imports(*args)
+                packages = {name.split(".")[0] for name in imports}
+                self.assertEqual(packages & HEAVY, allowed)
+                self.assertLess(sum(imports.values()) / 1000, budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import signal
+import threading
+import time
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.services.daemon import Daemon
+from app.services.llm import AnalysisStats
+from app.services.rss import FetchResult, RSSService
+from app.services.workqueue import WorkQueue
+
+
+class TestDaemon(unittest.TestCase):
+    """Test the long-running fetch/analyze loop."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO feeds (name, url) VALUES (?, ?)",
+                [("Hourly", "http://hourly"), ("Quiet", "http://quiet")],
+            )
+            start = datetime(2025, 1, 1)
+            conn.executemany(
+                """
+                INSERT INTO articles (feed_id, title, link, published, status)
+                VALUES (1, ?, ?, ?, ?)
+            """,
+                [
+                    (f"A{i}", f"http://hourly/{i}", start + timedelta(hours=i), status)
+                    for i, status in enumerate(["analyzed"] * 4 + ["new"] * 2)
+                ],
+            )
+            conn.commit()
+
+        self.rss = RSSService()
+        self.fetched = []
+        self.rss.fetch_feeds = MagicMock(side_effect=self._fetch_new)
+        self.llm = MagicMock()
+        self.analyzed = []
+
+        def analyze_articles(articles, limiter, concurrency, batch_size, leases):
+            ids = [row["id"] for row in articles]
+            self.analyzed.append(ids)
+            with get_db() as conn:
+                conn.executemany(
+                    "UPDATE articles SET status='analyzed' WHERE id=?",
+                    [(i,) for i in ids],
+                )
+                conn.commit()
+            return AnalysisStats(analyzed=len(ids))
+
+        self.llm.analyze_articles.side_effect = analyze_articles
+        self.daemon = Daemon(self.rss, self.llm, status_interval=0.05)
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _fetch_new(self, feeds, on_result):
+        for row in feeds:
+            self.fetched.append(row["id"])
+            result = FetchResult(feed_id=row["id"], name=row["name"])
+            if row["id"] == 2:
+                result.new_ids = [5, 6]
+            # Scheduled an hour ahead, as RSSService.fetch_feeds would
+            with get_db() as conn:
+                conn.execute(
+                    "UPDATE feeds SET next_fetch_at=? WHERE id=?",
+                    (datetime.now() + timedelta(hours=1), row["id"]),
+                )
+                conn.commit()
+            on_result(result)
+
+    def test_poll_fetches_only_due_feeds(self):
+        self.assertEqual(self.daemon.poll(), 2)
+        self.assertEqual(self.daemon.queue.qsize(), 2)
+        self.assertEqual(self.daemon.poll(), 0)
+        self.assertAlmostEqual(self.daemon.seconds_until_due(), 3600, delta=5)
+
+        with get_db() as conn:
+            conn.execute("UPDATE feeds SET next_fetch_at=NULL WHERE id=2")
+            conn.commit()
+        self.assertEqual(self.daemon.seconds_until_due(), 0)
+        self.assertEqual(self.daemon.poll(), 1)
+        self.assertEqual(self.fetched, [1, 2, 2])
+
+    def test_analyze_next_skips_articles_no_longer_new(self):
+        self.daemon.enqueue([1, 5, 6])
+
+        self.assertEqual(self.daemon.analyze_next(timeout=0), 2)
+        self.assertEqual(self.analyzed, [[5, 6]])
+        self.assertEqual(self.daemon.queue.qsize(), 0)
+        self.assertEqual(self.daemon.analyze_next(timeout=0), 0)
+
+    def test_due_retries_reach_the_queue_despite_other_claims(self):
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET status='retry', next_attempt_at=? WHERE id=6",
+                (datetime.now() - timedelta(seconds=1),),
+            )
+            conn.commit()
+        # Claiming the other article must not requeue 6 behind our back
+        self.daemon.enqueue([5])
+        self.assertEqual(self.daemon.analyze_next(timeout=0), 1)
+
+        self.assertEqual(self.daemon.enqueue_due_retries(), 1)
+        self.assertEqual(self.daemon.analyze_next(timeout=0), 1)
+        self.assertEqual(self.analyzed, [[5], [6]])
+
+    def test_expired_leases_reach_the_queue(self):
+        crashed = WorkQueue("crashed", lease_seconds=60)
+        self.assertEqual(len(crashed.claim(2)), 2)
+        self.daemon.enqueue([5, 6])
+        self.assertEqual(self.daemon.analyze_next(timeout=0), 0)
+
+        self.assertEqual(self.daemon.enqueue_reclaimed(), 0)
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET lease_expires=? WHERE lease_owner='crashed'",
+                (datetime.now() - timedelta(seconds=1),),
+            )
+            conn.commit()
+        self.assertEqual(self.daemon.enqueue_reclaimed(), 2)
+        self.assertEqual(self.daemon.analyze_next(timeout=0), 2)
+        self.assertEqual(self.analyzed, [[5, 6]])
+
+    def test_status_reports_queue_depth_and_lag(self):
+        self.daemon.enqueue([5, 6])
+        time.sleep(0.02)
+
+        status = self.daemon.status()
+        self.assertEqual(status["queue_depth"], 2)
+        self.assertGreaterEqual(status["queue_lag"], 0.02)
+
+    def test_run_analyzes_backlog_until_stopped(self):
+        thread = threading.Thread(target=self.daemon.run)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not self.analyzed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.daemon.stop()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.analyzed, [[5, 6]])
+        self.assertEqual(self.daemon.stats.feeds_fetched, 2)
+
+    def test_sigterm_stops_the_loop(self):
+        self.daemon._handle_signal(signal.SIGTERM, None)
+        self.daemon.run()
+        self.assertEqual(self.daemon.stats.analyzed, 0)
+        self.assertEqual(self.daemon.queue.qsize(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
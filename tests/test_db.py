@@ -1,10 +1,51 @@
 import unittest
 import sqlite3
 import tempfile
+import threading
 from pathlib import Path
 from unittest.mock import patch
-from app.db import init_db, get_db
+from datetime import datetime, timedelta
+from app.db import (
+    MIGRATIONS,
+    STATS_TABLES,
+    init_db,
+    get_db,
+    get_pool,
+    close_pools,
+    get_schema_version,
+    load_bodies,
+    rebuild_article_stats,
+)
 from app.config import Config
+from app.cli import REPORT_QUERY, DAILY_QUERY, STATS_QUERY, articles_query
+from app.services.prefilter import AGREEMENT_QUERY
+from app.services.workqueue import CLAIM_QUERY, DUE_RETRIES_QUERY, RECLAIM_QUERY
+
+# Schema as created before migrations were introduced
+LEGACY_SCHEMA = """
+CREATE TABLE feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    url TEXT UNIQUE NOT NULL,
+    last_fetched TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1
+);
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    feed_id INTEGER,
+    title TEXT,
+    link TEXT UNIQUE NOT NULL,
+    published TIMESTAMP,
+    summary TEXT,
+    content TEXT,
+    status TEXT DEFAULT 'new',
+    score INTEGER DEFAULT 0,
+    analysis TEXT,
+    category TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(feed_id) REFERENCES feeds(id)
+);
+"""
 
 
 class TestDatabase(unittest.TestCase):
@@ -22,9 +63,12 @@ class TestDatabase(unittest.TestCase):
 
     def tearDown(self):
         """Clean up temporary database."""
+        close_pools()
         self.patcher.stop()
-        if self.temp_db_path.exists():
-            self.temp_db_path.unlink()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
 
     def test_init_db_creates_tables(self):
         """Test that init_db creates required tables."""
@@ -57,7 +101,15 @@ class TestDatabase(unittest.TestCase):
         cursor.execute("PRAGMA table_info(feeds)")
         columns = {row[1] for row in cursor.fetchall()}
 
-        expected_columns = {"id", "name", "url", "last_fetched", "is_active"}
+        expected_columns = {
+            "id",
+            "name",
+            "url",
+            "last_fetched",
+            "etag",
+            "last_modified",
+            "is_active",
+        }
         self.assertTrue(expected_columns.issubset(columns))
 
         conn.close()
@@ -77,15 +129,184 @@ class TestDatabase(unittest.TestCase):
             "feed_id",
             "title",
             "link",
+            "link_key",
+            "published",
+            "summary",
             "status",
             "score",
             "analysis",
             "category",
+            "duplicate_of",
+            "lease_owner",
+            "lease_expires",
+            "retry_count",
+            "next_attempt_at",
+            "last_error",
+            "prefilter",
+            "scored_by",
         }
         self.assertTrue(expected_columns.issubset(columns))
+        # Bodies live in article_bodies, see load_bodies
+        self.assertNotIn("content", columns)
 
         conn.close()
 
+    def _create_legacy_db(self):
+        """Create a database with the original, unversioned schema."""
+        conn = sqlite3.connect(self.temp_db_path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.execute("INSERT INTO feeds (name, url) VALUES ('Old', 'http://old')")
+        conn.execute(
+            "INSERT INTO articles (feed_id, link) "
+            "VALUES (1, 'https://example.com/a?utm_source=x')"
+        )
+        conn.commit()
+        conn.close()
+
+    def test_init_db_upgrades_existing_feeds_table(self):
+        """Test that init_db adds validator columns to an older database."""
+        self._create_legacy_db()
+
+        init_db()
+
+        with get_db() as conn:
+            row = conn.execute("SELECT * FROM feeds").fetchone()
+        self.assertEqual(row["name"], "Old")
+        self.assertIsNone(row["etag"])
+        self.assertIsNone(row["last_modified"])
+
+    def test_init_db_backfills_link_keys(self):
+        """Test that articles stored before link_key existed get one."""
+        self._create_legacy_db()
+
+        init_db()
+
+        with get_db() as conn:
+            row = conn.execute("SELECT link_key FROM articles").fetchone()
+        self.assertEqual(row["link_key"], "example.com/a")
+
+    def test_init_db_backfills_article_stats(self):
+        """Test that articles stored before the summary table are counted."""
+        self._create_legacy_db()
+
+        init_db()
+
+        with get_db() as conn:
+            total = conn.execute("SELECT SUM(count) FROM article_stats").fetchone()[0]
+        self.assertEqual(total, 1)
+
+    def test_init_db_moves_bodies_out_of_articles(self):
+        """Test that inline bodies are compressed into article_bodies."""
+        self._create_legacy_db()
+        conn = sqlite3.connect(self.temp_db_path)
+        conn.execute(
+            "INSERT INTO articles (feed_id, link, content) VALUES (1, 'http://b', ?)",
+            ("<p>" + "Write-ahead logging explained. " * 50 + "</p>",),
+        )
+        conn.commit()
+        conn.close()
+
+        init_db()
+
+        with get_db() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+            stored = conn.execute("SELECT length(content) FROM article_bodies")
+            self.assertLess(stored.fetchone()[0], 200)
+            match = conn.execute(
+                "SELECT rowid FROM articles_fts WHERE articles_fts MATCH 'ahead'"
+            )
+            self.assertEqual([row[0] for row in match], [2])
+        self.assertNotIn("content", columns)
+        self.assertEqual(list(load_bodies([1, 2])), [2])
+        self.assertTrue(load_bodies([2])[2].startswith("<p>Write-ahead"))
+
+    def test_article_stats_triggers_match_rebuild(self):
+        """Test that trigger-maintained counts equal a full recompute."""
+        init_db()
+        day = datetime(2025, 1, 1)
+
+        def snapshot(conn):
+            return {
+                table: conn.execute(
+                    f"SELECT * FROM {table} WHERE count != 0 ORDER BY 1, 2, 3"
+                ).fetchall()
+                for table in STATS_TABLES
+            }
+
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO articles (feed_id, link, published) VALUES (?, ?, ?)",
+                [(i % 3, f"http://x/{i}", day + timedelta(hours=i)) for i in range(60)],
+            )
+            conn.execute("""
+                UPDATE articles SET status='analyzed', score=id % 11, category='Tech'
+                WHERE id % 2 = 0
+            """)
+            conn.execute("UPDATE articles SET feed_id=7 WHERE id % 5 = 0")
+            conn.execute("DELETE FROM articles WHERE id % 7 = 0")
+            conn.commit()
+            maintained = snapshot(conn)
+
+            rebuild_article_stats(conn)
+            conn.commit()
+            rebuilt = snapshot(conn)
+
+        for table in STATS_TABLES:
+            with self.subTest(table=table):
+                self.assertEqual(
+                    [tuple(r) for r in maintained[table]],
+                    [tuple(r) for r in rebuilt[table]],
+                )
+                self.assertEqual(sum(r["count"] for r in rebuilt[table]), 60 - 8)
+
+    def test_init_db_applies_migrations_once(self):
+        """Test that migrations are recorded and not re-applied."""
+        self._create_legacy_db()
+
+        applied = init_db()
+        self.assertEqual(applied, [version for version, _ in MIGRATIONS])
+        self.assertEqual(init_db(), [])
+
+        with get_db() as conn:
+            self.assertEqual(get_schema_version(conn), MIGRATIONS[-1][0])
+            indexes = {
+                row["name"]
+                for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='index'"
+                )
+            }
+        self.assertIn("idx_articles_status_score_published", indexes)
+        self.assertIn("idx_articles_published", indexes)
+        self.assertIn("idx_articles_feed_published", indexes)
+
+    def test_cli_queries_use_indexes(self):
+        """Test that no CLI query falls back to a full table scan."""
+        init_db()
+        today = datetime(2025, 1, 1)
+        queries = {
+            "analyze": (CLAIM_QUERY, ("worker", today, 10)),
+            "reclaim": (RECLAIM_QUERY, (today,)),
+            "retry": (DUE_RETRIES_QUERY, (today,)),
+            "prefilter": (AGREEMENT_QUERY, (3,)),
+            "report": (REPORT_QUERY, (0, 20)),
+            "report_page": (
+                articles_query(after=True, limit=True),
+                (0, 7, 7, today, today, 42, 20),
+            ),
+            "daily": (DAILY_QUERY, (5, today, today + timedelta(days=1))),
+            "stats": (STATS_QUERY, (today,)),
+        }
+
+        with get_db() as conn:
+            for command, (query, params) in queries.items():
+                plan = " | ".join(
+                    row["detail"]
+                    for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)
+                )
+                with self.subTest(command=command, plan=plan):
+                    self.assertNotRegex(plan, r"SCAN (a|articles)\b(?! USING)")
+                    self.assertNotIn("TEMP B-TREE", plan)
+
     def test_get_db_context_manager(self):
         """Test that get_db works as context manager."""
         init_db()
@@ -97,6 +318,75 @@ class TestDatabase(unittest.TestCase):
             tables = cursor.fetchall()
             self.assertGreater(len(tables), 0)
 
+    def test_get_db_reuses_pooled_connection(self):
+        """Test that sequential get_db calls share one connection."""
+        init_db()
+
+        with get_db() as first:
+            pass
+        with get_db() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_get_db_applies_pragmas(self):
+        """Test that pooled connections use WAL and a busy timeout."""
+        init_db()
+
+        with get_db() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        self.assertEqual(journal_mode.lower(), "wal")
+        self.assertEqual(busy_timeout, Config.DB_BUSY_TIMEOUT_MS)
+
+    def test_get_db_rolls_back_uncommitted_changes(self):
+        """Test that a released connection does not leak an open transaction."""
+        init_db()
+
+        with get_db() as conn:
+            conn.execute("INSERT INTO feeds (name, url) VALUES ('x', 'http://x')")
+        with get_db() as conn:
+            self.assertFalse(conn.in_transaction)
+            count = conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_concurrent_writers_and_readers(self):
+        """Test that threads can write and read at once without lock errors."""
+        init_db()
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(50):
+                    with get_db() as conn:
+                        conn.execute(
+                            "INSERT INTO feeds (name, url) VALUES (?, ?)",
+                            (f"feed {n}-{i}", f"http://example.com/{n}/{i}"),
+                        )
+                        conn.commit()
+            except sqlite3.Error as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(50):
+                    with get_db() as conn:
+                        conn.execute("SELECT COUNT(*) FROM feeds").fetchone()
+            except sqlite3.Error as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        with get_db() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0]
+        self.assertEqual(count, 200)
+        self.assertLessEqual(get_pool()._idle.qsize(), Config.DB_POOL_SIZE)
+
 
 if __name__ == "__main__":
     unittest.main()
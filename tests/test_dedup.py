@@ -0,0 +1,130 @@
+import random
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.services.dedup import (
+    NUM_PERMUTATIONS,
+    NearDuplicateIndex,
+    buckets,
+    minhash,
+    similarity,
+)
+
+RELEASE = (
+    "OpenAI today announced GPT-5, its most capable model yet, available to "
+    "ChatGPT Plus subscribers starting this week. The company says the model "
+    "reduces hallucinations and improves coding performance across benchmarks."
+)
+REWRITE = (
+    "OpenAI today announced GPT-5, its most capable model so far, available to "
+    "ChatGPT Plus subscribers starting this week. The company says the new model "
+    "reduces hallucinations and improves coding performance across benchmarks."
+)
+UNRELATED = (
+    "Apple unveils new MacBook Pro with M4 chip, featuring longer battery life "
+    "and a brighter display, shipping next month to customers worldwide."
+)
+RELEASE_ZH = "阿里云今天发布了通义千问新版本，模型在代码生成、数学推理和长文本理解方面均有显著提升，并将开放给企业客户使用。"
+REWRITE_ZH = "阿里云今日发布了通义千问新版本，模型在代码生成、数学推理以及长文本理解方面均有显著提升，并将开放给企业客户使用。"
+
+
+class TestMinHash(unittest.TestCase):
+    """Test MinHash signatures."""
+
+    def test_rewrites_are_similar(self):
+        """Test that light rewrites in English and Chinese stay above threshold."""
+        self.assertGreaterEqual(similarity(minhash(RELEASE), minhash(REWRITE)), 0.7)
+        self.assertGreaterEqual(
+            similarity(minhash(RELEASE_ZH), minhash(REWRITE_ZH)), 0.7
+        )
+
+    def test_unrelated_articles_are_not_similar(self):
+        """Test that different stories are far apart."""
+        self.assertLess(similarity(minhash(RELEASE), minhash(UNRELATED)), 0.3)
+
+    def test_signature_is_stable_and_case_insensitive(self):
+        """Test that signatures can be persisted and compared across runs."""
+        signature = minhash(RELEASE)
+        self.assertEqual(len(signature), NUM_PERMUTATIONS)
+        self.assertEqual(signature, minhash(f"<p>{RELEASE.upper()}</p>"))
+
+    def test_short_text_is_not_fingerprinted(self):
+        """Test that titles alone are too short to cluster on."""
+        self.assertIsNone(minhash("Weekly links"))
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    """Test the persisted LSH index."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+        self.index = NearDuplicateIndex(threshold=0.7)
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _insert(self, conn, link, duplicate_of=None):
+        return conn.execute(
+            "INSERT INTO articles (link, duplicate_of) VALUES (?, ?)",
+            (link, duplicate_of),
+        ).lastrowid
+
+    def test_find_leader_returns_cluster_leader(self):
+        """Test that members of a cluster resolve to the original article."""
+        with get_db() as conn:
+            leader = self._insert(conn, "http://a/1")
+            self.index.add(conn, leader, minhash(RELEASE))
+            member = self._insert(conn, "http://b/1", duplicate_of=leader)
+            self.index.add(conn, member, minhash(REWRITE))
+
+            self.assertEqual(self.index.find_leader(conn, minhash(REWRITE)), leader)
+            self.assertIsNone(self.index.find_leader(conn, minhash(UNRELATED)))
+
+    def test_lookup_stays_fast_with_many_articles(self):
+        """Test that lookups use the bucket index instead of scanning."""
+        rng = random.Random(1)
+        with get_db() as conn:
+            for i in range(10000):
+                article_id = self._insert(conn, f"http://x/{i}")
+                self.index.add(
+                    conn,
+                    article_id,
+                    [rng.getrandbits(32) for _ in range(NUM_PERMUTATIONS)],
+                )
+            conn.commit()
+
+            signature = minhash(RELEASE)
+            start = time.perf_counter()
+            for _ in range(100):
+                self.index.find_leader(conn, signature)
+            per_lookup = (time.perf_counter() - start) / 100
+
+            plan = " | ".join(
+                row["detail"]
+                for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT article_id FROM article_lsh "
+                    "WHERE bucket IN (?, ?)",
+                    buckets(signature)[:2],
+                )
+            )
+        self.assertLess(per_lookup, 0.005)
+        self.assertNotIn("SCAN", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
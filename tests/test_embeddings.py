@@ -0,0 +1,199 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+import numpy as np
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.services.embeddings import (
+    CategoryLabels,
+    HashingEmbedder,
+    OpenAIEmbedder,
+    SemanticScorer,
+    VectorIndex,
+    decode,
+    encode,
+    normalize,
+)
+
+LABELS = "人工智能,编程开发,网络安全"
+
+
+class TestVectorIndex(unittest.TestCase):
+    """Test vector encoding and nearest-neighbour search."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = normalize(rng.normal(size=(300, 32)))
+        self.queries = normalize(rng.normal(size=(5, 32)))
+
+    def test_encode_decode_int8(self):
+        blobs = [encode(v, "int8") for v in self.vectors[:3]]
+        self.assertEqual(len(blobs[0]), 32)
+        np.testing.assert_allclose(decode(blobs, "int8"), self.vectors[:3], atol=0.01)
+        blob = encode(self.vectors[0], "float32")
+        np.testing.assert_array_equal(decode([blob], "float32")[0], self.vectors[0])
+
+    def test_search_matches_brute_force(self):
+        for dtype in ("float32", "int8"):
+            index = VectorIndex(dtype)
+            # Several adds, across blocks, to exercise growing and merging
+            with patch("app.services.embeddings.SEARCH_BLOCK", 64):
+                for start in range(0, 300, 100):
+                    chunk = slice(start, start + 100)
+                    index.add(range(start, start + 100), self.vectors[chunk], 0, "")
+                sims, rows = index.search(self.queries, 10)
+
+            expected = np.argsort(-(self.queries @ self.vectors.T), axis=1)[:, :10]
+            if dtype == "float32":
+                np.testing.assert_array_equal(rows, expected)
+            else:
+                # Quantization may swap near-ties; the top hits agree
+                np.testing.assert_array_equal(rows[:, 0], expected[:, 0])
+            self.assertTrue((np.diff(sims, axis=1) <= 0).all())
+        self.assertEqual(VectorIndex().search(self.queries, 3)[1].shape, (5, 0))
+
+    def test_add_rejects_other_dimensions(self):
+        index = VectorIndex()
+        index.add([1], self.vectors[0], [5], ["AI"])
+        with self.assertRaises(ValueError):
+            index.add([2], np.ones(8), [5], ["AI"])
+
+    def test_estimate_weights_neighbours(self):
+        index = VectorIndex("float32")
+        index.add([1, 2, 3], normalize([[1, 0], [1, 0.1], [0, 1]]), [8, 6, 1], "")
+        estimate = index.estimate(normalize([[1, 0.05]]), 2)[0]
+        self.assertEqual(estimate.score, 7)
+        self.assertAlmostEqual(estimate.spread, 1.0, places=2)
+        self.assertGreater(estimate.similarity, 0.99)
+        with patch.object(Config, "EMBEDDING_MAX_SPREAD", 0.5):
+            self.assertFalse(estimate.confident)
+        self.assertTrue(estimate.confident)
+        self.assertLess(index.estimate(normalize([[0, 1]]), 3)[0].similarity, 0.8)
+
+
+class TestEmbedders(unittest.TestCase):
+    """Test the hashing and API embedders."""
+
+    def test_hashing_embedder(self):
+        embedder = HashingEmbedder(64)
+        vectors = embedder.embed(["rust compiler", "Rust compiler!", "网络安全", ""])
+        self.assertEqual(vectors.shape, (4, 64))
+        self.assertAlmostEqual(float(vectors[0] @ vectors[1]), 1.0, places=5)
+        self.assertLess(float(vectors[0] @ vectors[2]), 0.5)
+        self.assertFalse(vectors[3].any())
+
+    @patch.object(Config, "EMBEDDING_BATCH_SIZE", 2)
+    def test_openai_embedder_batches_and_orders(self):
+        client = MagicMock()
+
+        def create(model, input, dimensions):
+            data = [
+                MagicMock(index=i, embedding=[len(text), 0.0])
+                for i, text in enumerate(input)
+            ]
+            return MagicMock(data=data[::-1])
+
+        client.embeddings.create.side_effect = create
+        vectors = OpenAIEmbedder(client, "m", 2).embed(["a", "bb", ""])
+        self.assertEqual(client.embeddings.create.call_count, 2)
+        np.testing.assert_array_equal(vectors, [[1, 0], [1, 0], [0, 0]])
+
+
+class TestSemanticScorer(unittest.TestCase):
+    """Test the embedding stage against a real database."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        with get_db() as conn:
+            conn.execute("INSERT INTO feeds (name, url) VALUES ('Feed', 'http://f')")
+            conn.executemany(
+                """
+                INSERT INTO articles (feed_id, title, link, summary, status, score, category)
+                VALUES (1, ?, ?, ?, 'analyzed', ?, ?)
+            """,
+                [
+                    (f"Rust compiler {i}", f"http://f/r{i}", "borrow checker LLVM", 8, "编程")
+                    for i in range(10)
+                ]
+                + [
+                    (f"漏洞 通告 {i}", f"http://f/s{i}", "远程代码执行 补丁", 6, "安全漏洞")
+                    for i in range(10)
+                ],
+            )  # fmt: skip
+            conn.commit()
+        self.scorer = SemanticScorer(HashingEmbedder(64), LABELS)
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _article(self, id, title, summary):
+        return {"id": id, "title": title, "summary": summary}
+
+    def test_canonical_categories(self):
+        labels = CategoryLabels(HashingEmbedder(64), LABELS)
+        self.assertEqual(
+            labels.canonical(["人工智能", "人工智能 AI", "安全漏洞", None]),
+            ["人工智能", "人工智能", "网络安全", None],
+        )
+        with patch.object(labels.embedder, "embed") as embed:
+            labels.canonical(["安全漏洞"])
+        embed.assert_not_called()
+
+    def test_backfill_and_estimate(self):
+        self.assertEqual(self.scorer.backfill(limit=15), 15)
+        self.assertEqual(self.scorer.backfill(limit=100), 5)
+        with get_db() as conn:
+            categories = dict(conn.execute("SELECT id, category FROM articles"))
+            stored = conn.execute("SELECT COUNT(*) FROM article_embeddings")
+            self.assertEqual(stored.fetchone()[0], 20)
+        self.assertEqual(categories[1], "编程开发")
+        self.assertEqual(categories[20], "网络安全")
+
+        articles = [
+            self._article(1, "Rust compiler 0", "borrow checker LLVM"),
+            self._article(21, "漏洞 通告", "远程代码执行 补丁"),
+            self._article(22, "Gardening", "tomatoes"),
+        ]
+        with patch.object(Config, "EMBEDDING_MIN_INDEX", 100):
+            self.assertEqual(self.scorer.refresh().estimate(articles), [None] * 3)
+        self.assertEqual(len(self.scorer.index), 20)
+
+        with patch.object(Config, "EMBEDDING_MIN_INDEX", 10):
+            rust, security, other = self.scorer.estimate(articles)
+        self.assertEqual((rust.score, security.score), (8, 6))
+        self.assertTrue(rust.confident and security.confident)
+        self.assertFalse(other.confident)
+        self.assertEqual(self.scorer.nearest_category(21), "网络安全")
+        self.assertIsNone(self.scorer.nearest_category(99))
+
+    def test_learn_adds_verdicts(self):
+        article = self._article(21, "Gardening", "tomatoes")
+        self.scorer.refresh().estimate([article])
+        self.assertEqual(len(self.scorer.index), 0)
+
+        self.scorer.learn(21, 3, "人工智能")
+        self.scorer.learn(21, 3, "人工智能")
+        self.assertEqual(len(self.scorer.index), 1)
+        with patch.object(Config, "EMBEDDING_MIN_INDEX", 1):
+            estimate = self.scorer.estimate([article])[0]
+        self.assertEqual(estimate.score, 3)
+        self.assertAlmostEqual(estimate.similarity, 1.0, places=2)
+        # Estimates are not neighbours, so a refresh drops unanalyzed ones
+        self.assertEqual(len(self.scorer.refresh().index), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,50 @@
+import json
+import re
 import unittest
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
 from unittest.mock import patch, MagicMock
-from app.services.llm import LLMService, ReviewResult
+from openai import APITimeoutError, RateLimitError
+from app import metrics
+from app.config import Config
+from app.db import init_db, get_db, close_pools, compress_text
+from app.utils import estimate_tokens
+from app.services.embeddings import HashingEmbedder, SemanticScorer
+from app.services.llm import LLMService, ReviewResult, article_body, retry_delay
+from app.services.prefilter import Prefilter
+from app.services.workqueue import WorkQueue
 
 
-class TestLLMService(unittest.TestCase):
+class DatabaseTestCase(unittest.TestCase):
+    """Runs each test against a fresh temporary database."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+
+class TestLLMService(DatabaseTestCase):
     """Test LLM service functionality."""
 
     def setUp(self):
         """Set up LLM service with mocked client."""
+        super().setUp()
         with patch("app.services.llm.OpenAI"):
             self.service = LLMService()
 
@@ -95,6 +132,111 @@ class TestLLMService(unittest.TestCase):
 
         self.assertIsNone(result)
 
+    def test_parse_batch_accepts_list_and_keyed_formats(self):
+        """Test that batch results are read from the supported shapes."""
+        item = {"score": 6, "reason": "ok", "category": "AI"}
+        expected = {1, 2}
+
+        wrapped = LLMService._parse_batch({"results": [dict(item, id=1)]}, expected)
+        bare = LLMService._parse_batch([dict(item, id="2")], expected)
+        keyed = LLMService._parse_batch({"1": item, "2": item}, expected)
+
+        self.assertEqual(set(wrapped), {1})
+        self.assertEqual(set(bare), {2})
+        self.assertEqual(set(keyed), {1, 2})
+
+    def test_parse_batch_drops_invalid_and_unknown_items(self):
+        """Test that malformed entries and foreign ids are ignored."""
+        data = {
+            "results": [
+                {"id": 1, "score": "high", "reason": "x", "category": "y"},
+                {"id": 2, "reason": "missing score", "category": "y"},
+                {"id": 99, "score": 5, "reason": "x", "category": "y"},
+                {"score": 5, "reason": "no id", "category": "y"},
+            ]
+        }
+        self.assertEqual(LLMService._parse_batch(data, {1, 2}), {})
+
+    def test_pack_batches_respects_size_and_token_budget(self):
+        """Test that batches are capped by article count and prompt tokens."""
+        row = {"title": "t", "link": "l", "content": None}
+        short = [dict(row, id=i, summary="s") for i in range(5)]
+        long = [dict(row, id=i, summary="x" * 400) for i in range(5)]
+
+        self.assertEqual(
+            [len(b) for b in self.service._pack_batches(short, 2, 10000)], [2, 2, 1]
+        )
+        self.assertEqual(
+            [len(b) for b in self.service._pack_batches(long, 10, 250)], [2, 2, 1]
+        )
+
+    def test_article_body_prefers_summary_unless_teaser(self):
+        """Test that content replaces a teaser summary, within budget."""
+        content = "<p>" + "Deep dive into the scheduler. " * 100 + "</p>"
+        summary = "<p>A long summary of the change. " * 20 + "</p>"
+        self.assertTrue(article_body(summary, content, 1000).startswith("A long"))
+        body = article_body("Read more", content, 100)
+        self.assertTrue(body.startswith("Deep dive"))
+        self.assertLessEqual(estimate_tokens(body), 100)
+        self.assertEqual(article_body(None, None, 100), "")
+
+    @patch("app.services.llm.OpenAI")
+    def test_analyze_article_uses_cache_for_copies(self, mock_openai):
+        """Test that a re-published story is answered from the cache."""
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = (
+            '{"score": 7, "reason": "有见地的技术分析", "category": "AI"}'
+        )
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai.return_value = mock_client
+
+        service = LLMService()
+        first = service.analyze_article(
+            "Big Release", "<p>Details</p>", "http://a.com/x"
+        )
+        copy = service.analyze_article(
+            "big release", "Details", "http://mirror.com/x?utm_source=rss"
+        )
+
+        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+        self.assertEqual(copy, first)
+        self.assertEqual((service.cache.hits, service.cache.misses), (1, 1))
+
+    @patch("app.services.llm.OpenAI")
+    def test_cache_key_covers_content_sent_for_teasers(self, mock_openai):
+        """Test that teasers with different bodies are not conflated."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = [
+            MagicMock(choices=[MagicMock(message=MagicMock(content=reply))])
+            for reply in (
+                '{"score": 9, "reason": "深入", "category": "AI"}',
+                '{"score": 2, "reason": "空洞", "category": "AI"}',
+            )
+        ]
+        mock_openai.return_value = mock_client
+
+        service = LLMService()
+        deep = service.analyze_article("Update", "", "http://a/1", "Deep dive " * 50)
+        thin = service.analyze_article("Update", "", "http://a/2", "Buy now " * 50)
+
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        self.assertEqual((deep.score, thin.score), (9, 2))
+
+    @patch("app.services.llm.OpenAI")
+    def test_failed_analysis_is_not_cached(self, mock_openai):
+        """Test that errors do not poison the cache."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_openai.return_value = mock_client
+
+        service = LLMService()
+        service.analyze_article("Title", "Summary", "http://example.com")
+        service.analyze_article("Title", "Summary", "http://example.com")
+
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        self.assertEqual(service.cache.info()["entries"], 0)
+
     def test_system_prompt_is_chinese(self):
         """Test that system prompt is in Chinese."""
         with patch("app.services.llm.OpenAI"):
@@ -103,5 +245,488 @@ class TestLLMService(unittest.TestCase):
             self.assertIn("中文", service.system_prompt)
 
 
+class TestProcessPending(DatabaseTestCase):
+    """Test the concurrent analysis pipeline against a real database."""
+
+    def setUp(self):
+        super().setUp()
+        with get_db() as conn:
+            conn.execute("INSERT INTO feeds (name, url) VALUES ('Feed', 'http://f')")
+            conn.executemany(
+                "INSERT INTO articles (feed_id, title, link, summary) VALUES (1, ?, ?, ?)",
+                [(f"Article {i}", f"http://f/{i}", "summary") for i in range(6)],
+            )
+            conn.commit()
+
+        with patch("app.services.llm.OpenAI"):
+            self.service = LLMService()
+
+    def _statuses(self):
+        with get_db() as conn:
+            return dict(conn.execute("SELECT title, status FROM articles").fetchall())
+
+    def test_process_pending_writes_results_and_errors(self):
+        """Test that results and failures are written back."""
+
+        def fake_analyze(title, summary, link, content=None):
+            if title == "Article 3":
+                return None
+            return ReviewResult(score=7, reason="ok", category="AI")
+
+        self.service._analyze_uncached = fake_analyze
+        count = self.service.process_pending(limit=10, concurrency=3)
+
+        self.assertEqual(count, 5)
+        self.assertEqual(self.service.last_stats.errors, 1)
+        statuses = self._statuses()
+        self.assertEqual(statuses["Article 3"], "error")
+        self.assertEqual(list(statuses.values()).count("analyzed"), 5)
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT score, category FROM articles WHERE title='Article 0'"
+            ).fetchone()
+        self.assertEqual((row["score"], row["category"]), (7, "AI"))
+
+    def test_process_pending_loads_bodies_only_for_teasers(self):
+        """Test that article bodies are read only when the summary is short."""
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET summary=? WHERE id=1", ("Long summary " * 40,)
+            )
+            conn.executemany(
+                "INSERT INTO article_bodies (article_id, content) VALUES (?, ?)",
+                [(i, compress_text(f"Body {i}")) for i in (1, 2)],
+            )
+            conn.commit()
+        contents = {}
+
+        def fake_analyze(title, summary, link, content=None):
+            contents[title] = content
+            return ReviewResult(score=5, reason="ok", category="News")
+
+        self.service._analyze_uncached = fake_analyze
+        self.service.process_pending(limit=3, concurrency=1)
+        self.assertEqual(
+            contents, {"Article 0": None, "Article 1": "Body 2", "Article 2": None}
+        )
+
+    def test_process_pending_skips_articles_leased_elsewhere(self):
+        """Test that articles claimed by another analyzer are left alone."""
+        self.service._analyze_uncached = lambda *args: ReviewResult(
+            score=5, reason="ok", category="News"
+        )
+        WorkQueue("other").claim(2)
+
+        with patch.object(Config, "LLM_WRITE_BATCH", 2):
+            count = self.service.process_pending(limit=10, concurrency=1)
+
+        self.assertEqual(count, 4)
+        statuses = self._statuses()
+        self.assertEqual(statuses["Article 0"], "new")
+        self.assertEqual(statuses["Article 5"], "analyzed")
+        with get_db() as conn:
+            owners = conn.execute(
+                "SELECT lease_owner FROM articles WHERE status='analyzed'"
+            ).fetchall()
+        self.assertEqual({row[0] for row in owners}, {None})
+
+    def test_process_pending_renews_leases_during_slow_requests(self):
+        """Test that leases outlast requests held back longer than a lease."""
+        self.service.work_queue = WorkQueue("mine", lease_seconds=0.3)
+        taken = []
+
+        def fake_analyze(title, summary, link, content=None):
+            if title == "Article 0":
+                time.sleep(0.5)
+                taken.extend(WorkQueue("other").claim(10))
+            return ReviewResult(score=5, reason="ok", category="News")
+
+        self.service._analyze_uncached = fake_analyze
+        count = self.service.process_pending(limit=10, concurrency=1, batch_size=1)
+
+        self.assertEqual(taken, [])
+        self.assertEqual(count, 6)
+        self.assertEqual(set(self._statuses().values()), {"analyzed"})
+
+    def test_process_pending_drops_verdicts_of_lost_leases(self):
+        """Test that an article taken over by another analyzer keeps its
+        verdict to that analyzer."""
+
+        def fake_analyze(title, summary, link, content=None):
+            if title == "Article 0":
+                with get_db() as conn:
+                    conn.execute(
+                        "UPDATE articles SET lease_owner='other' WHERE title=?",
+                        (title,),
+                    )
+                    conn.commit()
+            return ReviewResult(score=5, reason="ok", category="News")
+
+        self.service._analyze_uncached = fake_analyze
+        self.service.process_pending(limit=10, concurrency=1, batch_size=1)
+
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT status, score, lease_owner FROM articles WHERE title='Article 0'"
+            ).fetchone()
+        self.assertEqual(tuple(row), ("new", 0, "other"))
+        self.assertEqual(list(self._statuses().values()).count("analyzed"), 5)
+
+    def test_process_pending_backs_off_transient_failures(self):
+        """Test that failures are classified and retried later, not dropped."""
+        reply = MagicMock()
+        reply.choices[0].message.content = (
+            '{"score": 6, "reason": "ok", "category": "AI"}'
+        )
+
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            if "Article 1" in prompt:
+                raise RateLimitError(
+                    "slow down",
+                    response=MagicMock(
+                        status_code=429, headers={"retry-after": "0.01"}
+                    ),
+                    body=None,
+                )
+            if "Article 2" in prompt:
+                raise APITimeoutError(request=MagicMock())
+            if "Article 3" in prompt:
+                bad = MagicMock()
+                bad.choices[0].message.content = "Sorry, I cannot answer that."
+                return bad
+            if "Article 4" in prompt:
+                raise Exception("401 invalid api key")
+            return reply
+
+        self.service.client.chat.completions.create.side_effect = fake_create
+        count = self.service.process_pending(limit=10, concurrency=1)
+
+        self.assertEqual(count, 2)
+        stats = self.service.last_stats
+        self.assertEqual((stats.retried, stats.errors), (3, 1))
+        self.assertEqual(
+            dict(stats.failures),
+            {"rate_limit": 1, "timeout": 1, "malformed_json": 1, "api_error": 1},
+        )
+        with get_db() as conn:
+            rows = {
+                row["title"]: row
+                for row in conn.execute(
+                    "SELECT title, status, retry_count, next_attempt_at, last_error "
+                    "FROM articles"
+                )
+            }
+        soon = datetime.now() + timedelta(seconds=Config.LLM_RETRY_BASE_DELAY / 2 - 1)
+        for title in ("Article 1", "Article 2", "Article 3"):
+            self.assertEqual(rows[title]["status"], "retry")
+            self.assertEqual(rows[title]["retry_count"], 1)
+            self.assertGreater(
+                datetime.fromisoformat(rows[title]["next_attempt_at"]), soon
+            )
+        self.assertEqual(rows["Article 4"]["status"], "error")
+        self.assertEqual(rows["Article 4"]["last_error"], "api_error")
+        self.assertIsNone(rows["Article 0"]["last_error"])
+
+    def test_process_pending_gives_up_after_max_retries(self):
+        """Test that an article out of retries ends up as 'error'."""
+        self.service.client.chat.completions.create.side_effect = APITimeoutError(
+            request=MagicMock()
+        )
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET retry_count=? WHERE id=1",
+                (Config.LLM_MAX_RETRIES,),
+            )
+            conn.commit()
+
+        self.service.process_pending(limit=10, concurrency=2)
+
+        statuses = self._statuses()
+        self.assertEqual(statuses["Article 0"], "error")
+        self.assertEqual(list(statuses.values()).count("retry"), 5)
+
+    def test_failed_batch_backs_off_instead_of_splitting(self):
+        """Test that a timed-out batch is retried later as a whole."""
+        self.service.client.chat.completions.create.side_effect = APITimeoutError(
+            request=MagicMock()
+        )
+
+        self.service.process_pending(limit=10, concurrency=1, batch_size=6)
+
+        stats = self.service.last_stats
+        self.assertEqual((stats.requeued, stats.retried), (0, 6))
+        self.assertEqual(stats.usage["single"].requests, 0)
+        self.assertEqual(set(self._statuses().values()), {"retry"})
+
+    def test_process_pending_prefilter_skips_without_requests(self):
+        """Test that pre-filtered articles are stored without an API call."""
+        self.service.prefilter = Prefilter()
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET summary='' WHERE title='Article 0'")
+            conn.execute(
+                "UPDATE articles SET title='[Sponsored] Article 1' WHERE title='Article 1'"
+            )
+            conn.execute(
+                "UPDATE articles SET title='【广告】Article 2' WHERE title='Article 2'"
+            )
+            conn.commit()
+        analyzed = []
+
+        def fake_analyze(title, summary, link, content=None):
+            analyzed.append(title)
+            return ReviewResult(score=2, reason="ok", category="AI")
+
+        self.service._analyze_uncached = fake_analyze
+        rolls = iter([0.5, 0.5, 0.01])
+        self.service.prefilter._rand = lambda: next(rolls)
+        count = self.service.process_pending(limit=10, concurrency=1)
+
+        self.assertEqual(count, 4)
+        stats = self.service.last_stats
+        self.assertEqual((stats.skipped, stats.audited), (2, 1))
+        self.assertNotIn("Article 0", analyzed)
+        self.assertIn("【广告】Article 2", analyzed)
+        with get_db() as conn:
+            rows = {
+                row["id"]: tuple(row)
+                for row in conn.execute(
+                    "SELECT id, status, score, prefilter, lease_owner FROM articles"
+                )
+            }
+        self.assertEqual(rows[1], (1, "skipped", 0, "rule", None))
+        self.assertEqual(rows[3], (3, "analyzed", 2, "rule", None))
+        self.assertEqual(rows[4][1:4], ("analyzed", 2, None))
+
+    @patch.object(Config, "EMBEDDING_MIN_INDEX", 10)
+    def test_process_pending_estimates_from_similar_articles(self):
+        """Test that articles like analyzed ones are scored without a request
+        and that LLM categories map onto the canonical labels."""
+        with get_db() as conn:
+            conn.executemany(
+                """
+                INSERT INTO articles (feed_id, title, link, summary, status, score, category)
+                VALUES (1, ?, ?, 'borrow checker LLVM', 'analyzed', 9, '编程开发')
+            """,
+                [(f"Rust compiler {i}", f"http://f/r{i}") for i in range(10)],
+            )  # fmt: skip
+            conn.execute(
+                "UPDATE articles SET title='Rust compiler', "
+                "summary='borrow checker LLVM' WHERE title='Article 0'"
+            )
+            conn.commit()
+        self.service.prefilter = None
+        self.service.semantic = SemanticScorer(HashingEmbedder(64))
+        self.assertEqual(self.service.semantic.backfill(limit=100), 10)
+        analyzed = []
+
+        def fake_analyze(title, summary, link, content=None):
+            analyzed.append(title)
+            return ReviewResult(score=5, reason="ok", category="人工智能 AI")
+
+        self.service._analyze_uncached = fake_analyze
+        count = self.service.process_pending(limit=10, concurrency=1)
+
+        self.assertEqual(count, 5)
+        self.assertEqual(self.service.last_stats.estimated, 1)
+        self.assertNotIn("Rust compiler", analyzed)
+        with get_db() as conn:
+            rows = conn.execute(
+                "SELECT score, category, scored_by FROM articles WHERE id IN (1, 2)"
+            ).fetchall()
+        self.assertEqual(tuple(rows[0]), (9, "编程开发", "knn"))
+        self.assertEqual(tuple(rows[1]), (5, "人工智能", None))
+        # New verdicts join the index; estimates do not
+        self.assertEqual(len(self.service.semantic.index), 15)
+
+    def test_process_pending_runs_requests_concurrently(self):
+        """Test that up to `concurrency` requests are in flight at once."""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_analyze(title, summary, link, content=None):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return ReviewResult(score=5, reason="ok", category="News")
+
+        self.service._analyze_uncached = slow_analyze
+        self.service.process_pending(limit=10, concurrency=3)
+
+        self.assertEqual(max(peak), 3)
+        self.assertGreater(self.service.last_stats.per_second, 0)
+
+    def test_process_pending_batches_writes(self):
+        """Test that results are committed in batches, not per article."""
+        self.service._analyze_uncached = lambda *args: ReviewResult(
+            score=5, reason="ok", category="News"
+        )
+
+        with patch.object(Config, "LLM_WRITE_BATCH", 4), patch.object(
+            self.service, "_write_results", wraps=self.service._write_results
+        ) as write:
+            self.service.process_pending(limit=10, concurrency=2)
+
+        self.assertEqual(write.call_count, 2)
+        self.assertNotIn("new", self._statuses().values())
+
+    def test_process_pending_copies_leader_verdict_to_duplicates(self):
+        """Test that near-duplicates inherit their analyzed leader's score."""
+        with get_db() as conn:
+            conn.execute(
+                "INSERT INTO articles (feed_id, title, link, status, duplicate_of) "
+                "VALUES (1, 'Copy', 'http://mirror/0', 'duplicate', 1)"
+            )
+            conn.commit()
+        self.service._analyze_uncached = lambda *args: ReviewResult(
+            score=9, reason="重要", category="AI"
+        )
+
+        self.service.process_pending(limit=10)
+
+        self.assertEqual(self.service.last_stats.copied, 1)
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT status, score, category FROM articles WHERE title='Copy'"
+            ).fetchone()
+        self.assertEqual(tuple(row), ("duplicate", 9, "AI"))
+
+    def test_duplicate_takes_over_from_failed_leader(self):
+        """Test that a cluster whose leader fails is analyzed through one of
+        its near-duplicates, which the rest of the cluster then follows."""
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO articles (feed_id, title, link, summary, status, "
+                "duplicate_of) VALUES (1, ?, ?, 'summary', 'duplicate', 1)",
+                [("Copy A", "http://mirror/a"), ("Copy B", "http://mirror/b")],
+            )
+            conn.commit()
+
+        def fake_analyze(title, summary, link, content=None):
+            if title == "Article 0":
+                return None
+            return ReviewResult(score=6, reason="ok", category="AI")
+
+        self.service._analyze_uncached = fake_analyze
+        self.service.process_pending(limit=10)
+
+        with get_db() as conn:
+            rows = {
+                row["title"]: (row["status"], row["score"], row["duplicate_of"])
+                for row in conn.execute(
+                    "SELECT title, status, score, duplicate_of FROM articles"
+                )
+            }
+        promoted = 7
+        self.assertEqual(rows["Copy A"], ("analyzed", 6, None))
+        self.assertEqual(rows["Copy B"], ("duplicate", 6, promoted))
+        self.assertEqual(rows["Article 0"], ("error", 0, promoted))
+
+    def _batch_response(self, ids):
+        results = [
+            {"id": i, "score": 8, "reason": "批量", "category": "AI"} for i in ids
+        ]
+        response = MagicMock()
+        response.choices[0].message.content = json.dumps({"results": results})
+        response.usage.total_tokens = 300
+        return response
+
+    def test_process_pending_batches_articles_per_request(self):
+        """Test that batch mode analyzes several articles per request."""
+        self.service.client.chat.completions.create.side_effect = (
+            lambda **kwargs: self._batch_response(
+                int(i)
+                for i in re.findall(r"\[id=(\d+)\]", kwargs["messages"][1]["content"])
+            )
+        )
+
+        count = self.service.process_pending(limit=10, concurrency=1, batch_size=3)
+
+        self.assertEqual(count, 6)
+        batch = self.service.last_stats.usage["batch"]
+        self.assertEqual(batch.requests, 2)
+        self.assertEqual(batch.tokens_per_article, 100)
+        self.assertEqual(self.service.last_stats.usage["single"].requests, 0)
+
+    def test_process_pending_records_usage_per_article(self):
+        """Test that each article stores its share of the request's tokens."""
+
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            ids = [int(i) for i in re.findall(r"\[id=(\d+)\]", prompt)]
+            response = self._batch_response(ids)
+            response.usage.prompt_tokens = 600
+            response.usage.completion_tokens = 90
+            return response
+
+        self.service.client.chat.completions.create.side_effect = fake_create
+        tokens = metrics.LLM_TOKENS.value(mode="batch", kind="completion")
+        requests = metrics.LLM_REQUEST_SECONDS.value(mode="batch")[0]
+        self.service.process_pending(limit=10, concurrency=1, batch_size=3)
+
+        self.assertEqual(
+            metrics.LLM_TOKENS.value(mode="batch", kind="completion"), tokens + 180
+        )
+        self.assertEqual(
+            metrics.LLM_REQUEST_SECONDS.value(mode="batch")[0], requests + 2
+        )
+        batch = self.service.last_stats.usage["batch"]
+        self.assertEqual((batch.prompt_tokens, batch.completion_tokens), (1200, 180))
+        self.assertGreater(batch.ms_per_completion_token, 0)
+        with get_db() as conn:
+            rows = conn.execute(
+                "SELECT prompt_tokens, completion_tokens, latency_ms FROM articles"
+            ).fetchall()
+        self.assertEqual({(r[0], r[1]) for r in rows}, {(200, 30)})
+        self.assertTrue(all(r[2] is not None for r in rows))
+
+    def test_process_pending_requeues_only_missing_articles(self):
+        """Test that articles left out of a batch response are retried alone."""
+        single = MagicMock()
+        single.choices[0].message.content = (
+            '{"score": 3, "reason": "单篇", "category": "新闻"}'
+        )
+
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            ids = [int(i) for i in re.findall(r"\[id=(\d+)\]", prompt)]
+            if ids:
+                return self._batch_response(ids[:-1])
+            return single
+
+        self.service.client.chat.completions.create.side_effect = fake_create
+
+        count = self.service.process_pending(limit=10, concurrency=2, batch_size=6)
+
+        self.assertEqual(count, 6)
+        self.assertEqual(self.service.last_stats.requeued, 1)
+        self.assertEqual(self.service.last_stats.usage["single"].requests, 1)
+        with get_db() as conn:
+            reasons = [r[0] for r in conn.execute("SELECT analysis FROM articles")]
+        self.assertEqual(reasons.count("单篇"), 1)
+        self.assertEqual(reasons.count("批量"), 5)
+
+
+class TestRetryDelay(unittest.TestCase):
+    """Test the retry backoff schedule."""
+
+    def test_doubles_with_jitter_up_to_cap(self):
+        with patch.object(Config, "LLM_RETRY_BASE_DELAY", 10), patch.object(
+            Config, "LLM_RETRY_MAX_DELAY", 100
+        ):
+            self.assertEqual(retry_delay(0, rand=lambda: 0), 5)
+            self.assertEqual(retry_delay(0, rand=lambda: 1), 10)
+            self.assertEqual(retry_delay(2, rand=lambda: 1), 40)
+            self.assertEqual(retry_delay(8, rand=lambda: 1), 100)
+
+    def test_respects_retry_after(self):
+        with patch.object(Config, "LLM_RETRY_BASE_DELAY", 10):
+            self.assertEqual(retry_delay(0, retry_after=60, rand=lambda: 0), 60)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import tempfile
+import urllib.error
+import urllib.request
+from pathlib import Path
+from unittest.mock import patch
+from app import metrics
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.metrics import Counter, Gauge, Histogram, Registry, serve, write_textfile
+
+
+class TestMetrics(unittest.TestCase):
+    """Test the metric types and the Prometheus text format."""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        counter = Counter("jobs_total", "Jobs run.", ["kind"], registry=self.registry)
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        counter.inc(0.5, kind='say "hi"\n')
+        gauge = Gauge("depth", "Queue depth.", registry=self.registry)
+        gauge.set(4)
+
+        self.assertEqual(counter.value(kind="a"), 3)
+        self.assertEqual(counter.value(kind="b"), 0)
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP jobs_total Jobs run.\n"
+            "# TYPE jobs_total counter\n"
+            'jobs_total{kind="a"} 3\n'
+            'jobs_total{kind="say \\"hi\\"\\n"} 0.5\n'
+            "# HELP depth Queue depth.\n"
+            "# TYPE depth gauge\n"
+            "depth 4\n",
+        )
+        with self.assertRaises(ValueError):
+            counter.inc(-1, kind="a")
+        with self.assertRaises(ValueError):
+            counter.inc(feed="a")
+        with self.assertRaises(ValueError):
+            Counter("jobs_total", "Again.", registry=self.registry)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(
+            "latency_seconds", "Latency.", buckets=(0.1, 1), registry=self.registry
+        )
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value)
+        with patch("app.metrics.time.perf_counter", side_effect=[10.0, 10.2]):
+            with histogram.time():
+                pass
+
+        self.assertEqual(histogram.value()[0], 5)
+        self.assertAlmostEqual(histogram.value()[1], 4.45)
+        lines = self.registry.render().splitlines()[2:]
+        self.assertEqual(
+            lines[:3],
+            [
+                'latency_seconds_bucket{le="0.1"} 1',
+                'latency_seconds_bucket{le="1.0"} 4',
+                'latency_seconds_bucket{le="+Inf"} 5',
+            ],
+        )
+        self.assertEqual(lines[4], "latency_seconds_count 5")
+
+    def test_write_textfile_replaces_file(self):
+        Gauge("up", "Up.", registry=self.registry).set(1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "feedsense.prom"
+            path.write_text("stale")
+            write_textfile(path, self.registry)
+            self.assertTrue(path.read_text().endswith("up 1\n"))
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], [path.name])
+
+            with patch.object(Config, "METRICS_TEXTFILE_DIR", tmp):
+                self.assertEqual(
+                    metrics.export("fetch"), Path(tmp) / "feedsense_fetch.prom"
+                )
+        with patch.object(Config, "METRICS_TEXTFILE_DIR", ""):
+            self.assertIsNone(metrics.export("fetch"))
+
+    def test_http_endpoint(self):
+        Gauge("up", "Up.", registry=self.registry).set(1)
+        server = serve(0, registry=self.registry)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                self.assertIn("text/plain", response.headers["Content-Type"])
+                self.assertIn("up 1", response.read().decode())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestQueueDepth(unittest.TestCase):
+    """Test the queue depth gauge against a real database."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def test_reads_pending_and_retrying(self):
+        self.assertEqual(metrics.QUEUE_DEPTH.samples(), [])
+        init_db()
+        with get_db() as conn:
+            conn.execute("INSERT INTO feeds (name, url) VALUES ('Feed', 'http://f')")
+            conn.executemany(
+                "INSERT INTO articles (feed_id, title, link, status) VALUES (1, ?, ?, ?)",
+                [(f"A{i}", f"http://f/{i}", "new" if i < 3 else "retry") for i in range(4)],
+            )  # fmt: skip
+            conn.commit()
+        self.assertEqual(
+            metrics.QUEUE_DEPTH.samples(),
+            ['feedsense_queue_depth{status="new"} 3', 'feedsense_queue_depth{status="retry"} 1'],
+        )  # fmt: skip
+
+
+if __name__ == "__main__":
+    unittest.main()
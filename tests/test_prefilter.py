@@ -0,0 +1,164 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.services.prefilter import (
+    FEED,
+    MODEL,
+    RULE,
+    NaiveBayes,
+    Prefilter,
+    agreement,
+    tokenize,
+)
+
+
+class TestNaiveBayes(unittest.TestCase):
+    """Test tokenizing and the local classifier."""
+
+    def test_tokenize_words_and_cjk_bigrams(self):
+        self.assertEqual(tokenize("<b>GPT-5</b> 发布会"), ["gpt-5", "发布", "布会"])
+        self.assertEqual(tokenize("好"), ["好"])
+
+    def test_separates_classes(self):
+        model = NaiveBayes().fit(
+            [
+                "限时优惠 折扣 抢购",
+                "折扣 抢购 秒杀",
+                "compiler internals",
+                "rust compiler",
+            ],
+            [True, True, False, False],
+        )
+        self.assertGreater(model.probability_low("双十一 折扣 抢购"), 0.8)
+        self.assertLess(model.probability_low("rust compiler internals"), 0.2)
+        self.assertEqual(NaiveBayes().probability_low("anything"), 0.0)
+
+
+class TestPrefilter(unittest.TestCase):
+    """Test pre-filter stages against a real database."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO feeds (name, url) VALUES (?, ?)",
+                [("Deals", "http://deals"), ("Tech", "http://tech")],
+            )
+            # Past verdicts: the deals feed scores 1-2, the tech feed 7-8
+            conn.executemany(
+                """
+                INSERT INTO articles (feed_id, title, link, summary, status, score)
+                VALUES (?, ?, ?, ?, 'analyzed', ?)
+            """,
+                [
+                    (1, f"今日好价 {i}", f"http://deals/{i}", "好价 包邮 到手价", 1 + i % 2)
+                    for i in range(30)
+                ]
+                + [
+                    (2, f"Compiler notes {i}", f"http://tech/{i}", "LLVM passes", 7 + i % 2)
+                    for i in range(30)
+                ],
+            )  # fmt: skip
+            conn.commit()
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _article(self, title, summary="Some text", feed_id=2, content=None):
+        return {
+            "title": title,
+            "summary": summary,
+            "content": content,
+            "feed_id": feed_id,
+        }
+
+    def test_rules(self):
+        prefilter = Prefilter(patterns=r"\bsponsored\b|广告")
+        self.assertEqual(prefilter.judge(self._article("A", "<p> </p>")).stage, RULE)
+        self.assertIsNone(prefilter.judge(self._article("A", "", content="Body")))
+        judgement = prefilter.judge(self._article("Sponsored: new laptop"))
+        self.assertEqual((judgement.stage, judgement.score), (RULE, 0))
+        self.assertEqual(prefilter.judge(self._article("X", "【广告】")).stage, RULE)
+        self.assertIsNone(prefilter.judge(self._article("Sponsorship in sports")))
+
+    def test_default_patterns_only_match_marked_ads(self):
+        prefilter = Prefilter()
+        for title in (
+            "【广告】新品发布",
+            "[Sponsored] A new laptop",
+            "（推广）课程",
+            "Advertorial",
+        ):
+            self.assertEqual(prefilter.judge(self._article(title)).stage, RULE, title)
+        for title in (
+            "推广 HTTP/3 的经验",
+            "广告系统架构演进",
+            "Coupon collector problem",
+        ):
+            self.assertIsNone(prefilter.judge(self._article(title)), title)
+
+    def test_feed_history(self):
+        with patch.object(Config, "PREFILTER_MIN_TRAINING", 1000):
+            prefilter = Prefilter(patterns="").refresh()
+        self.assertIsNone(prefilter.model)
+        self.assertAlmostEqual(prefilter.feed_scores[1], 1.5)
+        judgement = prefilter.judge(self._article("Anything", feed_id=1))
+        self.assertEqual((judgement.stage, judgement.score), (FEED, 2))
+        self.assertIsNone(prefilter.judge(self._article("Anything", feed_id=2)))
+
+        with patch.object(Config, "PREFILTER_FEED_MIN_ANALYZED", 31):
+            self.assertEqual(Prefilter(patterns="").refresh().feed_scores, {})
+
+    def test_model_trained_on_verdicts(self):
+        with patch.object(Config, "PREFILTER_MIN_TRAINING", 50), patch.object(
+            Config, "PREFILTER_FEED_MIN_ANALYZED", 100
+        ):
+            prefilter = Prefilter(patterns="").refresh()
+
+        judgement = prefilter.judge(
+            self._article("今日好价 耳机", "包邮 到手价", feed_id=3)
+        )
+        self.assertEqual((judgement.stage, judgement.score), (MODEL, 2))
+        self.assertIsNone(
+            prefilter.judge(self._article("Compiler notes", "LLVM", feed_id=3))
+        )
+        with patch.object(Config, "PREFILTER_CONFIDENCE", 0):
+            self.assertIsNone(
+                prefilter.judge(self._article("今日好价", "包邮 到手价", feed_id=3))
+            )
+
+    def test_audit_rate(self):
+        rolls = iter([0.01, 0.5])
+        prefilter = Prefilter(audit_rate=0.05, rand=lambda: next(rolls))
+        self.assertTrue(prefilter.audit())
+        self.assertFalse(prefilter.audit())
+
+    def test_agreement(self):
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET prefilter='feed' WHERE id IN (1, 2, 31)")
+            conn.execute(
+                "UPDATE articles SET prefilter='feed', status='skipped' WHERE id=3"
+            )
+            conn.commit()
+        self.assertEqual(
+            agreement(), [{"stage": "feed", "skipped": 1, "audited": 3, "agreed": 2}]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import pstats
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from app import profiling
+from app.profiling import span
+
+
+def work(n=20000):
+    return sum(i * i for i in range(n))
+
+
+class TestProfiling(unittest.TestCase):
+    """Test span recording, the stage breakdown and the output files."""
+
+    def tearDown(self):
+        profiling.stop()
+
+    def test_spans_do_nothing_when_not_profiling(self):
+        self.assertIsNone(profiling.stop())
+        with span("fetch.parse") as recorder:
+            self.assertIsNone(recorder)
+
+    def test_nested_spans_split_self_time(self):
+        clock = iter([0.0, 1.0, 2.0, 5.0, 6.0, 6.5, 7.0, 10.0])
+        with patch("app.profiling.time.perf_counter", lambda: next(clock)):
+            profiler = profiling.start()
+            with span("db.write"):
+                with span("fetch.dedup"):
+                    pass
+                with span("fetch.dedup"):
+                    pass
+            profiling.stop()
+
+        stages = {stage.name: stage for stage in profiler.stages()}
+        self.assertEqual(stages["db.write"].calls, 1)
+        self.assertEqual(stages["db.write"].total, 6.0)
+        self.assertEqual(stages["db.write"].self_time, 2.5)
+        self.assertEqual(stages["fetch.dedup"].calls, 2)
+        self.assertEqual(stages["fetch.dedup"].self_time, 3.5)
+        self.assertEqual(
+            [s.name for s in profiler.stages()], ["fetch.dedup", "db.write"]
+        )
+        self.assertEqual(profiler.elapsed, 10.0)
+        self.assertEqual(profiler.unaccounted(), 4.0)
+
+    def test_records_worker_threads(self):
+        profiler = profiling.start()
+        # Keeps all three alive at once, so their thread ids differ
+        barrier = threading.Barrier(3)
+
+        def worker():
+            with span("llm.request"):
+                barrier.wait()
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        profiling.stop()
+
+        self.assertEqual(profiler.stages()[0].calls, 3)
+        self.assertEqual({s.depth for s in profiler.spans}, {0})
+        self.assertEqual(len({s.thread for s in profiler.spans}), 3)
+        # Worker spans are not time spent by the main thread
+        self.assertEqual(profiler.unaccounted(), profiler.elapsed)
+
+    def test_chrome_trace(self):
+        profiler = profiling.start()
+        with span("fetch.parse"):
+            with span("fetch.dates"):
+                pass
+        profiling.stop()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trace.json"
+            profiler.write(path)
+            events = json.loads(path.read_text())["traceEvents"]
+        names = [e["args"]["name"] for e in events if e["ph"] == "M"]
+        self.assertEqual(names, [threading.main_thread().name])
+        spans = [e for e in events if e["ph"] == "X"]
+        self.assertEqual([e["name"] for e in spans], ["fetch.dates", "fetch.parse"])
+        self.assertEqual(spans[0]["cat"], "fetch")
+        self.assertLessEqual(spans[1]["ts"], spans[0]["ts"])
+        self.assertGreaterEqual(spans[1]["dur"], spans[0]["dur"])
+
+    def test_pstats_merges_threads(self):
+        profiler = profiling.start(cprofile=True)
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        work()
+        profiling.stop()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "run.prof"
+            profiler.write(path)
+            stats = pstats.Stats(str(path)).stats
+        calls = [v[1] for k, v in stats.items() if k[2] == "work"]
+        self.assertEqual(calls, [2])
+
+        with self.assertRaises(ValueError):
+            profiling.Profiler().write_pstats("unused.prof")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from app.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Manual clock; sleeping advances time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test token bucket rate limiting."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_burst_up_to_capacity_without_waiting(self):
+        """Test that a full bucket serves a burst immediately."""
+        bucket = TokenBucket(5, 1, self.clock, self.clock.sleep)
+        for _ in range(5):
+            bucket.acquire()
+        self.assertEqual(self.clock.now, 0.0)
+
+    def test_waits_for_refill(self):
+        """Test that an empty bucket waits for tokens at the refill rate."""
+        bucket = TokenBucket(2, 2, self.clock, self.clock.sleep)
+        for _ in range(6):
+            bucket.acquire()
+        self.assertAlmostEqual(self.clock.now, 2.0)
+
+    def test_oversized_request_is_clamped(self):
+        """Test that asking for more than capacity does not block forever."""
+        bucket = TokenBucket(10, 1, self.clock, self.clock.sleep)
+        bucket.acquire(50)
+        self.assertEqual(self.clock.now, 0.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test combined request and token limits."""
+
+    def test_requests_per_minute(self):
+        """Test that 60 rpm allows one request per second after the burst."""
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=60, clock=clock, sleep=clock.sleep)
+        for _ in range(70):
+            limiter.acquire()
+        self.assertAlmostEqual(clock.now, 10.0)
+
+    def test_pause_holds_back_requests(self):
+        """Test that a pause delays the next request even without limits."""
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        limiter.acquire()
+        limiter.pause(30)
+        limiter.pause(5)
+        limiter.acquire()
+        self.assertAlmostEqual(clock.now, 30.0)
+
+    def test_tokens_per_minute(self):
+        """Test that token usage is throttled independently of requests."""
+        clock = FakeClock()
+        limiter = RateLimiter(tpm=600, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            limiter.acquire(300)
+        self.assertAlmostEqual(clock.now, 60.0)
+
+    def test_disabled_limits_never_wait(self):
+        """Test that zero limits disable throttling."""
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=0, tpm=0, clock=clock, sleep=clock.sleep)
+        for _ in range(1000):
+            limiter.acquire(10000)
+        self.assertEqual(clock.now, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
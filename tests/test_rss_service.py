@@ -1,9 +1,22 @@
+import io
 import unittest
 import tempfile
+import threading
+import time
+import tracemalloc
 from pathlib import Path
 from unittest.mock import patch, MagicMock
-from app.services.rss import RSSService
-from app.db import init_db
+from datetime import datetime, timedelta
+from app.services.rss import (
+    FetchResult,
+    RSSService,
+    HostLimiter,
+    iter_entries,
+    update_hint,
+)
+from app import metrics
+from app.db import init_db, get_db, close_pools, load_bodies
+from app.services.dedup import minhash
 from app.config import Config
 
 
@@ -19,14 +32,23 @@ class TestRSSService(unittest.TestCase):
         self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
         self.patcher.start()
 
+        # Feed bodies are downloaded with requests before parsing
+        self.http_patcher = patch("app.services.rss.requests.get")
+        self.mock_get = self.http_patcher.start()
+        self.mock_get.return_value = self._response()
+
         init_db()
         self.service = RSSService()
 
     def tearDown(self):
         """Clean up."""
+        self.http_patcher.stop()
+        close_pools()
         self.patcher.stop()
-        if self.temp_db_path.exists():
-            self.temp_db_path.unlink()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
 
     @patch("app.services.rss.feedparser.parse")
     def test_add_feed_success(self, mock_parse):
@@ -126,9 +148,430 @@ class TestRSSService(unittest.TestCase):
         self.assertEqual(count1, 1)
 
         # Second fetch (same article)
-        count2 = self.service.fetch_all()
+        count2 = self.service.fetch_all(force=True)
         self.assertEqual(count2, 0)  # Should skip duplicate
 
+    def _response(self, body=b"<rss/>", status_code=200, headers=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = headers or {}
+        response.iter_content.return_value = [body]
+        return response
+
+    def _add_feeds(self, mock_parse, urls):
+        mock_feed_add = MagicMock()
+        mock_feed_add.bozo = False
+        mock_feed_add.feed.get.side_effect = lambda key, default=None: default
+        mock_parse.return_value = mock_feed_add
+        for url in urls:
+            self.service.add_feed(url)
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_continues_after_feed_error(self, mock_parse):
+        """Test that a failing feed does not stop the others."""
+        self._add_feeds(
+            mock_parse, ["http://bad.example.com/feed", "http://ok.example.com/feed"]
+        )
+
+        def fake_get(url, **kwargs):
+            if "bad" in url:
+                raise ConnectionError("connection refused")
+            return self._response(url.encode())
+
+        self.mock_get.side_effect = fake_get
+        mock_feed_fetch = MagicMock()
+        mock_feed_fetch.entries = [
+            {"title": "Article", "link": "http://ok.example.com/a1"}
+        ]
+        mock_parse.return_value = mock_feed_fetch
+        bad, ok = "http://bad.example.com/feed", "http://ok.example.com/feed"
+        errors = metrics.FETCHES.value(feed=bad, outcome="error")
+        inserted = metrics.ENTRIES_INSERTED.value(feed=ok)
+        fetched = metrics.FETCH_SECONDS.value(feed=ok)[0]
+
+        count = self.service.fetch_all(concurrency=2)
+        self.assertEqual(count, 1)
+        self.assertEqual(metrics.FETCHES.value(feed=bad, outcome="error"), errors + 1)
+        self.assertEqual(metrics.ENTRIES_INSERTED.value(feed=ok), inserted + 1)
+        self.assertEqual(metrics.FETCH_SECONDS.value(feed=ok)[0], fetched + 1)
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_runs_feeds_concurrently(self, mock_parse):
+        """Test that slow feeds are downloaded in parallel."""
+        urls = [f"http://host{i}.example.com/feed" for i in range(4)]
+        self._add_feeds(mock_parse, urls)
+
+        def slow_get(url, **kwargs):
+            time.sleep(0.2)
+            return self._response()
+
+        self.mock_get.side_effect = slow_get
+        mock_parse.return_value = MagicMock(entries=[])
+
+        start = time.monotonic()
+        self.service.fetch_all(concurrency=4)
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_sends_stored_validators(self, mock_parse):
+        """Test that ETag/Last-Modified are stored and sent back."""
+        self._add_feeds(mock_parse, ["http://example.com/feed"])
+        mock_parse.return_value = MagicMock(entries=[])
+        self.mock_get.return_value = self._response(
+            headers={"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        )
+
+        self.service.fetch_all()
+        self.service.fetch_all(force=True)
+
+        headers = self.mock_get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertEqual(headers["If-Modified-Since"], "Mon, 01 Jan 2024 00:00:00 GMT")
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_skips_parsing_on_304(self, mock_parse):
+        """Test that a 304 response is not parsed and is reported as skipped."""
+        self._add_feeds(mock_parse, ["http://example.com/feed"])
+        mock_parse.reset_mock()
+        self.mock_get.return_value = self._response(status_code=304)
+
+        count = self.service.fetch_all()
+
+        self.assertEqual(count, 0)
+        mock_parse.assert_not_called()
+        self.assertEqual(self.service.last_stats.not_modified, 1)
+        self.assertEqual(self.service.last_stats.bytes, 0)
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_collapses_tracking_variants(self, mock_parse):
+        """Test that links differing only by tracking parameters are deduplicated."""
+        self._add_feeds(mock_parse, ["http://example.com/feed"])
+        mock_parse.return_value = MagicMock(
+            entries=[
+                {"title": "A", "link": "http://example.com/a?utm_source=rss"},
+                {"title": "A", "link": "http://example.com/a?utm_source=twitter"},
+                {"title": "B", "link": "http://example.com/b"},
+            ]
+        )
+
+        self.assertEqual(self.service.fetch_all(), 2)
+        self.assertEqual(self.service.last_stats.duplicates, 1)
+
+        mock_parse.return_value = MagicMock(
+            entries=[
+                {"title": "A", "link": "https://www.example.com/a"},
+                {"title": "C", "link": "http://example.com/c"},
+            ]
+        )
+        self.assertEqual(self.service.fetch_all(force=True), 1)
+        self.assertEqual(self.service.last_stats.duplicates, 1)
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_marks_near_duplicates(self, mock_parse):
+        """Test that rewrites of a stored story join its cluster."""
+        self._add_feeds(mock_parse, ["http://example.com/feed"])
+        release = (
+            "OpenAI today announced GPT-5, its most capable model yet, available "
+            "to ChatGPT Plus subscribers starting this week."
+        )
+        mock_parse.return_value = MagicMock(
+            entries=[{"title": "GPT-5", "link": "http://a.com/1", "summary": release}]
+        )
+        self.service.fetch_all()
+
+        mock_parse.return_value = MagicMock(
+            entries=[
+                {
+                    "title": "GPT-5",
+                    "link": "http://b.com/2",
+                    "summary": release.replace("yet", "so far"),
+                },
+                {
+                    "title": "Other",
+                    "link": "http://b.com/3",
+                    "summary": "A completely different story about new laptops "
+                    "shipping next month with longer battery life.",
+                },
+            ]
+        )
+        threads = []
+
+        def record_thread(text):
+            threads.append(threading.current_thread())
+            return minhash(text)
+
+        # Signatures are computed by the fetch workers, outside the writes
+        with patch("app.services.rss.minhash", side_effect=record_thread):
+            self.assertEqual(self.service.fetch_all(force=True), 2)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+        self.assertEqual(self.service.last_stats.near_duplicates, 1)
+
+        with get_db() as conn:
+            rows = {
+                row["link"]: (row["status"], row["duplicate_of"])
+                for row in conn.execute("SELECT * FROM articles")
+            }
+        self.assertEqual(rows["http://a.com/1"], ("new", None))
+        self.assertEqual(rows["http://b.com/2"][0], "duplicate")
+        self.assertEqual(rows["http://b.com/3"], ("new", None))
+
+    @patch("app.services.rss.feedparser.parse")
+    def test_fetch_all_skips_feeds_not_due(self, mock_parse):
+        """Test that a fetched feed is not polled again until it is due."""
+        self._add_feeds(mock_parse, ["http://a.com/feed", "http://b.com/feed"])
+        mock_parse.return_value = MagicMock(entries=[])
+        self.mock_get.return_value = self._response(status_code=500)
+        self.mock_get.return_value.raise_for_status.side_effect = Exception("boom")
+
+        self.assertIsNone(self.service.next_due())
+        self.service.fetch_all()
+        self.assertEqual(self.mock_get.call_count, 2)
+
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE feeds SET next_fetch_at=? WHERE id=2", (datetime.now(),)
+            )
+            conn.commit()
+        self.service.fetch_all()
+        self.assertEqual(self.mock_get.call_count, 3)
+        self.assertEqual(self.service.last_stats.not_due, 1)
+        self.assertGreater(self.service.next_due(), datetime.now())
+
+        with get_db() as conn:
+            failures = [
+                row[0]
+                for row in conn.execute("SELECT fetch_failures FROM feeds ORDER BY id")
+            ]
+        self.assertEqual(failures, [1, 2])
+
+    def test_next_interval_backoff(self):
+        """Test cadence-based intervals with failure and empty-fetch backoff."""
+        service = RSSService(min_interval=60, max_interval=86400)
+        row = {
+            "fetch_failures": 0,
+            "empty_fetches": 0,
+            "poll_interval": None,
+            "update_hint": None,
+        }
+
+        def interval(row, added=0, error=None, hint=None, cadence=3600):
+            result = FetchResult(feed_id=1, name="F", seen=5, error=error)
+            result.update_hint = hint
+            return service.next_interval(row, result, added, cadence)
+
+        # Half the publishing gap while articles keep coming
+        self.assertEqual(interval(row, added=2), (1800, 0, 0))
+        # Everything new: poll more often in case articles were missed
+        self.assertEqual(interval(row, added=5), (900, 0, 0))
+        # Failures double the interval, empty fetches stretch it by half
+        self.assertEqual(interval(row, error="boom"), (3600, 1, 0))
+        self.assertEqual(
+            interval({**row, "fetch_failures": 2}, error="x"), (14400, 3, 0)
+        )
+        self.assertEqual(interval(row), (2700, 0, 1))
+        self.assertEqual(interval({**row, "empty_fetches": 20}), (1800 * 1.5**6, 0, 21))
+        # Feed hints are a lower bound; unknown cadence polls slowly
+        self.assertEqual(interval(row, added=2, hint=7200), (7200, 0, 0))
+        self.assertEqual(interval({**row, "update_hint": 7200}, added=2), (7200, 0, 0))
+        self.assertEqual(interval(row, added=2, cadence=None), (86400, 0, 0))
+        self.assertEqual(interval(row, added=2, cadence=10), (60, 0, 0))
+
+    def test_update_hint(self):
+        """Test parsing of RSS ttl and syndication module hints."""
+        self.assertEqual(update_hint({"ttl": "90"}), 5400)
+        self.assertEqual(
+            update_hint({"sy_updateperiod": "daily", "sy_updatefrequency": "4"}),
+            21600,
+        )
+        self.assertEqual(
+            update_hint({"ttl": "60", "sy_updateperiod": "weekly"}), 604800
+        )
+        self.assertIsNone(update_hint({"ttl": "soon", "sy_updateperiod": "often"}))
+        self.assertIsNone(update_hint({}))
+
+    def _archive(self, first, last):
+        """An RSS archive with items `last`..`first`, newest first."""
+        items = "".join(f"""
+            <item>
+              <title>Post {i}</title>
+              <link>/posts/{i}</link>
+              <pubDate>{(datetime(2020, 1, 1) + timedelta(hours=i)):%a, %d %b %Y %H:%M:%S} GMT</pubDate>
+              <description>Summary {i}</description>
+              <content:encoded><![CDATA[<p>{"word " * 400}{i}</p>]]></content:encoded>
+            </item>""" for i in range(last, first - 1, -1))
+        return f"""<?xml version="1.0"?>
+        <rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+          <channel><title>Archive</title><ttl>120</ttl>{items}</channel>
+        </rss>""".encode()  # fmt: skip
+
+    @patch("app.services.rss.feedparser.parse")
+    @patch.object(Config, "FETCH_STREAM_THRESHOLD", 64 * 1024)
+    def test_large_feed_is_streamed_in_chunks(self, mock_parse):
+        """Test that large feeds bypass feedparser and keep memory flat."""
+        with get_db() as conn:
+            conn.execute(
+                "INSERT INTO feeds (name, url) VALUES ('Archive', 'http://a.com/feed')"
+            )
+            conn.commit()
+
+        def serve(body):
+            self.mock_get.return_value = self._response()
+            self.mock_get.return_value.iter_content.return_value = (
+                body[i : i + 64 * 1024] for i in range(0, len(body), 64 * 1024)
+            )
+
+        warmup, body = self._archive(1, 50), self._archive(1, 2000)
+        tracemalloc.start()
+        try:
+            # A small fetch first, so imports on first use are not counted
+            serve(warmup)
+            self.assertEqual(self.service.fetch_all(), 50)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            serve(body)
+            self.assertEqual(self.service.fetch_all(force=True), 1950)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+        mock_parse.assert_not_called()
+        self.assertLess(peak, len(body) / 2)
+        self.assertIn("word word", load_bodies([1])[1])
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT link, published FROM articles ORDER BY id LIMIT 1"
+            ).fetchone()
+            self.assertEqual(row["link"], "http://a.com/posts/50")
+            self.assertEqual(
+                datetime.fromisoformat(row["published"]),
+                datetime(2020, 1, 1) + timedelta(hours=50),
+            )
+            hint = conn.execute("SELECT update_hint FROM feeds").fetchone()[0]
+            self.assertEqual(hint, 7200)
+
+        # Newer posts on top: stops after the first chunk of known entries
+        self.mock_get.return_value = self._response(self._archive(1, 2005))
+        with patch.object(
+            self.service, "_store_result", wraps=self.service._store_result
+        ) as store:
+            self.assertEqual(self.service.fetch_all(force=True), 5)
+        result = store.call_args[0][0]
+        self.assertTrue(result.stopped_early)
+        self.assertEqual(result.seen, 400)
+        self.assertEqual(self.service.last_stats.duplicates, 395)
+
+    @patch.object(Config, "FETCH_STREAM_THRESHOLD", 16)
+    def test_streamed_feed_errors_part_way(self):
+        """Test that only a cut-off feed ends at the error; other errors
+        part-way through go to feedparser for the rest."""
+        with get_db() as conn:
+            conn.execute(
+                "INSERT INTO feeds (name, url) VALUES ('Archive', 'http://a.com/feed')"
+            )
+            conn.commit()
+
+        body = self._archive(1, 300).replace(b"Post 100<", b"Post&nbsp;100<")
+        self.mock_get.return_value = self._response(body)
+        self.assertEqual(self.service.fetch_all(), 300)
+        with get_db() as conn:
+            title = conn.execute(
+                "SELECT title FROM articles WHERE link='http://a.com/posts/100'"
+            ).fetchone()[0]
+        self.assertEqual(title, "Post\xa0100")
+
+        body = self._archive(1, 600)
+        self.mock_get.return_value = self._response(body[: body.index(b"Post 350<")])
+        self.assertEqual(self.service.fetch_all(force=True), 250)
+
+    @patch("app.services.rss.feedparser.parse")
+    @patch.object(Config, "FETCH_STREAM_THRESHOLD", 16)
+    def test_malformed_large_feed_falls_back_to_feedparser(self, mock_parse):
+        """Test that broken XML is still parsed by feedparser."""
+        self._add_feeds(mock_parse, ["http://example.com/feed"])
+        self.mock_get.return_value = self._response(b"<rss><item>& broken</rss>")
+        mock_parse.return_value = MagicMock(
+            entries=[{"title": "A", "link": "http://example.com/a"}]
+        )
+
+        self.assertEqual(self.service.fetch_all(), 1)
+        mock_parse.assert_called_with(
+            b"<rss><item>& broken</rss>",
+            response_headers={"content-location": "http://example.com/feed"},
+        )
+
+    def test_iter_entries_atom(self):
+        """Test streaming Atom and RSS 1.0 entries."""
+        atom = b"""<?xml version="1.0"?>
+        <feed xmlns="http://www.w3.org/2005/Atom"
+              xmlns:sy="http://purl.org/rss/1.0/modules/syndication/">
+          <sy:updatePeriod>daily</sy:updatePeriod>
+          <entry>
+            <title>First</title>
+            <link rel="replies" href="/comments"/>
+            <link href="/first"/>
+            <updated>2024-05-01T12:00:00+02:00</updated>
+            <summary>Short</summary>
+            <content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml"><p>Body</p></div></content>
+          </entry>
+          <entry><title>No link</title></entry>
+        </feed>"""
+        feed_info = {}
+        entries = list(
+            iter_entries(io.BytesIO(atom), 7, feed_info, "http://example.com/")
+        )
+        self.assertEqual(
+            entries,
+            [
+                (
+                    7,
+                    "First",
+                    "http://example.com/first",
+                    datetime(2024, 5, 1, 10),
+                    "Short",
+                    '<html:div xmlns:html="http://www.w3.org/1999/xhtml">'
+                    "<html:p>Body</html:p></html:div>",
+                )
+            ],
+        )
+        self.assertEqual(feed_info, {"sy_updateperiod": "daily"})
+
+        rdf = b"""<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+                 xmlns="http://purl.org/rss/1.0/"
+                 xmlns:dc="http://purl.org/dc/elements/1.1/">
+          <item><title>R</title><link>http://r.com/1</link>
+            <dc:date>2024-05-01T08:00:00Z</dc:date></item>
+        </rdf:RDF>"""
+        (entry,) = iter_entries(io.BytesIO(rdf), 1, {})
+        self.assertEqual(entry[2:4], ("http://r.com/1", datetime(2024, 5, 1, 8)))
+
+    def test_host_limiter_caps_requests_per_host(self):
+        """Test that the per-host limit is enforced across threads."""
+        limiter = HostLimiter(2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            with limiter.for_url("http://example.com/feed"):
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.05)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertLessEqual(max(peak), 2)
+        self.assertIsNot(
+            limiter.for_url("http://example.com/a"),
+            limiter.for_url("http://other.com/a"),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
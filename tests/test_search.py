@@ -0,0 +1,190 @@
+import unittest
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+from app.config import Config
+from app.db import init_db, get_db, close_pools, compress_text
+from app.services.search import (
+    HIGHLIGHT_END,
+    HIGHLIGHT_START,
+    match_expression,
+    search_articles,
+)
+
+
+class TestSearch(unittest.TestCase):
+    """Test full-text search over articles."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO feeds (name, url) VALUES (?, ?)",
+                [("Hacker News", "http://hn"), ("少数派", "http://sspai")],
+            )
+            conn.executemany(
+                """
+                INSERT INTO articles
+                    (feed_id, title, link, published, summary, status, score, category)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                [
+                    (1, "SQLite FTS5 in practice", "http://a/1",
+                     datetime(2025, 1, 1), "<p>Trigram tokenizer notes</p>",
+                     "analyzed", 3, "Tech"),
+                    (1, "Why SQLite is everywhere", "http://a/2",
+                     datetime(2025, 2, 1), "An essay on embedded databases",
+                     "analyzed", 9, "Tech"),
+                    (2, "大模型推理优化实践", "http://a/3",
+                     datetime(2025, 3, 1), "介绍向量数据库与 SQLite 的结合",
+                     "analyzed", 7, "AI"),
+                    (2, "大模型推理优化实践（转载）", "http://a/4",
+                     datetime(2025, 3, 2), "介绍向量数据库与 SQLite 的结合",
+                     "duplicate", 0, None),
+                ],
+            )  # fmt: skip
+            conn.commit()
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _links(self, text, **kwargs):
+        return [row["link"] for row in search_articles(text, **kwargs)]
+
+    def test_llm_score_breaks_ties(self):
+        """Test that a higher LLM score outranks an equally good match."""
+        links = self._links("sqlite")
+        self.assertCountEqual(links, ["http://a/1", "http://a/2", "http://a/3"])
+        self.assertLess(links.index("http://a/2"), links.index("http://a/1"))
+
+    def test_chinese_terms(self):
+        self.assertEqual(self._links("推理优化"), ["http://a/3"])
+        self.assertEqual(self._links("向量数据库 sqlite"), ["http://a/3"])
+
+    def test_short_terms_use_word_index(self):
+        self.assertEqual(self._links("模型"), ["http://a/3"])
+        self.assertEqual(self._links("AI"), ["http://a/3"])
+        self.assertEqual(self._links("库 sqlite"), ["http://a/3"])
+        self.assertEqual(self._links("型推 AI"), ["http://a/3"])
+        # Whole words only: "is" is in "Why SQLite is everywhere" alone
+        self.assertEqual(self._links("is"), ["http://a/2"])
+        (row,) = search_articles("AI")
+        self.assertEqual(row["snippet"], "介绍向量数据库与 SQLite 的结合")
+
+    def test_short_terms_search_bodies(self):
+        with get_db() as conn:
+            conn.execute(
+                "INSERT INTO article_bodies (article_id, content) VALUES (1, ?)",
+                (compress_text("<p>Notes on Go and 分词 in SQLite</p>"),),
+            )
+            conn.commit()
+        self.assertEqual(self._links("go"), ["http://a/1"])
+        self.assertEqual(self._links("分词 trigram"), ["http://a/1"])
+
+        with get_db() as conn:
+            conn.execute("DELETE FROM articles WHERE id=1")
+            conn.commit()
+            self.assertEqual(self._links("go"), [])
+            conn.execute(
+                "INSERT INTO articles_words (articles_words, rank) VALUES ('integrity-check', 1)"
+            )
+
+    def test_filters(self):
+        self.assertEqual(self._links("sqlite", category="AI"), ["http://a/3"])
+        self.assertEqual(
+            self._links("sqlite", feed="hacker"), ["http://a/2", "http://a/1"]
+        )
+        self.assertEqual(
+            self._links("sqlite", score_min=5), ["http://a/2", "http://a/3"]
+        )
+        self.assertEqual(
+            self._links("sqlite", since=datetime(2025, 1, 15)),
+            ["http://a/2", "http://a/3"],
+        )
+
+    def test_feed_filter_matches_wildcards_literally(self):
+        with get_db() as conn:
+            conn.execute(
+                "INSERT INTO feeds (name, url) VALUES ('my_blog 100%', 'http://m')"
+            )
+            conn.execute(
+                "INSERT INTO articles (feed_id, title, link, status) "
+                "VALUES (3, 'SQLite notes', 'http://a/5', 'analyzed')"
+            )
+            conn.commit()
+        self.assertEqual(self._links("sqlite", feed="my_blog"), ["http://a/5"])
+        self.assertEqual(self._links("sqlite", feed="100%"), ["http://a/5"])
+        self.assertEqual(self._links("sqlite", feed="hacker_"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET analysis='Covers WAL checkpoints' WHERE id=1"
+            )
+            conn.execute("DELETE FROM articles WHERE id=2")
+            conn.commit()
+        self.assertEqual(self._links("checkpoint"), ["http://a/1"])
+        self.assertEqual(self._links("embedded"), [])
+
+    def test_index_covers_compressed_bodies(self):
+        def set_body(sql, text):
+            with get_db() as conn:
+                conn.execute(sql, (compress_text(text),))
+                conn.commit()
+
+        set_body(
+            "INSERT INTO article_bodies (article_id, content) VALUES (2, ?)",
+            "<p>Checkpoint starvation under load</p>",
+        )
+        (row,) = search_articles("starvation")
+        self.assertEqual(row["link"], "http://a/2")
+        self.assertIn(f"Checkpoint {HIGHLIGHT_START}", row["snippet"])
+
+        set_body("UPDATE article_bodies SET content=? WHERE article_id=2", "Vacuum")
+        self.assertEqual(self._links("starvation"), [])
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET analysis='Worth it' WHERE id=2")
+            conn.commit()
+        self.assertEqual(self._links("vacuum worth"), ["http://a/2"])
+
+        with get_db() as conn:
+            conn.execute("DELETE FROM article_bodies WHERE article_id=2")
+            conn.execute(
+                "INSERT INTO article_bodies VALUES (1, ?)", (compress_text("x"),)
+            )
+            conn.execute("DELETE FROM articles WHERE id=1")
+            conn.commit()
+            self.assertEqual(self._links("vacuum"), [])
+            self.assertEqual(
+                conn.execute("SELECT * FROM article_bodies").fetchall(), []
+            )
+            # Raises if the index disagrees with the article_text view
+            conn.execute(
+                "INSERT INTO articles_fts (articles_fts, rank) VALUES ('integrity-check', 1)"
+            )
+
+    def test_snippet_highlights_match(self):
+        (row,) = search_articles("trigram")
+        self.assertIn(f"{HIGHLIGHT_START}Trigram{HIGHLIGHT_END}", row["snippet"])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(match_expression(['say"hi', "OR"]), '"say""hi" "OR"')
+        self.assertEqual(self._links('"sqlite" AND NOT'), [])
+        self.assertEqual(self._links("   "), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from app.utils import (
+    cjk_bigrams,
+    clean_text,
+    estimate_tokens,
+    normalize_link,
+    truncate_tokens,
+)
+
+
+class TestNormalizeLink(unittest.TestCase):
+    """Test link normalization used for deduplication."""
+
+    def test_strips_tracking_parameters(self):
+        """Test that utm_* and click ids do not change the key."""
+        self.assertEqual(
+            normalize_link("https://example.com/post?utm_source=rss&fbclid=abc"),
+            normalize_link("https://example.com/post"),
+        )
+
+    def test_keeps_meaningful_query_sorted(self):
+        """Test that other query parameters are kept in a stable order."""
+        self.assertEqual(
+            normalize_link("https://example.com/p?b=2&a=1&utm_medium=x"),
+            "example.com/p?a=1&b=2",
+        )
+
+    def test_ignores_scheme_www_fragment_and_trailing_slash(self):
+        """Test that cosmetic URL differences collapse."""
+        self.assertEqual(
+            normalize_link("http://WWW.Example.com/post/#comments"),
+            normalize_link("https://example.com/post"),
+        )
+
+    def test_hash_routes_and_ref_stay_distinct(self):
+        """Test that fragments and `ref` naming the article are kept."""
+        self.assertEqual(
+            normalize_link("https://example.com/#/post/1"), "example.com#/post/1"
+        )
+        self.assertNotEqual(
+            normalize_link("https://example.com/#!/post/1"),
+            normalize_link("https://example.com/#!/post/2"),
+        )
+        self.assertEqual(
+            normalize_link("https://example.com/view?ref=42&utm_source=rss"),
+            "example.com/view?ref=42",
+        )
+
+    def test_different_paths_stay_distinct(self):
+        """Test that distinct articles keep distinct keys."""
+        self.assertNotEqual(
+            normalize_link("https://example.com/a"),
+            normalize_link("https://example.com/b"),
+        )
+
+
+class TestPromptText(unittest.TestCase):
+    """Test cleaning and truncating article text for prompts."""
+
+    def test_clean_text_drops_markup_and_boilerplate(self):
+        html = (
+            "<style>p{color:red}</style><p>Real&nbsp;news <b>here</b></p>"
+            "<script>track()</script><p>The post Real news appeared first on Blog.</p>"
+        )
+        self.assertEqual(clean_text(html), "Real news here")
+        self.assertEqual(clean_text('<a href="x">Comments</a>'), "")
+        self.assertEqual(clean_text("<p>正文</p><p>阅读原文</p>"), "正文")
+
+    def test_truncate_by_tokens_not_characters(self):
+        latin, cjk = "word " * 200, "模型" * 200
+        self.assertEqual(truncate_tokens("short", 10), "short")
+        for text in (latin, cjk):
+            cut = truncate_tokens(text, 50)
+            self.assertTrue(cut.endswith("…"))
+            self.assertLessEqual(estimate_tokens(cut), 50)
+            self.assertGreaterEqual(estimate_tokens(cut), 45)
+        self.assertGreater(
+            len(truncate_tokens(latin, 50)), 3 * len(truncate_tokens(cjk, 50))
+        )
+        self.assertTrue(truncate_tokens(latin, 50).endswith("word…"))
+
+
+class TestCjkBigrams(unittest.TestCase):
+    """Test the text fed to the short-term search index."""
+
+    def test_spells_out_cjk_runs(self):
+        self.assertEqual(cjk_bigrams("大模型 AI"), " 大 大模 模 模型 型  AI")
+        self.assertEqual(cjk_bigrams("用Go写"), " 用 Go 写 ")
+        self.assertIsNone(cjk_bigrams(None))
+
+    def test_longer_terms_stay_contiguous(self):
+        # A term spelled out the same way is a run of the text's tokens
+        self.assertIn(cjk_bigrams("模型推理").strip(), cjk_bigrams("大模型推理优化"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import threading
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+from app.config import Config
+from app.db import init_db, get_db, close_pools
+from app.services.workqueue import WorkQueue, requeue_failed
+
+
+class TestWorkQueue(unittest.TestCase):
+    """Test lease-based claiming of pending articles."""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        self.patcher = patch.object(Config, "DB_PATH", self.temp_db_path)
+        self.patcher.start()
+        init_db()
+
+        with get_db() as conn:
+            conn.execute("INSERT INTO feeds (name, url) VALUES ('Feed', 'http://f')")
+            conn.executemany(
+                "INSERT INTO articles (feed_id, title, link, status) VALUES (1, ?, ?, ?)",
+                [
+                    (f"A{i}", f"http://f/{i}", "analyzed" if i < 2 else "new")
+                    for i in range(50)
+                ],
+            )
+            conn.commit()
+
+    def tearDown(self):
+        close_pools()
+        self.patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.temp_db_path}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def _ids(self, rows):
+        return [row["id"] for row in rows]
+
+    def test_claim_takes_oldest_unleased(self):
+        first, second = WorkQueue("first"), WorkQueue("second")
+
+        self.assertEqual(self._ids(first.claim(3)), [3, 4, 5])
+        self.assertEqual(self._ids(second.claim(2)), [6, 7])
+        with get_db() as conn:
+            owner = conn.execute("SELECT lease_owner FROM articles WHERE id=3")
+            self.assertEqual(owner.fetchone()[0], "first")
+
+    def test_concurrent_claims_are_disjoint(self):
+        claimed = {}
+
+        def worker(name):
+            queue = WorkQueue(name)
+            ids = []
+            while rows := queue.claim(4):
+                ids.extend(self._ids(rows))
+            claimed[name] = ids
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        every = [i for ids in claimed.values() for i in ids]
+        self.assertEqual(len(every), len(set(every)))
+        self.assertCountEqual(every, range(3, 51))
+
+    def test_expired_leases_are_reclaimed(self):
+        crashed = WorkQueue("crashed", lease_seconds=60)
+        crashed.claim(48)
+        survivor = WorkQueue("survivor")
+        self.assertEqual(survivor.claim(10), [])
+
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE articles SET lease_expires=? WHERE id <= 10",
+                (datetime.now() - timedelta(seconds=1),),
+            )
+            conn.commit()
+        self.assertEqual(self._ids(survivor.claim(10)), list(range(3, 11)))
+        self.assertEqual(survivor.reclaimed, 8)
+
+    def test_claim_ids_skips_leased_and_analyzed(self):
+        WorkQueue("other").claim(1)
+
+        rows = WorkQueue("mine").claim_ids([1, 3, 4, 99])
+        self.assertEqual(self._ids(rows), [4])
+        self.assertEqual(WorkQueue("mine").claim_ids([]), [])
+
+    def test_release_returns_unfinished_articles(self):
+        queue = WorkQueue("mine")
+        queue.claim(2)
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET status='analyzed' WHERE id=3")
+            conn.commit()
+
+        self.assertEqual(WorkQueue("other").release([3, 4]), 0)
+        self.assertEqual(queue.release([3, 4]), 1)
+        self.assertEqual(self._ids(WorkQueue("other").claim(1)), [4])
+
+    def test_renew_extends_only_held_leases(self):
+        queue = WorkQueue("mine", lease_seconds=60)
+        queue.claim(3)
+        WorkQueue("other").claim(1)
+        with get_db() as conn:
+            conn.execute("UPDATE articles SET status='analyzed' WHERE id=3")
+            conn.commit()
+
+        self.assertEqual(queue.renew([3, 4, 5, 6]), 2)
+        self.assertEqual(queue.renew([]), 0)
+        with get_db() as conn:
+            expires = dict(
+                conn.execute(
+                    "SELECT id, lease_expires FROM articles WHERE id IN (4, 5, 6)"
+                ).fetchall()
+            )
+        # Renewed leases run a full period from now; the other claim's is untouched
+        for article_id in (4, 5):
+            renewed = datetime.fromisoformat(expires[article_id])
+            self.assertAlmostEqual(
+                (renewed - datetime.now()).total_seconds(), 60, delta=5
+            )
+        self.assertGreater(
+            datetime.fromisoformat(expires[6]) - datetime.now(), timedelta(seconds=300)
+        )
+
+    def _fail(self, ids, status, when=None, kind="timeout"):
+        with get_db() as conn:
+            conn.executemany(
+                "UPDATE articles SET status=?, next_attempt_at=?, last_error=?, "
+                "retry_count=2 WHERE id=?",
+                [(status, when, kind, i) for i in ids],
+            )
+            conn.commit()
+
+    def test_due_retries_return_to_queue(self):
+        now = datetime.now()
+        self._fail([3, 4], "retry", now - timedelta(seconds=1))
+        self._fail([5], "retry", now + timedelta(hours=1))
+        queue = WorkQueue("mine")
+
+        self.assertEqual(self._ids(queue.claim(3)), [3, 4, 6])
+        self._fail([7], "retry", now - timedelta(seconds=1))
+        self.assertEqual(queue.requeue_due(), [7])
+        self.assertEqual(self._ids(queue.claim_ids([5, 7])), [7])
+
+    def test_requeue_failed(self):
+        self._fail([3, 4], "error", kind="rate_limit")
+        self._fail([5], "error", kind="validation")
+        self._fail([6], "retry", datetime.now() + timedelta(hours=1))
+
+        self.assertEqual(requeue_failed("rate_limit"), {"rate_limit": 2})
+        self.assertEqual(requeue_failed(waiting=False), {"validation": 1})
+        self.assertEqual(requeue_failed(), {"timeout": 1})
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), SUM(retry_count) FROM articles WHERE status='new'"
+            ).fetchone()
+        self.assertEqual(tuple(row), (48, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()